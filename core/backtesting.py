@@ -0,0 +1,83 @@
+import numpy as np
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+MODELS = {
+    'linear': LinearRegression,
+    'ridge': Ridge,
+}
+
+# The first entry mirrors SalesPredictor's own model
+DEFAULT_CONFIGS = {
+    'linear_trend_season': {'model': 'linear', 'features': ['TimeIndex', 'Month', 'Year']},
+    'linear_trend': {'model': 'linear', 'features': ['TimeIndex']},
+    'ridge_trend_season': {'model': 'ridge', 'features': ['TimeIndex', 'Month', 'Year'], 'params': {'alpha': 1.0}},
+}
+
+
+def _evaluate_origins(features, target, origins, horizons, config):
+    """
+    Fit one configuration at each origin on all earlier periods and forecast
+    the next `horizons` periods. Returns (horizon, actual, predicted) tuples.
+    """
+    results = []
+    for origin in origins:
+        model = make_pipeline(StandardScaler(), MODELS[config['model']](**config.get('params', {})))
+        model.fit(features[:origin], target[:origin])
+        end = min(origin + horizons, len(target))
+        predicted = model.predict(features[origin:end])
+        for step, (actual, forecast) in enumerate(zip(target[origin:end], predicted), start=1):
+            results.append((step, float(actual), float(forecast)))
+    return results
+
+
+def _summarize(results, horizons):
+    errors = {step: [] for step in range(1, horizons + 1)}
+    percentage_errors = {step: [] for step in range(1, horizons + 1)}
+    for step, actual, forecast in results:
+        errors[step].append(abs(actual - forecast))
+        if actual != 0:
+            percentage_errors[step].append(abs(actual - forecast) / abs(actual) * 100)
+
+    def mean_or_none(values):
+        return float(np.mean(values)) if values else None
+
+    all_errors = [error for step_errors in errors.values() for error in step_errors]
+    all_percentage_errors = [error for step_errors in percentage_errors.values() for error in step_errors]
+    return {
+        'horizons': {
+            str(step): {'mae': mean_or_none(errors[step]), 'mape': mean_or_none(percentage_errors[step]), 'n': len(errors[step])}
+            for step in errors
+        },
+        'mae': mean_or_none(all_errors),
+        'mape': mean_or_none(all_percentage_errors),
+    }
+
+
+def walk_forward(monthly_sales, horizons=3, min_train=12, max_folds=24, configs=None):
+    """
+    Rolling-origin evaluation of forecast configurations over a period series.
+    Every origin from min_train onwards trains on the periods before it and is
+    scored on the following `horizons` periods; only the latest max_folds
+    origins are used. Returns MAE/MAPE per horizon and overall for each configuration.
+    Folds run serially: backtests run with the forecast inside a CPU pool
+    worker, where a nested pool would oversubscribe the cores the pool bounds,
+    and max_folds small linear fits take milliseconds.
+    """
+    configs = configs or DEFAULT_CONFIGS
+    target = monthly_sales['Purchase Amount (USD)'].to_numpy(dtype=float)
+    origins = list(range(min_train, len(target)))[-max_folds:]
+    if not origins:
+        return {'folds': 0, 'configs': {}}
+
+    results = {
+        name: _evaluate_origins(
+            monthly_sales[config['features']].to_numpy(dtype=float), target, origins, horizons, config,
+        )
+        for name, config in configs.items()
+    }
+    return {
+        'folds': len(origins),
+        'configs': {name: _summarize(results[name], horizons) for name in configs},
+    }
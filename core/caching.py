@@ -0,0 +1,111 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+
+# Suffixes appended to strong ETags by CompressionMiddleware so that each
+# content-coding of a representation carries its own validator.
+ENCODING_ETAG_SUFFIXES = ('-br', '-gzip')
+
+
+def canonicalize_filters(filters):
+    """
+    Return a stable string form of a filter dict.
+    Empty filters are dropped, keys are sorted and ranges become lists of
+    floats, so logically identical filter sets produce the same string
+    (a GET's 18.0 and a JSON body's 18 alike).
+    """
+    canonical = {}
+    for key, value in (filters or {}).items():
+        if value in (None, '', [], ()):
+            continue
+        if isinstance(value, (list, tuple)):
+            value = [
+                float(bound) if isinstance(bound, (int, float)) and not isinstance(bound, bool) else bound
+                for bound in value
+            ]
+        canonical[key] = value
+    return json.dumps(canonical, sort_keys=True, separators=(',', ':'), default=str)
+
+
+def make_etag(dataset_version, filters=None, variant=''):
+    """Build a strong ETag from the dataset version and the canonical filters."""
+    digest = hashlib.sha256()
+    digest.update(str(dataset_version).encode('utf-8'))
+    digest.update(b'|')
+    digest.update(canonicalize_filters(filters).encode('utf-8'))
+    digest.update(b'|')
+    digest.update(variant.encode('utf-8'))
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def _strip_encoding_suffix(etag):
+    for suffix in ENCODING_ETAG_SUFFIXES:
+        if etag.endswith(suffix + '"'):
+            return etag[:-len(suffix) - 1] + '"'
+    return etag
+
+
+def etag_matches(request, etag):
+    """Check the request's If-None-Match header against an ETag."""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if _strip_encoding_suffix(candidate) == etag:
+            return True
+    return False
+
+
+def apply_cache_headers(response, etag):
+    """
+    Attach the validator and caching hints to a response.
+    Shared caches may store the response but must revalidate on every use,
+    which costs a 304 as long as the dataset and filters are unchanged.
+    """
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+def not_modified(etag):
+    return apply_cache_headers(HttpResponseNotModified(), etag)
+
+
+class LRUCache:
+    """A small thread-safe in-process LRU mapping."""
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
@@ -0,0 +1,78 @@
+import numbers
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Graphs drawn as line charts; every other flat series is drawn as bars
+LINE_CHARTS = {'sales_by_month', 'sales_by_year', 'peak_purchase_hours'}
+# Graphs that are lists or per-entity data rather than chartable series
+SKIPPED_GRAPHS = {'available_dates_count', 'cross_sell_upsell_opportunities', 'discount_impact', 'percentile_cards'}
+
+FIGURE_SIZE = (6, 4)
+FIGURE_DPI = 100
+
+
+def _new_figure():
+    # The object-oriented Figure API keeps no global state, so charts can be
+    # rendered from several threads at once (pyplot cannot)
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+    return fig, fig.subplots()
+
+
+def _series(data):
+    """Reduce a graph payload to (labels, values), or None when it isn't series-shaped."""
+    if not isinstance(data, dict) or not data:
+        return None
+    if 'churned_counts' in data:
+        return _series(data['churned_counts'])
+    values = list(data.values())
+    if all(isinstance(value, numbers.Number) for value in values):
+        return [str(label) for label in data.keys()], values
+    if all(isinstance(value, dict) and 'total' in value for value in values):
+        return [str(label) for label in data.keys()], [value['total'] for value in values]
+    return None
+
+
+def render_chart(name, data, output_path):
+    """
+    Render a single graph from GraphGenerator output to a PNG file.
+    Returns False when the graph has no chartable shape.
+    """
+    title = name.replace('_', ' ').title()
+
+    if name == 'visit_vs_purchase_frequency' and isinstance(data, dict):
+        fig, ax = _new_figure()
+        ax.scatter(data.get('Recency', []), data.get('Frequency', []), s=4, alpha=0.5)
+        ax.set_xlabel('Recency')
+        ax.set_ylabel('Frequency')
+    else:
+        series = _series(data)
+        if series is None:
+            return False
+        labels, values = series
+        fig, ax = _new_figure()
+        if name in LINE_CHARTS:
+            ax.plot(labels, values, marker='o')
+        else:
+            ax.bar(labels, values)
+        ax.tick_params(axis='x', labelrotation=45, labelsize=7)
+
+    ax.set_title(title)
+    fig.tight_layout()
+    fig.savefig(output_path, format='png')
+    return True
+
+
+def render_charts(graphs, workspace, names=None, max_workers=4):
+    """
+    Render the requested graphs (all chartable graphs by default) into workspace.
+    Returns the paths of the rendered images in request order.
+    """
+    names = [
+        name for name in (names or graphs.keys())
+        if name not in SKIPPED_GRAPHS and name in graphs
+    ]
+    paths = [os.path.join(workspace, f"{name}.png") for name in names]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        rendered = list(executor.map(lambda name, path: render_chart(name, graphs[name], path), names, paths))
+    return [path for path, ok in zip(paths, rendered) if ok]
@@ -0,0 +1,144 @@
+import asyncio
+import itertools
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .progress import NULL_PROGRESS
+
+# The stage events of the worker process this module runs in (None in the server)
+_events = None
+
+
+class PoolBusy(Exception):
+    """Every slot of the pool is taken; the caller should retry later."""
+
+
+def _init_worker(events):
+    global _events
+    import django
+
+    # Workers are spawned, not forked, so they set Django up themselves
+    django.setup()
+    _events = events
+
+
+def in_worker():
+    """Whether this process is a pool worker."""
+    return _events is not None
+
+
+class RemoteProgress:
+    """
+    Progress of a job whose work runs in a pool process. Stages are sent back
+    to the server, which records them in the job's Progress; the server
+    finishes or fails the job itself.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+    def stage(self, name, rows=None, **details):
+        _events.put((self.job_id, name, None if rows is None else int(rows), details))
+
+    def finish(self, **result):
+        pass
+
+    def fail(self, error):
+        pass
+
+
+class CPUPool:
+    """
+    A bounded process pool for the pandas, sklearn and FPDF stages, so they run
+    beside the event loop instead of holding it or a server thread. At most
+    max_pending calls are running or queued; beyond that submit raises PoolBusy.
+    Processes are started on first use.
+    """
+
+    def __init__(self, max_workers=2, max_pending=8, registry=None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.registry = registry
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._events = None
+        self._flushes = {}
+        self._tokens = itertools.count()
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                context = multiprocessing.get_context('spawn')
+                # A SimpleQueue writes before put() returns, so a worker's stages
+                # are all in the pipe by the time its result comes back
+                self._events = context.SimpleQueue()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=context,
+                    initializer=_init_worker, initargs=(self._events,),
+                )
+                threading.Thread(target=self._relay, args=(self._events,), daemon=True).start()
+            return self._executor
+
+    def _relay(self, events):
+        """Record the stages workers report into the registry's jobs."""
+        while True:
+            event = events.get()
+            if isinstance(event, int):
+                self._flushes.pop(event).set_result(None)
+                continue
+            job_id, name, rows, details = event
+            progress = self.registry.get(job_id) if self.registry is not None else None
+            if progress is not None:
+                progress.stage(name, rows, **details)
+
+    def _flush(self):
+        """A future that resolves once every stage sent so far has been recorded."""
+        flushed = Future()
+        token = next(self._tokens)
+        self._flushes[token] = flushed
+        self._events.put(token)
+        return flushed
+
+    def progress(self, progress):
+        """The stand-in for `progress` to pass to a function run in the pool."""
+        if progress is NULL_PROGRESS or self.registry is None:
+            return NULL_PROGRESS
+        return RemoteProgress(progress.job_id)
+
+    def submit(self, fn, *args, block=False, **kwargs):
+        """
+        Run fn(*args, **kwargs) in a worker process and return its future.
+        fn and its arguments are pickled, so fn has to be a module-level function.
+        Raises PoolBusy when the pool is full, unless block waits for a slot.
+        """
+        if not self._slots.acquire(blocking=block):
+            raise PoolBusy(f'{self.max_pending} jobs are already running or queued')
+        try:
+            future = self._get_executor().submit(fn, *args, **kwargs)
+        except BrokenProcessPool:
+            # A worker died; start over with fresh processes next time
+            with self._lock:
+                self._executor = None
+            self._slots.release()
+            raise
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        """submit() for coroutines: await fn's result without blocking the event loop."""
+        result = await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+        # Callers finish the job's progress next, which must come after its stages
+        await asyncio.wrap_future(self._flush())
+        return result
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn in the pool from a background thread, waiting for a free slot."""
+        result = self.submit(fn, *args, block=True, **kwargs).result()
+        self._flush().result()
+        return result
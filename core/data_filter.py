@@ -1,10 +1,22 @@
 from datetime import datetime
 import pandas as pd
 
+
+def date_bounds(start_date, end_date):
+    """Turn an inclusive start/end day pair into [start, end) timestamps covering whole days."""
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+    return start, end
+
+
 class DataFilter:
     def __init__(self, data):
         self.data = data
 
+    def filter_by_category(self, category):
+        if category:
+            self.data = self.data[self.data['Category'] == category]
+
     def filter_by_location(self, location):
         if location:
             self.data = self.data[self.data['Location'] == location]
@@ -19,8 +31,19 @@ class DataFilter:
 
     def filter_by_date_range(self, start_date, end_date):
         if start_date and end_date:
+            # The end day is included in full, the same as the rollups and sketches count it
+            start, end = date_bounds(start_date, end_date)
             self.data['Date'] = pd.to_datetime(self.data['Date'])
-            self.data = self.data[(self.data['Date'] >= start_date) & (self.data['Date'] <= end_date)]
+            self.data = self.data[(self.data['Date'] >= start) & (self.data['Date'] < end)]
+
+    def apply(self, filters):
+        """Apply a dashboard filter set (category, location, ranges, start/end date)."""
+        self.filter_by_category(filters.get('category'))
+        self.filter_by_location(filters.get('location'))
+        self.filter_by_age_range(filters.get('age_range'))
+        self.filter_by_rating_range(filters.get('rating_range'))
+        self.filter_by_date_range(filters.get('start_date'), filters.get('end_date'))
+        return self
 
     def get_filtered_data(self):
-        return self.data
\ No newline at end of file
+        return self.data
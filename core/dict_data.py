@@ -100,3 +100,30 @@ synonym_dict = {
     # "cash_in_hands": ["cash_in_hands"],
     # "timezone": ["timezone"]
 }
+
+# Parse dtypes for standard columns, applied to whichever raw column maps to them.
+# Measures are imputed as floats anyway; low-cardinality text is read dictionary-encoded.
+dtype_dict = {
+    "Purchase Amount (USD)": "float64",
+    "Discount": "float64",
+    "Latitude": "float64",
+    "Longitude": "float64",
+    "Previous Purchases": "float64",
+    "Age": "float64",
+    "Review Rating": "float64",
+    "Store Size": "category",
+    "Region/Zone": "category",
+    "Category": "category",
+    "Location": "category",
+    "Gender": "category",
+}
+
+# Canonical values of standard columns; variant spellings in uploads are mapped to
+# them. Columns listed without values only get their own variants merged.
+value_vocabulary = {
+    "Category": ["Clothing", "Footwear", "Accessories", "Electronics"],
+    "Gender": ["Male", "Female"],
+    "Store Size": ["Small", "Medium", "Large"],
+    "Region/Zone": ["North", "South", "East", "West"],
+    "Location": [],
+}
@@ -0,0 +1,89 @@
+import hashlib
+import os
+import pickle
+import tempfile
+
+
+class DiskCache:
+    """
+    A directory of pickled entries that survives restarts.
+    Reads refresh an entry's modification time, and once the cache holds more
+    than max_entries entries or max_bytes bytes the least recently used ones
+    are evicted.
+    """
+
+    SUFFIX = '.pkl'
+
+    def __init__(self, directory, max_entries=256, max_bytes=None):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        name = hashlib.sha256(str(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, name + self.SUFFIX)
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return default
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # Corrupt or written by an incompatible version: treat as a miss
+            self.delete(key)
+            return default
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return value
+
+    def set(self, key, value):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self._path(key))
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self.evict()
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.SUFFIX):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(entries)
+
+    def evict(self):
+        """Remove least recently used entries until the cache is within its bounds."""
+        entries = self._entries()
+        total_bytes = sum(size for _, size, _ in entries)
+        while entries and (
+            len(entries) > self.max_entries
+            or (self.max_bytes is not None and total_bytes > self.max_bytes)
+        ):
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
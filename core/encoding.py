@@ -0,0 +1,170 @@
+import datetime
+import decimal
+import gzip
+import json
+import math
+import sys
+
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+# Responses smaller than this are not worth the CPU time of compressing.
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+def _default(obj):
+    """Convert numpy/pandas values the JSON encoders don't understand natively."""
+    # numpy/pandas objects can only exist once those modules are loaded, so
+    # look them up instead of importing them into every worker at startup
+    np = sys.modules.get('numpy')
+    pd = sys.modules.get('pandas')
+    if np is not None:
+        if isinstance(obj, np.integer):
+            return int(obj)
+        if isinstance(obj, np.floating):
+            value = float(obj)
+            return None if math.isnan(value) or math.isinf(value) else value
+        if isinstance(obj, np.bool_):
+            return bool(obj)
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        if isinstance(obj, np.datetime64):
+            return str(obj)
+    if pd is not None:
+        if obj is pd.NaT or obj is pd.NA:
+            return None
+        if isinstance(obj, pd.Interval):
+            return str(obj)
+        if isinstance(obj, pd.Series):
+            return obj.tolist()
+        if isinstance(obj, pd.DataFrame):
+            return obj.to_dict(orient='list')
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _is_numpy_scalar(value):
+    np = sys.modules.get('numpy')
+    return np is not None and isinstance(value, np.generic)
+
+
+def _native_key(key):
+    if isinstance(key, (str, int, float, bool)) or key is None:
+        return key
+    if _is_numpy_scalar(key):
+        return key.item()
+    return str(key)
+
+
+def _normalize(obj):
+    """Recursively coerce keys and containers into plain Python structures."""
+    if isinstance(obj, dict):
+        return {_native_key(key): _normalize(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_normalize(value) for value in obj]
+    return obj
+
+
+def dumps(obj) -> bytes:
+    """
+    Serialize a dashboard payload to compact JSON bytes.
+    Uses orjson when installed and falls back to the standard library encoder.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+        except TypeError:
+            # orjson rejects numpy scalars and other exotic types as dict keys
+            return orjson.dumps(_normalize(obj), default=_default, option=ORJSON_OPTIONS)
+    return json.dumps(_normalize(obj), default=_default, separators=(',', ':')).encode('utf-8')
+
+
+def _is_scalar(value):
+    return value is None or isinstance(value, (str, int, float, bool)) or _is_numpy_scalar(value)
+
+
+def to_columnar(value):
+    """
+    Convert series-shaped data to a columnar layout.
+    Flat mappings become {"labels": [...], "values": [...]} and lists of records
+    become a mapping of column name to value list. Anything else is returned untouched.
+    """
+    if isinstance(value, dict) and value and all(_is_scalar(v) for v in value.values()):
+        return {'labels': list(value.keys()), 'values': list(value.values())}
+    if isinstance(value, list) and value and all(isinstance(row, dict) for row in value):
+        columns = list(value[0].keys())
+        return {column: [row.get(column) for row in value] for column in columns}
+    return value
+
+
+def columnar_graphs(graphs):
+    """Apply the columnar layout to every series-shaped graph in a graphs payload."""
+    return {key: to_columnar(value) for key, value in graphs.items()}
+
+
+def wants_columnar(request):
+    return (request.GET.get('layout') or request.headers.get('X-Payload-Layout', '')).lower() == 'columnar'
+
+
+class FastJsonResponse(HttpResponse):
+    """
+    An HttpResponse that encodes its payload with the fast encoder in this module.
+    Drop-in replacement for JsonResponse on the large dashboard payloads.
+    """
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
+
+
+def _accepted_encodings(accept_encoding):
+    encodings = {}
+    for part in accept_encoding.split(','):
+        token, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if token:
+            encodings[token.strip().lower()] = quality
+    return encodings
+
+
+def negotiate_encoding(accept_encoding):
+    """Pick the best supported content-coding from an Accept-Encoding header."""
+    encodings = _accepted_encodings(accept_encoding or '')
+    candidates = (['br'] if brotli is not None else []) + ['gzip']
+    best, best_quality = None, 0.0
+    for encoding in candidates:
+        quality = encodings.get(encoding, encodings.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(content: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=GZIP_LEVEL)
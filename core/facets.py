@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+from .data_filter import date_bounds
+from .sampling import SAMPLE_WEIGHT, is_sampled
+
+# Facet name -> (column, the filter on that dimension)
+FACETS = {
+    'category': ('Category', 'category'),
+    'location': ('Location', 'location'),
+    'age_bins': ('Age_bins', 'age_range'),
+    'rating': ('Review Rating', 'rating_range'),
+}
+
+# Filters that select one value, and inclusive [low, high] range filters, by column
+VALUE_FILTERS = {'category': 'Category', 'location': 'Location'}
+RANGE_FILTERS = {'age_range': 'Age', 'rating_range': 'Review Rating'}
+
+DATE_FILTER = 'date'
+
+
+class FacetIndex:
+    """
+    Per-value row sets of every filterable dimension, as one integer value code
+    per row. The counts for a filter set take one mask per active filter and one
+    bincount per facet, rather than a DataFilter run per facet value.
+    Each facet leaves out its own filter (the usual faceted-search semantics),
+    so it counts what picking another value of that dimension would leave.
+    """
+
+    def __init__(self, frame):
+        self.size = len(frame)
+        # A sample's counts are scaled up to the full data
+        self.weights = frame[SAMPLE_WEIGHT].to_numpy(dtype=np.float64) if is_sampled(frame) else None
+
+        self.values = {}
+        for name, (column, _) in FACETS.items():
+            if column not in frame.columns:
+                continue
+            values = frame[column]
+            if name == 'rating':
+                # Imputed ratings are fractional; one decimal keeps the facet short
+                values = values.round(1)
+            codes, labels = pd.factorize(values, sort=True)
+            self.values[column] = (codes, pd.Index(labels))
+
+        self.numbers = {
+            column: frame[column].to_numpy(dtype=np.float64)
+            for column in RANGE_FILTERS.values() if column in frame.columns
+        }
+        self.dates = pd.to_datetime(frame['Date']).to_numpy() if 'Date' in frame.columns else None
+
+    def _masks(self, filters):
+        """A row mask per active filter; filters on missing columns are ignored."""
+        masks = {}
+        for key, column in VALUE_FILTERS.items():
+            if filters.get(key) and column in self.values:
+                codes, labels = self.values[column]
+                position = labels.get_indexer([filters[key]])[0]
+                masks[key] = codes == position if position >= 0 else np.zeros(self.size, dtype=bool)
+        for key, column in RANGE_FILTERS.items():
+            if filters.get(key) and column in self.numbers:
+                low, high = (float(bound) for bound in filters[key])
+                values = self.numbers[column]
+                masks[key] = (values >= low) & (values <= high)
+        if filters.get('start_date') and filters.get('end_date') and self.dates is not None:
+            start, end = date_bounds(filters['start_date'], filters['end_date'])
+            masks[DATE_FILTER] = (self.dates >= start.to_datetime64()) & (self.dates < end.to_datetime64())
+        return masks
+
+    def _count(self, mask):
+        if self.weights is None:
+            return int(mask.sum()) if mask is not None else self.size
+        return int(round(self.weights[mask].sum() if mask is not None else self.weights.sum()))
+
+    def counts(self, filters):
+        """
+        Rows matching all filters ('total') and, per facet, the rows per value
+        under every filter but that facet's own. Values that would match nothing
+        are listed with zero.
+        """
+        masks = self._masks(filters or {})
+        result = {'total': self._count(_combine(masks.values())), 'facets': {}}
+        for name, (column, own_filter) in FACETS.items():
+            if column not in self.values:
+                continue
+            codes, labels = self.values[column]
+            mask = _combine(mask for key, mask in masks.items() if key != own_filter)
+            if mask is not None:
+                codes = codes[mask]
+            weights = None
+            if self.weights is not None:
+                weights = self.weights if mask is None else self.weights[mask]
+            present = codes >= 0
+            totals = np.bincount(
+                codes[present], weights=None if weights is None else weights[present], minlength=len(labels),
+            )
+            result['facets'][name] = {
+                str(label): int(round(total)) for label, total in zip(labels, totals)
+            }
+        return result
+
+
+def _combine(masks):
+    """AND masks together; None means no filter, i.e. every row."""
+    combined = None
+    for mask in masks:
+        combined = mask if combined is None else combined & mask
+    return combined
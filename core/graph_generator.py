@@ -2,14 +2,28 @@ import numpy as np
 import pandas as pd
 from itertools import combinations
 from collections import defaultdict
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
-from mlxtend.frequent_patterns import apriori, association_rules
 import datetime
 
+from .progress import NULL_PROGRESS
+from .query_backends import PandasBackend
+
+# sklearn and mlxtend are imported by the graphs that use them so importing
+# this module stays cheap.
+
 class GraphGenerator:
-    def __init__(self, data):
-        self.data = data.copy()  # Use a copy to prevent modifying the original DataFrame
+    def __init__(self, data, sketches=None, rollup=None):
+        if isinstance(data, pd.DataFrame):
+            self.data = data.copy()  # Use a copy to prevent modifying the original DataFrame
+            self.backend = PandasBackend(self.data)
+        else:
+            # A query backend (see query_backends); the rows are never loaded
+            self.data = None
+            self.backend = data
+        self.current_graph = None
+        # Optional SketchSet for this exact slice of the data; saves full-column scans
+        self.sketches = sketches
+        # Optional rollup filtered to this slice; answers the sum/count graphs without the rows
+        self.rollup = rollup
 
         self.required_labels = {
             "process_age": ['Age', 'Customer_ID'],
@@ -38,31 +52,43 @@ class GraphGenerator:
         }
 
     def _check_required_labels(self, labels):
-        missing = [label for label in labels if label not in self.data.columns]
+        missing = [label for label in labels if label not in self.backend.columns]
         if missing:
             print(f"Missing columns: {missing}")
             return False
         return True
 
     def _group_sum(self, group_by_column, sum_column):
-        return self.data.groupby(group_by_column, observed=False)[sum_column].sum().to_dict()
+        return self.backend.group_sum(group_by_column, sum_column)
 
     def _value_counts(self, column, normalize=False, bins=None):
         if bins:
-            return self.data[column].value_counts(bins=bins, sort=False).to_dict()
-        if normalize:
-            return (self.data[column].value_counts(normalize=True) * 100).to_dict()
-        return self.data[column].value_counts().to_dict()
+            return self._histogram(column, bins)
+        return self.backend.value_counts(column, normalize=normalize)
+
+    def _histogram(self, column, bins, labels=None):
+        return self.backend.histogram(column, bins, labels=labels)
+
+    def _top_n(self, group_by_column, sum_column, n):
+        return self.backend.top_n(group_by_column, sum_column, n)
+
+    def _aggregate(self, by, aggregations):
+        return self.backend.aggregate(by, aggregations)
+
+    def _count(self, column):
+        return self.backend.count(column)
 
     def process_age(self):
         """Bin age into categories and return distribution."""
         if not self._check_required_labels(self.required_labels["process_age"]):
             return None
-        min_age, max_age = self.data['Age'].min(), self.data['Age'].max()
+        if self.sketches is not None and 'Age' in self.sketches.quantiles:
+            min_age, max_age = self.sketches.quantiles['Age'].min, self.sketches.quantiles['Age'].max
+        else:
+            min_age, max_age = self.backend.minmax('Age')
         bins = np.linspace(min_age, max_age, 6)  # 5 bins
         labels = [f'{int(bins[i])}-{int(bins[i+1])-1}' for i in range(len(bins) - 1)]
-        self.data['Age_Binned_Calculated'] = pd.cut(self.data['Age'], bins=bins, labels=labels, include_lowest=True)
-        return self.data['Age_Binned_Calculated'].value_counts().sort_index().to_dict()
+        return self._histogram('Age', bins, labels=labels)
 
     def generate_peak_purchase_hours(self):
         """Return the count of purchases per hour."""
@@ -108,15 +134,14 @@ class GraphGenerator:
         """Return top N selling products based on purchase amount."""
         if not self._check_required_labels(self.required_labels["generate_top_selling_products"]):
             return None
-        top_selling = self.data.groupby('Product_id')['Purchase Amount (USD)'].sum().nlargest(top_n)
-        return top_selling.to_dict()
+        return self._top_n('Product_id', 'Purchase Amount (USD)', top_n)
 
     def generate_clv_distribution(self, bins=10):
         """Calculate Customer Lifetime Value (CLV) and return its distribution."""
         if not self._check_required_labels(self.required_labels["generate_clv_distribution"]):
             return None
         # Assuming CLV = Previous Purchases * Frequency
-        self.data['CLV'] = self.data['Previous Purchases'] * self.data['Frequency']
+        self.backend = self.backend.derive_product('CLV', 'Previous Purchases', 'Frequency')
         clv_distribution = self._value_counts('CLV', bins=bins)
         return {str(interval): count for interval, count in clv_distribution.items()}
 
@@ -124,7 +149,7 @@ class GraphGenerator:
         """Return Recency vs Frequency data."""
         if not self._check_required_labels(self.required_labels["generate_visit_vs_purchase_frequency"]):
             return None
-        visit_purchase = self.data[['Recency', 'Frequency']].dropna()
+        visit_purchase = self.backend.select(['Recency', 'Frequency'], dropna=True)
         return visit_purchase.to_dict(orient='list')
 
     def generate_cross_sell_upsell_opportunities(self):
@@ -132,17 +157,20 @@ class GraphGenerator:
         if not self._check_required_labels(self.required_labels["generate_cross_sell_upsell_opportunities"]):
             return None
 
-        category_pairs = defaultdict(lambda: {"total": 0.0, "contributions": {}})
-        grouped = self.data.groupby('Customer_ID')
+        # What each customer spent per category, in one aggregation instead of a scan per customer
+        amounts = self.backend.aggregate(['Customer_ID', 'Category'], {'amount': ('Purchase Amount (USD)', 'sum')})['amount']
+        spent_by_customer = defaultdict(dict)
+        for (customer_id, category), amount in amounts.items():
+            spent_by_customer[customer_id][category] = amount
 
-        for customer_id, group in grouped:
-            categories = group['Category'].unique()
-            if len(categories) < 2:
+        category_pairs = defaultdict(lambda: {"total": 0.0, "contributions": {}})
+        for customer_id, spent in spent_by_customer.items():
+            if len(spent) < 2:
                 continue
-            for cat1, cat2 in combinations(sorted(categories), 2):
+            for cat1, cat2 in combinations(sorted(spent), 2):
                 pair = f"{cat1} & {cat2}"
-                cat1_amount = group[group['Category'] == cat1]['Purchase Amount (USD)'].sum()
-                cat2_amount = group[group['Category'] == cat2]['Purchase Amount (USD)'].sum()
+                cat1_amount = spent[cat1]
+                cat2_amount = spent[cat2]
                 total_amount = cat1_amount + cat2_amount
                 
                 category_pairs[pair]["total"] += total_amount
@@ -198,13 +226,16 @@ class GraphGenerator:
 
     def generate_rfm_segments(self, n_clusters=5):
         """Generate RFM segments using clustering."""
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.cluster import KMeans
+
         if not self._check_required_labels(self.required_labels["generate_rfm_segments"]):
             return None
 
-        rfm = self.data.groupby('Customer_ID').agg({
-            'Recency': 'min',  # Assuming lower recency is better
-            'Frequency': 'sum',
-            'Monetary': 'sum'
+        rfm = self.backend.aggregate('Customer_ID', {
+            'Recency': ('Recency', 'min'),  # Assuming lower recency is better
+            'Frequency': ('Frequency', 'sum'),
+            'Monetary': ('Monetary', 'sum')
         }).reset_index()
 
         scaler = StandardScaler()
@@ -213,14 +244,13 @@ class GraphGenerator:
         kmeans = KMeans(n_clusters=n_clusters, random_state=42)
         rfm['Segment'] = kmeans.fit_predict(rfm_scaled)
 
-        # Merge segments back to main data if needed
-        self.data = self.data.merge(rfm[['Customer_ID', 'Segment']], on='Customer_ID', how='left')
-
         # Return segment counts
         return rfm['Segment'].value_counts().to_dict()
 
     def generate_basket_analysis(self, min_support=0.01, min_confidence=0.5):
         """Perform basket analysis to find product associations."""
+        from mlxtend.frequent_patterns import apriori, association_rules
+
         if not self._check_required_labels(self.required_labels["generate_basket_analysis"]):
             return None
 
@@ -233,32 +263,65 @@ class GraphGenerator:
         # Convert to dictionary or another suitable format
         return rules.to_dict(orient='records')
 
+    def _flag_churned_customers(self, reference_date, period_days):
+        last_purchase = self.data.groupby('Customer_ID')['Date'].transform('max')
+        self.data['Churned'] = (reference_date - last_purchase).dt.days > period_days
+
+    def _mode_by_customer(self, frame, column):
+        """Most frequent value of column per customer, ties broken by the smallest value."""
+        if column not in frame.columns:
+            return pd.Series('Unknown', index=frame['Customer_ID'].unique())
+        counts = frame.groupby(['Customer_ID', column], observed=True).size()
+        return counts.groupby(level=0).idxmax().map(lambda key: key[1])
+
     def identify_churned_customers(self, reference_date, period_days=90):
         """Flag customers who haven't made a purchase in the last 'period_days'."""
         if not self._check_required_labels(self.required_labels["identify_churned_customers"]):
             return None
-        last_purchase = self.data.groupby('Customer_ID')['Date'].max()
-        self.data['Churned'] = self.data['Customer_ID'].apply(
-            lambda x: (reference_date - last_purchase[x]).days > period_days
-        )
-        churned_counts = self.data['Churned'].value_counts().to_dict()
-        churned_info = {
-            "churned_customers": self.data[self.data['Churned']]['Customer_ID'].unique().tolist(),
-            "churned_locations": self.data[self.data['Churned']].groupby('Customer_ID')['Location'].agg(lambda x: x.mode().iloc[0] if not x.mode().empty else 'Unknown').tolist() if 'Location' in self.data.columns else ['Unknown'] * len(self.data[self.data['Churned']]['Customer_ID'].unique()),
-            "churned_regions": self.data[self.data['Churned']].groupby('Customer_ID')['Region/Zone'].agg(lambda x: x.mode().iloc[0] if not x.mode().empty else 'Unknown').tolist() if 'Region/Zone' in self.data.columns else ['Unknown'] * len(self.data[self.data['Churned']]['Customer_ID'].unique())
-        }
-        churned_info["zipped_data"] = list(zip(churned_info["churned_customers"], churned_info["churned_locations"], churned_info["churned_regions"]))
+        customers = self.backend.aggregate('Customer_ID', {
+            'last_purchase': ('Date', 'max'),
+            'rows': ('Date', 'size'),
+        })
+        churned = (reference_date - customers['last_purchase']).dt.days > period_days
+        churned_rows = int(customers.loc[churned, 'rows'].sum())
+        # Transactions of churned customers against the rest, as counted per row
+        churned_counts = pd.Series({True: churned_rows, False: self.backend.row_count() - churned_rows})
+        churned_counts = churned_counts[churned_counts > 0].sort_values(ascending=False, kind='stable')
+        # Only the summary travels with the dashboard; the full list is paginated separately
         return {
             "churned_counts": {str(k): v for k, v in churned_counts.items()},
-            "churned_customers": churned_info
+            "churned_total": int(churned.sum())
         }
-    
+
+    def list_churned_customers(self, reference_date, period_days=90):
+        """Return one record per churned customer with their usual location and region."""
+        if not self._check_required_labels(self.required_labels["identify_churned_customers"]):
+            return []
+        self._flag_churned_customers(reference_date, period_days)
+        churned = self.data[self.data['Churned']]
+        locations = self._mode_by_customer(churned, 'Location')
+        regions = self._mode_by_customer(churned, 'Region/Zone')
+        return [
+            {"customer_id": customer_id, "location": locations.get(customer_id, 'Unknown'), "region": regions.get(customer_id, 'Unknown')}
+            for customer_id in sorted(churned['Customer_ID'].unique())
+        ]
+
+    def list_basket_rules(self, min_support=0.01, min_confidence=0.5):
+        """Return association rules with item sets as sorted lists."""
+        rules = self.generate_basket_analysis(min_support=min_support, min_confidence=min_confidence) or []
+        for rule in rules:
+            rule['antecedents'] = sorted(rule['antecedents'])
+            rule['consequents'] = sorted(rule['consequents'])
+        return rules
+
     def analyze_discount_impact(self):
         """Analyze how discounts affect purchase amounts."""
         if not self._check_required_labels(self.required_labels["analyze_discount_impact"]):
             return None
-        impact = self.data.groupby('Discount')['Purchase Amount (USD)'].agg(['mean', 'sum', 'count'])
-        impact['conversion_rate'] = impact['count'] / self.data['Purchase Amount (USD)'].count()
+        impact = self._aggregate('Discount', {
+            aggregation: ('Purchase Amount (USD)', aggregation) for aggregation in ('mean', 'sum', 'count')
+        })
+        impact['conversion_rate'] = impact['count'] / self._count('Purchase Amount (USD)')
         return impact.to_dict(orient='index')
     
     def generate_sales_by_day(self):
@@ -278,11 +341,13 @@ class GraphGenerator:
         }
 
         # Convert numeric days to day names
-        if self.data['Day_of_Week'].dtype == 'int64':
-            self.data['Day_of_Week'] = self.data['Day'].map(day_mapping)
+        if self.backend.is_integer('Day_of_Week'):
+            self.backend = self.backend.derive_mapped('Day_of_Week', 'Day', day_mapping)
 
         # Calculate average sales per day
-        daily_sales = self.data.groupby('Day_of_Week')['Purchase Amount (USD)'].agg(['sum', 'mean']).round(2)
+        daily_sales = self._aggregate('Day_of_Week', {
+            aggregation: ('Purchase Amount (USD)', aggregation) for aggregation in ('sum', 'mean')
+        }).round(2)
         
         # Create result dictionary with both total and average sales
         result = {
@@ -294,33 +359,63 @@ class GraphGenerator:
         }
         return result
 
-    def generate_graphs(self):
-        """Generate all available graphs."""
-        current_date = datetime.datetime.now()
+    def _graph_methods(self, current_date):
+        methods = {
+            "age_distribution": self.process_age,
+            "gender_distribution": self.generate_gender_distribution,
+            "sales_by_category": self.generate_sales_by_category,
+            "sales_by_location": self.generate_sales_by_location,
+            "sales_by_season": self.generate_sales_by_season,
+            "sales_by_store": self.generate_sales_by_store,
+            "sales_by_region": self.generate_sales_by_region,
+            "sales_by_month": self.generate_sales_by_month,
+            "sales_by_store_size": self.generate_sales_by_store_size,
+            "sales_by_year": self.generate_sales_by_year,
+            "sales_by_age_bins": self.generate_sales_by_age_bins,
+            "peak_purchase_hours": self.generate_peak_purchase_hours,
+            "promo_code_usage": self.generate_promo_code_usage,
+            "top_selling_products": self.generate_top_selling_products,
+            "clv_distribution": self.generate_clv_distribution,
+            "visit_vs_purchase_frequency": self.generate_visit_vs_purchase_frequency,
+            "cross_sell_upsell_opportunities": self.generate_cross_sell_upsell_opportunities,
+            "discount_histogram": self.generate_discount_histogram,
+            "rfm_segments": self.generate_rfm_segments,
+            "churned_customers": lambda: self.identify_churned_customers(reference_date=current_date),
+            "discount_impact": self.analyze_discount_impact,
+            "sales_by_day": self.generate_sales_by_day,
+            # "basket_analysis": self.generate_basket_analysis,
+        }
+        if self.rollup is not None:
+            methods.update(self._rollup_methods())
+        return methods
 
+    def _rollup_methods(self):
+        from .rollups import RollupGraphs
+
+        rollup_graphs = RollupGraphs(self.rollup)
         graphs = {
-            "age_distribution": self.process_age(),
-            "gender_distribution": self.generate_gender_distribution(),
-            "sales_by_category": self.generate_sales_by_category(),
-            "sales_by_location": self.generate_sales_by_location(),
-            "sales_by_season": self.generate_sales_by_season(),
-            "sales_by_store": self.generate_sales_by_store(),
-            "sales_by_region": self.generate_sales_by_region(),
-            "sales_by_month": self.generate_sales_by_month(),
-            "sales_by_store_size": self.generate_sales_by_store_size(),
-            "sales_by_year": self.generate_sales_by_year(),
-            "sales_by_age_bins": self.generate_sales_by_age_bins(),
-            "peak_purchase_hours": self.generate_peak_purchase_hours(),
-            "promo_code_usage": self.generate_promo_code_usage(),
-            "top_selling_products": self.generate_top_selling_products(),
-            "clv_distribution": self.generate_clv_distribution(),
-            "visit_vs_purchase_frequency": self.generate_visit_vs_purchase_frequency(),
-            "cross_sell_upsell_opportunities": self.generate_cross_sell_upsell_opportunities(),
-            "discount_histogram": self.generate_discount_histogram(),
-            "rfm_segments": self.generate_rfm_segments(), 
-            "churned_customers": self.identify_churned_customers(reference_date=current_date),
-            "discount_impact": self.analyze_discount_impact(),
-            "sales_by_day": self.generate_sales_by_day(),
-            # "basket_analysis":self.generate_basket_analysis(),
+            "sales_by_category": ("sales_by_category", rollup_graphs.sales_by_category),
+            "sales_by_location": ("sales_by_location", rollup_graphs.sales_by_location),
+            "sales_by_season": ("sales_by_season", rollup_graphs.sales_by_season),
+            "sales_by_month": ("generate_sales_by_month", rollup_graphs.sales_by_month),
+            "peak_purchase_hours": ("generate_peak_purchase_hours", rollup_graphs.peak_purchase_hours),
+            "sales_by_day": ("generate_sales_by_day", rollup_graphs.sales_by_day),
+        }
+        # Same availability as the row-based graphs: only when the source columns exist
+        return {
+            name: method for name, (labels, method) in graphs.items()
+            if all(label in self.backend.columns for label in self.required_labels[labels])
         }
+
+    def generate_graphs(self, progress=NULL_PROGRESS):
+        """Generate all available graphs, reporting each one to `progress`."""
+        current_date = datetime.datetime.now()
+
+        graphs = {}
+        for name, method in self._graph_methods(current_date).items():
+            # Lets subclasses attribute primitive calls to the graph being built
+            self.current_graph = name
+            graphs[name] = method()
+            progress.stage('chart', rows=self.backend.row_count(), chart=name)
+        self.current_graph = None
         return {key: value for key, value in graphs.items() if value is not None}
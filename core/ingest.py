@@ -0,0 +1,272 @@
+import gzip
+import io
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from importlib.util import find_spec
+
+import pandas as pd
+
+# zstandard, pyarrow and openpyxl are optional; each is only needed for the
+# inputs that use it
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+ZIP_MAGIC = b'PK\x03\x04'
+PARQUET_MAGIC = b'PAR1'
+XLS_MAGIC = b'\xd0\xcf\x11\xe0'
+UTF8_BOM = b'\xef\xbb\xbf'
+
+# Zip members read as parts; each may itself be gzip or zstd compressed
+PART_SUFFIXES = tuple(
+    name + compression
+    for name in ('.csv', '.jsonl', '.ndjson')
+    for compression in ('', '.gz', '.zst')
+)
+
+# Arrow's CSV reader parses blocks on all cores; the C parser is the fallback
+CSV_ENGINE = 'pyarrow' if find_spec('pyarrow') else 'c'
+
+
+def _sniff(file_path, size=4):
+    with open(file_path, 'rb') as f:
+        return f.read(size)
+
+
+def detect_format(file_path):
+    """
+    What kind of upload a file is: 'parquet', 'excel' or 'text' (CSV or JSONL
+    parts, plain or compressed). Decided from the content, not the name.
+    """
+    head = _sniff(file_path)
+    if head.startswith(PARQUET_MAGIC):
+        return 'parquet'
+    if head.startswith(XLS_MAGIC):
+        return 'excel'
+    if head.startswith(ZIP_MAGIC):
+        with zipfile.ZipFile(file_path) as archive:
+            if 'xl/workbook.xml' in archive.namelist():
+                return 'excel'
+    return 'text'
+
+
+def _decompressed(raw):
+    """Wrap a binary stream so reads return decompressed bytes, one buffer at a time."""
+    head = raw.peek(4)[:4]
+    if head.startswith(GZIP_MAGIC):
+        return gzip.GzipFile(fileobj=raw, mode='rb')
+    if head.startswith(ZSTD_MAGIC):
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("zstd compressed uploads need the 'zstandard' package")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw))
+    return raw
+
+
+def _is_jsonl(stream):
+    # JSON Lines records are objects, and no CSV header starts with '{'
+    return stream.peek(64).removeprefix(UTF8_BOM).lstrip()[:1] == b'{'
+
+
+def list_parts(file_path):
+    """
+    The CSV/JSONL members of a zip upload in name order, or [None] for a
+    single (plain, gzip or zstd) file.
+    """
+    if not _sniff(file_path).startswith(ZIP_MAGIC):
+        return [None]
+    with zipfile.ZipFile(file_path) as archive:
+        parts = sorted(
+            info.filename for info in archive.infolist()
+            if not info.is_dir()
+            and not os.path.basename(info.filename).startswith(('.', '__'))
+            and info.filename.lower().endswith(PART_SUFFIXES)
+        )
+    if not parts:
+        raise ValueError("The zip archive holds no CSV or JSONL files")
+    return parts
+
+
+@contextmanager
+def open_part(file_path, part=None):
+    """Open one part of an upload as a stream of decompressed bytes."""
+    with ExitStack() as stack:
+        if part is None:
+            raw = stack.enter_context(open(file_path, 'rb'))
+        else:
+            # Every part gets its own archive handle so parts can be read concurrently
+            archive = stack.enter_context(zipfile.ZipFile(file_path))
+            raw = stack.enter_context(archive.open(part))
+        stream = _decompressed(raw)
+        if stream is not raw:
+            stack.enter_context(stream)
+        yield stream
+
+
+def uncompressed_size(file_path):
+    """
+    Estimate the CSV bytes behind an upload, so size thresholds mean the same
+    for compressed and plain files.
+    """
+    size = os.path.getsize(file_path)
+    if detect_format(file_path) != 'text':
+        return size
+    head = _sniff(file_path)
+    if head.startswith(ZIP_MAGIC):
+        with zipfile.ZipFile(file_path) as archive:
+            return sum(archive.getinfo(part).file_size for part in list_parts(file_path))
+    if head.startswith(GZIP_MAGIC):
+        # The trailer holds the size modulo 2**32, so it is a lower bound for huge files
+        with open(file_path, 'rb') as f:
+            f.seek(-4, os.SEEK_END)
+            return max(int.from_bytes(f.read(4), 'little'), size)
+    if head.startswith(ZSTD_MAGIC):
+        try:
+            import zstandard
+        except ImportError:
+            return size
+        with open(file_path, 'rb') as f:
+            content_size = zstandard.frame_content_size(f.read(18))
+        return content_size if content_size > 0 else size
+    return size
+
+
+def _optional(reader, package, *args, **kwargs):
+    try:
+        return reader(*args, **kwargs)
+    except ImportError:
+        raise ValueError(f"Reading this upload needs the '{package}' package")
+
+
+def read_header(file_path):
+    """Column names of an upload, taken from its first part."""
+    upload_format = detect_format(file_path)
+    if upload_format == 'parquet':
+        return pd.Index(_optional(_parquet_schema, 'pyarrow', file_path))
+    if upload_format == 'excel':
+        return _optional(pd.read_excel, 'openpyxl', file_path, nrows=0).columns
+    with open_part(file_path, list_parts(file_path)[0]) as stream:
+        if _is_jsonl(stream):
+            # Records may leave keys out, so look past the first one
+            return pd.read_json(stream, lines=True, nrows=1000).columns
+        return pd.read_csv(stream, nrows=0).columns
+
+
+def _parquet_schema(file_path):
+    import pyarrow.parquet as pq
+
+    return pq.read_schema(file_path).names
+
+
+def _read_text(stream, usecols=None, dtype=None, chunksize=None):
+    """Parse one CSV or JSONL stream, keeping `usecols` and applying `dtype` hints."""
+    if _is_jsonl(stream):
+        frames = pd.read_json(stream, lines=True, chunksize=chunksize)
+        if chunksize is None:
+            return _project(frames, usecols, dtype)
+        return (_project(frame, usecols, dtype) for frame in frames)
+    if chunksize is None:
+        return pd.read_csv(stream, usecols=usecols, dtype=dtype, engine=CSV_ENGINE)
+    # Arrow's reader has no chunked mode
+    return pd.read_csv(stream, usecols=usecols, dtype=dtype, chunksize=chunksize)
+
+
+def _project(frame, usecols=None, dtype=None):
+    """Apply the parse options to a frame whose format could not take them while parsing."""
+    if usecols is not None:
+        frame = frame[[column for column in frame.columns if column in set(usecols)]]
+    if dtype:
+        frame = frame.astype({column: kind for column, kind in dtype.items() if column in frame.columns})
+    return frame
+
+
+def parse_options(columns, synonym_dict, dtype_dict=None):
+    """
+    The columns synonym_mapping will keep out of `columns`, and dtype hints for
+    them keyed by the raw names, so everything else is never parsed.
+    """
+    from .preprocessing import match_columns
+
+    standardized, _ = match_columns(columns, synonym_dict)
+    usecols = [column for column in columns if column in standardized]
+    dtype = {
+        column: dtype_dict[standardized[column]]
+        for column in usecols if standardized[column] in (dtype_dict or {})
+    }
+    return usecols, dtype
+
+
+def iter_chunks(file_path, chunksize, usecols=None):
+    """Stream an upload as DataFrame chunks, part after part."""
+    upload_format = detect_format(file_path)
+    if upload_format == 'parquet':
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunksize, columns=usecols):
+            yield batch.to_pandas()
+        return
+    if upload_format == 'excel':
+        # Workbooks can't be read incrementally
+        frame = _optional(pd.read_excel, 'openpyxl', file_path, usecols=usecols)
+        for start in range(0, len(frame), chunksize):
+            yield frame.iloc[start:start + chunksize]
+        return
+    for part in list_parts(file_path):
+        with open_part(file_path, part) as stream:
+            yield from _read_text(stream, usecols=usecols, chunksize=chunksize)
+
+
+def _read_frame(file_path, upload_format, usecols=None, dtype=None):
+    if upload_format == 'parquet':
+        frame = _optional(pd.read_parquet, 'pyarrow', file_path, columns=usecols)
+        return _project(frame, dtype=dtype)
+    return _optional(pd.read_excel, 'openpyxl', file_path, usecols=usecols, dtype=dtype)
+
+
+def read_upload(file_path, workers=4, synonym_dict=None, dtype_dict=None):
+    """
+    Read a CSV, JSONL, Parquet or Excel upload into one frame. CSV and JSONL
+    may be gzip or zstd compressed, or be parts of a zip archive.
+    Parts are decompressed as they are parsed, in parallel threads, and must
+    share the same columns. With a synonym_dict only the columns it maps are
+    read, typed by dtype_dict where given.
+    """
+    usecols = dtype = None
+    if synonym_dict is not None:
+        usecols, dtype = parse_options(list(read_header(file_path)), synonym_dict, dtype_dict)
+
+    def parse(read):
+        try:
+            return read(usecols, dtype)
+        except (ValueError, TypeError):
+            if not dtype:
+                raise
+            # A hint didn't fit the data (say, text in an amount column): infer instead
+            return read(usecols, None)
+
+    upload_format = detect_format(file_path)
+    if upload_format != 'text':
+        return parse(lambda usecols, dtype: _read_frame(file_path, upload_format, usecols, dtype))
+
+    parts = list_parts(file_path)
+
+    def read_part(part):
+        def read(usecols, dtype):
+            with open_part(file_path, part) as stream:
+                return _read_text(stream, usecols=usecols, dtype=dtype)
+        return parse(read)
+
+    if len(parts) == 1:
+        return read_part(parts[0])
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(parts)))) as pool:
+        frames = list(pool.map(read_part, parts))
+
+    columns = set(frames[0].columns)
+    for part, frame in zip(parts[1:], frames[1:]):
+        if set(frame.columns) != columns:
+            raise ValueError(f"'{part}' does not have the same columns as '{parts[0]}'")
+    # Empty parts parse every column as object and would widen the dtypes of the rest
+    frames = [frame for frame in frames if not frame.empty] or frames[:1]
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,77 @@
+import os
+import re
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_MODULES = [
+    'core.views',
+    'core.preprocessing',
+    'core.graph_generator',
+    'core.models_ai',
+    'core.report_generator',
+]
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+# Runs in a fresh interpreter so nothing is already cached in sys.modules
+PROBE = """
+import resource, sys, django
+django.setup()
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+import {module}
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(before, after)
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Report the import cost of modules in a fresh interpreter: wall time, "
+        "the slowest transitive imports and the resident memory they add."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES,
+                            help="Dotted module paths to profile (defaults to the core app modules).")
+        parser.add_argument('--top', type=int, default=10,
+                            help="Number of most expensive transitive imports to list per module.")
+
+    def handle(self, *args, **options):
+        for module in options['modules']:
+            self._profile(module, options['top'])
+
+    def _profile(self, module, top):
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'pulse_ai.settings')
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROBE.format(module=module)],
+            capture_output=True, text=True, env=env,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Importing {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+
+        # Everything before the probe's own import belongs to Django setup
+        timings = [IMPORTTIME_LINE.match(line) for line in result.stderr.splitlines()]
+        timings = [match for match in timings if match]
+        target = next((i for i, match in enumerate(timings) if match.group(4) == module), None)
+        if target is None:
+            raise CommandError(f"No import timing found for {module}; was it already imported by settings?")
+        start = target
+        while start > 0 and len(timings[start - 1].group(3)) > len(timings[target].group(3)):
+            start -= 1
+
+        before_kb, after_kb = (int(value) for value in result.stdout.split())
+        cumulative_us = int(timings[target].group(2))
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{module}: {cumulative_us / 1000:.1f} ms, +{(after_kb - before_kb) / 1024:.1f} MiB max RSS"
+        ))
+
+        # Only packages imported directly by the module or at top level below it
+        children = [
+            match for match in timings[start:target]
+            if len(match.group(3)) <= len(timings[target].group(3)) + 2
+        ]
+        for match in sorted(children, key=lambda m: int(m.group(2)), reverse=True)[:top]:
+            self.stdout.write(f"  {int(match.group(2)) / 1000:9.1f} ms  {match.group(4)}")
@@ -0,0 +1,60 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.utils.cache import patch_vary_headers
+
+from .encoding import MIN_COMPRESS_SIZE, compress, negotiate_encoding
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli or gzip, whichever the client prefers.
+    Streaming responses are passed through untouched so NDJSON and event
+    streams are never buffered. Async-capable, so async views run on the
+    event loop; there the compression itself happens in a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self._passes_through(response):
+            return response
+        return await sync_to_async(self.process_response, thread_sensitive=False)(request, response)
+
+    @staticmethod
+    def _passes_through(response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return True
+        return len(response.content) < MIN_COMPRESS_SIZE
+
+    def process_response(self, request, response):
+        if self._passes_through(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.endswith('"') and not etag.startswith('W/'):
+            # Keep the validator strong by making it specific to this coding
+            response['ETag'] = f'{etag[:-1]}-{encoding}"'
+        return response
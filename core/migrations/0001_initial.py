@@ -0,0 +1,68 @@
+# Generated by Django 5.1.15 on 2026-10-19 13:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Dataset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=64, unique=True)),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('row_count', models.PositiveBigIntegerField(default=0)),
+                ('columns', models.JSONField(default=dict)),
+                ('is_active', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('activated_at', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Transaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('store_id', models.CharField(max_length=64, null=True)),
+                ('store_name', models.CharField(max_length=255, null=True)),
+                ('store_size', models.CharField(max_length=64, null=True)),
+                ('region', models.CharField(max_length=128, null=True)),
+                ('product_id', models.CharField(max_length=64, null=True)),
+                ('category', models.CharField(max_length=255, null=True)),
+                ('location', models.CharField(max_length=255, null=True)),
+                ('latitude', models.FloatField(null=True)),
+                ('longitude', models.FloatField(null=True)),
+                ('purchase_amount', models.FloatField(null=True)),
+                ('promo_code', models.FloatField(null=True)),
+                ('discount', models.FloatField(null=True)),
+                ('date', models.DateTimeField(null=True)),
+                ('previous_purchases', models.FloatField(null=True)),
+                ('age', models.FloatField(null=True)),
+                ('gender', models.CharField(max_length=32, null=True)),
+                ('review_rating', models.FloatField(null=True)),
+                ('customer_id', models.CharField(max_length=64, null=True)),
+                ('year', models.IntegerField(null=True)),
+                ('month', models.IntegerField(null=True)),
+                ('season', models.CharField(max_length=16, null=True)),
+                ('hour', models.IntegerField(null=True)),
+                ('day_of_week', models.CharField(max_length=16, null=True)),
+                ('week_of_year', models.IntegerField(null=True)),
+                ('quarter', models.IntegerField(null=True)),
+                ('is_weekend', models.BooleanField(null=True)),
+                ('age_bins', models.CharField(max_length=32, null=True)),
+                ('recency', models.FloatField(null=True)),
+                ('frequency', models.FloatField(null=True)),
+                ('monetary', models.FloatField(null=True)),
+                ('dataset', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='core.dataset')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['dataset', 'date', 'purchase_amount'], name='txn_dataset_date'), models.Index(fields=['dataset', 'category', 'date', 'purchase_amount'], name='txn_dataset_category'), models.Index(fields=['dataset', 'location', 'date', 'purchase_amount'], name='txn_dataset_location'), models.Index(fields=['dataset', 'customer_id', 'date'], name='txn_dataset_customer')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.15 on 2026-10-19 13:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('hour', models.SmallIntegerField()),
+                ('category', models.CharField(default='', max_length=255)),
+                ('location', models.CharField(default='', max_length=255)),
+                ('store_name', models.CharField(default='', max_length=255)),
+                ('sales', models.FloatField(default=0)),
+                ('transactions', models.PositiveIntegerField(default=0)),
+                ('dataset', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='core.dataset')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dataset', 'day', 'hour', 'category', 'location', 'store_name'), name='rollup_grain')],
+            },
+        ),
+    ]
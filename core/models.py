@@ -1,3 +1,95 @@
 from django.db import models
 
-# Create your models here.
+
+class Dataset(models.Model):
+    """An uploaded and processed dataset whose rows live in the Transaction table."""
+
+    version = models.CharField(max_length=64, unique=True)  # sha256 of the uploaded file
+    name = models.CharField(max_length=255, blank=True)
+    row_count = models.PositiveBigIntegerField(default=0)
+    # Processed frame columns stored for this dataset, with what is needed to restore their dtypes
+    columns = models.JSONField(default=dict)
+    is_active = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Workers reload when the active dataset was activated after their own data
+    activated_at = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return f"{self.name or self.version[:12]} ({self.row_count} rows)"
+
+
+class Transaction(models.Model):
+    """
+    One processed transaction row. Fields mirror the standardized column names
+    produced by DataPreprocessor; see storage.COLUMN_FIELDS for the mapping.
+    """
+
+    # Every index below leads with dataset, so the FK needs no index of its own
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='transactions', db_index=False)
+
+    store_id = models.CharField(max_length=64, null=True)
+    store_name = models.CharField(max_length=255, null=True)
+    store_size = models.CharField(max_length=64, null=True)
+    region = models.CharField(max_length=128, null=True)
+    product_id = models.CharField(max_length=64, null=True)
+    category = models.CharField(max_length=255, null=True)
+    location = models.CharField(max_length=255, null=True)
+    latitude = models.FloatField(null=True)
+    longitude = models.FloatField(null=True)
+    purchase_amount = models.FloatField(null=True)
+    promo_code = models.FloatField(null=True)
+    discount = models.FloatField(null=True)
+    date = models.DateTimeField(null=True)
+    previous_purchases = models.FloatField(null=True)
+    age = models.FloatField(null=True)
+    gender = models.CharField(max_length=32, null=True)
+    review_rating = models.FloatField(null=True)
+    customer_id = models.CharField(max_length=64, null=True)
+
+    # Derived by DataPreprocessor.process_dates / bin_data / calculate_rfm_metrics
+    year = models.IntegerField(null=True)
+    month = models.IntegerField(null=True)
+    season = models.CharField(max_length=16, null=True)
+    hour = models.IntegerField(null=True)
+    day_of_week = models.CharField(max_length=16, null=True)
+    week_of_year = models.IntegerField(null=True)
+    quarter = models.IntegerField(null=True)
+    is_weekend = models.BooleanField(null=True)
+    age_bins = models.CharField(max_length=32, null=True)
+    recency = models.FloatField(null=True)
+    frequency = models.FloatField(null=True)
+    monetary = models.FloatField(null=True)
+
+    class Meta:
+        indexes = [
+            # Trailing purchase_amount lets sales aggregations be answered from the index alone
+            models.Index(fields=['dataset', 'date', 'purchase_amount'], name='txn_dataset_date'),
+            models.Index(fields=['dataset', 'category', 'date', 'purchase_amount'], name='txn_dataset_category'),
+            models.Index(fields=['dataset', 'location', 'date', 'purchase_amount'], name='txn_dataset_location'),
+            models.Index(fields=['dataset', 'customer_id', 'date'], name='txn_dataset_customer'),
+        ]
+
+
+class SalesRollup(models.Model):
+    """
+    Sales and transaction counts per day x hour x category x location x store of a
+    dataset, kept up to date as transactions are loaded (see storage.refresh_rollup).
+    Missing dimension values are stored as '' so the unique key can be upserted.
+    """
+
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='rollups', db_index=False)
+    day = models.DateField()
+    hour = models.SmallIntegerField()
+    category = models.CharField(max_length=255, default='')
+    location = models.CharField(max_length=255, default='')
+    store_name = models.CharField(max_length=255, default='')
+    sales = models.FloatField(default=0)
+    transactions = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dataset', 'day', 'hour', 'category', 'location', 'store_name'],
+                name='rollup_grain',
+            ),
+        ]
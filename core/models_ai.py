@@ -4,31 +4,52 @@ from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import StandardScaler
 from datetime import datetime, timedelta
+import hashlib
+import json
+from .backtesting import walk_forward
+from .time_buckets import MISSING_CODE, bucket_sum, period_codes, period_starts
 
 class SalesPredictor:
-    def __init__(self, data):
+    FEATURES = ['TimeIndex', 'Month', 'Year']
+    TEST_SIZE = 0.2
+    RANDOM_STATE = 42
+
+    def __init__(self, data, granularity='month', n_bootstrap=1000, interval_level=0.95):
         self.data = data
+        self.granularity = granularity
+        self.n_bootstrap = n_bootstrap
+        self.interval_level = interval_level
         self.model = LinearRegression()
         self.scaler = StandardScaler()
+        self.prediction_interval = None
         
     def preprocess_data(self):
-        # Group by month and calculate total sales
-        monthly_sales = self.data.groupby(
-            self.data['Date'].dt.strftime('%Y-%m')
-        )['Purchase Amount (USD)'].sum().reset_index()
-        
+        """
+        Total sales per period at the predictor's granularity (day, week, month or quarter).
+        Periods are bucketed by integer codes and gaps are filled with zero-sales
+        periods, so TimeIndex counts elapsed periods. 'Month-Year' holds each
+        period's start whatever the granularity.
+        """
+        codes, sums = bucket_sum(self.data['Date'], self.data['Purchase Amount (USD)'], self.granularity)
+        starts = period_starts(codes, self.granularity)
+
+        monthly_sales = pd.DataFrame({
+            'Month-Year': starts,
+            'Purchase Amount (USD)': sums,
+        })
+        self.first_period = int(codes[0]) if len(codes) else 0
+
         # Create time-based features
-        monthly_sales['Month-Year'] = pd.to_datetime(monthly_sales['Date'])
-        monthly_sales['Month'] = monthly_sales['Month-Year'].dt.month
-        monthly_sales['Year'] = monthly_sales['Month-Year'].dt.year
-        monthly_sales['TimeIndex'] = range(len(monthly_sales))
-        
+        monthly_sales['Month'] = starts.month
+        monthly_sales['Year'] = starts.year
+        monthly_sales['TimeIndex'] = np.arange(len(monthly_sales))
+
         return monthly_sales
 
     def prepare_features(self, monthly_sales):
-        X = monthly_sales[['TimeIndex', 'Month', 'Year']].values
+        X = monthly_sales[self.FEATURES].values
         y = monthly_sales['Purchase Amount (USD)'].values
-        return train_test_split(X, y, test_size=0.2, random_state=42)
+        return train_test_split(X, y, test_size=self.TEST_SIZE, random_state=self.RANDOM_STATE)
 
     def train_model(self, X_train, y_train):
         X_train_scaled = self.scaler.fit_transform(X_train)
@@ -39,9 +60,8 @@ class SalesPredictor:
         X_train, X_test, y_train, y_test = self.prepare_features(monthly_sales)
         self.train_model(X_train, y_train)
         
-        # Prepare next month's features
-        last_date = monthly_sales['Month-Year'].iloc[-1]
-        next_month = last_date + pd.DateOffset(months=1)
+        # Prepare next period's features
+        next_month = period_starts([self.first_period + len(monthly_sales)], self.granularity)[0]
         
         next_month_features = np.array([[
             len(monthly_sales),
@@ -53,6 +73,12 @@ class SalesPredictor:
         next_month_features_scaled = self.scaler.transform(next_month_features)
         next_month_prediction = self.model.predict(next_month_features_scaled)[0]
         
+        # Bootstrap the same regression on the training points for an interval
+        _, draws = self._bootstrap_forecasts(
+            self._design_matrix(*X_train.T), y_train[:, None], self._design_matrix(*next_month_features.T)[0]
+        )
+        self.prediction_interval = self._interval(draws)[0]
+
         # Add predictions to historical data
         monthly_sales['Predicted'] = self.model.predict(
             self.scaler.transform(
@@ -62,6 +88,166 @@ class SalesPredictor:
         
         return monthly_sales, next_month_prediction
 
+    def model_config(self):
+        """Everything besides the data that determines a fitted forecast."""
+        return {
+            'granularity': self.granularity,
+            'model': type(self.model).__name__,
+            'params': self.model.get_params(),
+            'scaler': type(self.scaler).__name__,
+            'features': self.FEATURES,
+            'test_size': self.TEST_SIZE,
+            'random_state': self.RANDOM_STATE,
+            'n_bootstrap': self.n_bootstrap,
+            'interval_level': self.interval_level,
+        }
+
+    def fingerprint(self, monthly_sales):
+        """Hash the monthly series together with the model configuration."""
+        digest = hashlib.sha256()
+        digest.update(monthly_sales['Month-Year'].values.astype('datetime64[ns]').view('i8').tobytes())
+        digest.update(monthly_sales['Purchase Amount (USD)'].to_numpy(dtype=np.float64).tobytes())
+        digest.update(json.dumps(self.model_config(), sort_keys=True, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+    def backtest(self, monthly_sales=None, horizons=3, min_train=12, configs=None):
+        """
+        Walk-forward accuracy of this and alternative model configurations.
+        See backtesting.walk_forward for the evaluation scheme.
+        """
+        if monthly_sales is None:
+            monthly_sales = self.preprocess_data()
+        return walk_forward(monthly_sales, horizons=horizons, min_train=min_train, configs=configs)
+
+    def forecast(self, cache=None):
+        """
+        Run the monthly forecast and return the processed sales response,
+        including a walk-forward backtest of the model.
+        With a cache, a monthly series seen before is answered from the stored
+        fit and response without refitting the scaler or the model.
+        """
+        monthly_sales = self.preprocess_data()
+        key = self.fingerprint(monthly_sales) if cache is not None else None
+
+        if cache is not None:
+            entry = cache.get(key)
+            if entry is not None:
+                self.model, self.scaler = entry['model'], entry['scaler']
+                self.prediction_interval = entry['response']['metrics']['prediction_interval']
+                return entry['response']
+
+        monthly_sales, next_month_sales = self.predict_next_month_sales(monthly_sales)
+        response = {
+            'monthly_sales': monthly_sales[['Month-Year', 'Purchase Amount (USD)', 'Predicted']].to_dict(orient='records'),
+            'next_month_sales': next_month_sales
+        }
+        response = self.process_sales_response(response)
+        response['backtest'] = self.backtest(monthly_sales)
+
+        if cache is not None:
+            cache.set(key, {'model': self.model, 'scaler': self.scaler, 'response': response})
+        return response
+
+    def _design_matrix(self, time_index, months, years):
+        # Intercept plus the same TimeIndex/Month/Year features as the global model
+        return np.column_stack([np.ones(len(time_index)), time_index, months, years]).astype(float)
+
+    def _bootstrap_forecasts(self, X, Y, x_next):
+        """
+        Residual-bootstrap draws of the next-period prediction for every column of Y.
+        X is the shared (n, p) design matrix, Y is (n, segments) and x_next is (p,).
+        A refit on resampled targets is linear in them: x_next @ pinv(X) @ y* = w @ y*.
+        So all resamples reduce to one weighted bincount and one matrix product
+        instead of a loop of refits. Returns (point_forecasts, draws of shape (B, segments)).
+        """
+        n = X.shape[0]
+        projection = np.linalg.pinv(X)
+        fitted = X @ (projection @ Y)
+        residuals = Y - fitted
+        weights = x_next @ projection
+        point = weights @ Y
+
+        rng = np.random.default_rng(self.RANDOM_STATE)
+        resampled = rng.integers(0, n, size=(self.n_bootstrap, n))
+        # resample_weights[b, j] = total weight resample b puts on residual j
+        rows = np.arange(self.n_bootstrap)[:, None] * n
+        resample_weights = np.bincount(
+            (rows + resampled).ravel(),
+            weights=np.broadcast_to(weights, resampled.shape).ravel(),
+            minlength=self.n_bootstrap * n
+        ).reshape(self.n_bootstrap, n)
+
+        # Refit uncertainty plus the noise of the new observation itself
+        noise = residuals[rng.integers(0, n, size=self.n_bootstrap)]
+        draws = point + resample_weights @ residuals + noise
+        return point, draws
+
+    def _interval(self, draws):
+        tail = (1 - self.interval_level) / 2
+        lower, upper = np.quantile(draws, [tail, 1 - tail], axis=0)
+        return [
+            {'lower': float(low), 'upper': float(high), 'level': self.interval_level, 'n_bootstrap': self.n_bootstrap}
+            for low, high in zip(lower, upper)
+        ]
+
+    def predict_segment_sales(self, segment_columns):
+        """
+        Forecast next period's sales for every segment in a single batched fit.
+        Builds a segment x period matrix with one groupby and solves the least
+        squares problem for all segments at once, since they share the same
+        design matrix. Returns {'next_period': 'YYYY-MM-DD', 'forecasts': {segment: value}}.
+        """
+        if isinstance(segment_columns, str):
+            segment_columns = [segment_columns]
+        if any(column not in self.data.columns for column in segment_columns):
+            return None
+
+        codes = period_codes(self.data['Date'], self.granularity)
+        valid = codes != MISSING_CODE
+        data = self.data[valid]
+        codes = pd.Series(codes[valid], index=data.index, name='Period')
+        matrix = data.groupby(
+            [data[column] for column in segment_columns] + [codes], observed=True
+        )['Purchase Amount (USD)'].sum().unstack(fill_value=0.0)
+        if matrix.empty:
+            return None
+
+        # Periods without any sales in the data still count as (zero) periods
+        first, last = int(matrix.columns.min()), int(matrix.columns.max())
+        codes = np.arange(first, last + 2)
+        starts = period_starts(codes, self.granularity)
+        matrix = matrix.reindex(columns=codes[:-1], fill_value=0.0)
+
+        X = self._design_matrix(codes - first, starts.month, starts.year)
+        Y = matrix.to_numpy(dtype=float).T
+        coefficients, *_ = np.linalg.lstsq(X[:-1], Y, rcond=None)
+        predictions = (X[-1:] @ coefficients)[0]
+        _, draws = self._bootstrap_forecasts(X[:-1], Y, X[-1])
+
+        segments = [
+            ' | '.join(map(str, key)) if isinstance(key, tuple) else key
+            for key in matrix.index
+        ]
+        return {
+            'next_period': starts[-1].strftime('%Y-%m-%d'),
+            'forecasts': dict(zip(segments, predictions.tolist())),
+            'intervals': dict(zip(segments, self._interval(draws))),
+        }
+
+    def add_segment_forecasts(self, response, segment_columns):
+        """Attach per-segment forecasts and their intervals to a processed sales response."""
+        response['segment_forecasts'] = {}
+        response['metrics']['segment_intervals'] = {}
+        for column in segment_columns:
+            if column not in self.data.columns:
+                continue
+            forecast = self.predict_segment_sales(column)
+            if forecast is None:
+                continue
+            response['metrics']['segment_intervals'][column] = forecast.pop('intervals')
+            response['segment_forecasts'][column] = forecast
+        return response
+
     def process_sales_response(self, response):
         if not response or 'monthly_sales' not in response:
             return None
@@ -73,7 +259,8 @@ class SalesPredictor:
         response['metrics'] = {
             'trend': self._calculate_trend(monthly_data),
             'confidence': self._calculate_confidence(),
-            'next_month_prediction': next_month
+            'next_month_prediction': next_month,
+            'prediction_interval': self.prediction_interval
         }
         
         return response
@@ -89,5 +276,5 @@ class SalesPredictor:
         return (sales[-1] - sales[0]) / len(sales)
 
     def _calculate_confidence(self):
-        # Simplified confidence calculation
-        return 0.95  # 95% confidence interval
+        # Level of the bootstrap prediction interval
+        return self.interval_level
@@ -0,0 +1,104 @@
+import base64
+import hashlib
+import json
+
+from django.http import StreamingHttpResponse
+
+from .encoding import dumps
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Records are encoded and flushed to the client in batches of this size
+STREAM_BATCH_SIZE = 500
+
+
+class PaginationError(ValueError):
+    """Raised for malformed or stale cursors and invalid page parameters."""
+
+
+def query_fingerprint(dataset_version, sort, search, built_on=None):
+    """Identify the list a cursor pages through: dataset, query and the day the list was built."""
+    raw = f"{dataset_version}|{sort or ''}|{search or ''}|{built_on or ''}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def encode_cursor(offset, fingerprint):
+    payload = json.dumps({'o': offset, 'f': fingerprint}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, fingerprint):
+    """
+    Decode an opaque cursor back to an offset.
+    A cursor is only valid for the dataset, sort and search it was issued for.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        offset = int(payload['o'])
+    except (ValueError, KeyError, TypeError):
+        raise PaginationError("Malformed cursor")
+    if payload.get('f') != fingerprint or offset < 0:
+        raise PaginationError("Cursor does not match the current dataset or query")
+    return offset
+
+
+def _sort_key(field):
+    def key(record):
+        value = record.get(field)
+        if isinstance(value, (list, tuple)):
+            value = ', '.join(map(str, value))
+        # None sorts last; mixed types fall back to their string form
+        return (value is None, isinstance(value, str), value if value is not None else 0)
+    return key
+
+
+def sort_records(records, sort):
+    """Sort records by a field; a leading '-' sorts descending."""
+    if not sort:
+        return records
+    field = sort.lstrip('-')
+    if records and field not in records[0]:
+        raise PaginationError(f"Unknown sort field '{field}'")
+    return sorted(records, key=_sort_key(field), reverse=sort.startswith('-'))
+
+
+def search_records(records, query):
+    """Keep records where any field contains the query, case-insensitively."""
+    if not query:
+        return records
+    needle = query.lower()
+    return [
+        record for record in records
+        if any(needle in str(value).lower() for value in record.values())
+    ]
+
+
+def parse_page_size(value):
+    if value in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    try:
+        size = int(value)
+    except ValueError:
+        raise PaginationError("limit must be an integer")
+    if size < 1:
+        raise PaginationError("limit must be positive")
+    return min(size, MAX_PAGE_SIZE)
+
+
+def _ndjson_lines(records):
+    for start in range(0, len(records), STREAM_BATCH_SIZE):
+        yield b''.join(dumps(record) + b'\n' for record in records[start:start + STREAM_BATCH_SIZE])
+
+
+def ndjson_page_response(records, offset, limit, fingerprint):
+    """
+    Stream one page of records as NDJSON.
+    Paging metadata travels in headers so every body line is a record.
+    """
+    page = records[offset:offset + limit]
+    response = StreamingHttpResponse(_ndjson_lines(page), content_type='application/x-ndjson')
+    response['X-Total-Count'] = str(len(records))
+    if offset + limit < len(records):
+        response['X-Next-Cursor'] = encode_cursor(offset + limit, fingerprint)
+    return response
@@ -1,17 +1,166 @@
+import re
+from collections import defaultdict
+
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import MinMaxScaler, StandardScaler, LabelEncoder
-from sklearn.impute import SimpleImputer
-from sklearn.decomposition import PCA
-from rapidfuzz import process
-from geopy.geocoders import Nominatim
+
+# sklearn, rapidfuzz and geopy are imported by the methods that use them so
+# importing this module stays cheap.
+
+
+def match_columns(columns, synonym_dict, fuzzy_threshold=80):
+    """
+    Resolve raw column headers to their standard labels.
+    Returns (standardized, unmatched): a rename map for the matched headers and
+    the headers without a close enough synonym.
+    """
+    from rapidfuzz import process
+
+    reverse_mapping = {synonym: standard_label for standard_label, synonyms in synonym_dict.items() for synonym in synonyms}
+    standardized_columns = {}
+    unmatched_columns = {}
+
+    for col in columns:
+        if col in reverse_mapping:
+            standardized_columns[col] = reverse_mapping[col]
+        else:
+            result = process.extractOne(col, reverse_mapping.keys())
+            if result:
+                match, score = result[0], result[1]
+                if score >= fuzzy_threshold:
+                    standardized_columns[col] = reverse_mapping[match]
+                else:
+                    unmatched_columns[col] = match if match else "No suitable match"
+            else:
+                unmatched_columns[col] = "No suitable match"
+
+    return standardized_columns, unmatched_columns
+
+
+# Values only match on a few typos: one edit per EDIT_SPAN characters of the shorter
+# value, at most MAX_EDITS, with equal digits ('Zone 1' is not 'Zone 2'). Similarity
+# ratios would merge 'California, Urban' into 'California, Suburban', and Jaro-Winkler's
+# prefix bonus 'Northeast' into 'North'. A known value may also be cut short ('Cloths'
+# for 'Clothing'), with the typos counted on the part that was kept.
+EDIT_SPAN = 6
+MAX_EDITS = 3
+# Unknown values are compared pairwise, so past this many only case and spacing are merged
+MAX_CLUSTER_VALUES = 2000
+
+
+def _value_key(value):
+    return ' '.join(str(value).split()).casefold()
+
+
+def _tidy(value):
+    return ' '.join(value.split()) if isinstance(value, str) else value
+
+
+def _close_values(queries, choices, distances):
+    """Pairs within one edit per EDIT_SPAN characters of the shorter value, with equal digits."""
+    query_lengths = np.array([len(key) for key in queries])
+    choice_lengths = np.array([len(key) for key in choices])
+    query_digits = np.array([re.sub(r'\D', '', key) for key in queries], dtype=object)
+    choice_digits = np.array([re.sub(r'\D', '', key) for key in choices], dtype=object)
+    return (
+        (distances <= np.minimum.outer(query_lengths, choice_lengths) // EDIT_SPAN)
+        & (query_digits[:, None] == choice_digits[None, :])
+    )
+
+
+def _is_truncation(key, target):
+    from rapidfuzz.distance import Levenshtein
+
+    return (
+        EDIT_SPAN <= len(key) < len(target)
+        and re.sub(r'\D', '', key) == re.sub(r'\D', '', target)
+        and Levenshtein.distance(key, target[:len(key)]) <= len(key) // EDIT_SPAN
+    )
+
+
+def learn_value_mapping(counts, vocabulary=(), known=None):
+    """
+    Map the distinct values of a column (counts: value -> rows) to canonical
+    spellings. Values equal up to case and spacing are merged first; the rest
+    are scored in batches with rapidfuzz's cdist, against the vocabulary and
+    then against each other, most frequent first. A cluster without a
+    vocabulary match is spelled like its most frequent value.
+    `known` is a mapping learned before; only values it lacks are scored, and
+    its canonical values are kept. Returns the extended mapping.
+    """
+    from rapidfuzz import process
+    from rapidfuzz.distance import Levenshtein
+
+    mapping = dict(known or {})
+    groups = defaultdict(dict)
+    for value, count in counts.items():
+        if value not in mapping:
+            groups[_value_key(value)][value] = count
+    if not groups:
+        return mapping
+
+    learned = {_value_key(value): value for value in mapping.values()}
+    canonical = {_value_key(value): value for value in vocabulary}
+    canonical.update((key, value) for key, value in learned.items() if key not in canonical)
+    pending = sorted(
+        (key for key in groups if key not in canonical),
+        key=lambda key: (-sum(groups[key].values()), key),
+    )
+
+    if pending and vocabulary:
+        targets = [_value_key(value) for value in vocabulary]
+        distances = process.cdist(pending, targets, scorer=Levenshtein.distance, score_cutoff=MAX_EDITS, workers=-1)
+        close = _close_values(pending, targets, distances)
+        for row, column in zip(*np.nonzero(~close & (distances <= MAX_EDITS))):
+            close[row, column] = _is_truncation(pending[row], targets[column])
+        for row, key in enumerate(pending):
+            if close[row].any():
+                canonical[key] = vocabulary[np.where(close[row], distances[row], MAX_EDITS + 1).argmin()]
+        pending = [key for key in pending if key not in canonical]
+
+    if pending:
+        # Leader clustering: each value joins the best earlier cluster it is close to,
+        # or starts one; learned values lead their clusters from the start
+        leaders = list(learned) + pending
+        is_leader = np.zeros(len(leaders), dtype=bool)
+        is_leader[:len(learned)] = True
+        close = np.zeros((len(pending), len(leaders)), dtype=bool)
+        distances = None
+        if len(pending) <= MAX_CLUSTER_VALUES:
+            distances = process.cdist(pending, leaders, scorer=Levenshtein.distance, score_cutoff=MAX_EDITS, workers=-1)
+            close = _close_values(pending, leaders, distances)
+        for row, key in enumerate(pending):
+            candidates = close[row] & is_leader
+            if candidates.any():
+                canonical[key] = canonical[leaders[np.where(candidates, distances[row], MAX_EDITS + 1).argmin()]]
+            else:
+                is_leader[len(learned) + row] = True
+                spellings = groups[key]
+                canonical[key] = _tidy(max(spellings, key=lambda value: (spellings[value], -len(str(value)))))
+
+    for key, spellings in groups.items():
+        for value in spellings:
+            mapping[value] = canonical[key]
+    return mapping
+
+
+def _remap(categorical, mapping):
+    """Rewrite a categorical column through its codes, one lookup per distinct value."""
+    targets = pd.Index([mapping.get(value, value) for value in categorical.cat.categories], dtype=object)
+    categories = pd.Index(targets.unique(), dtype=object)
+    lookup = categories.get_indexer(targets)
+    codes = categorical.cat.codes.to_numpy()
+    return pd.Series(
+        pd.Categorical.from_codes(np.where(codes >= 0, lookup[codes], -1), categories),
+        index=categorical.index, name=categorical.name,
+    )
 
 
 class DataPreprocessor:
     def __init__(self, file_path=None, data=None):
         if file_path is not None:
-            with open(file_path, 'rb') as file:
-                self.data = pd.read_csv(file)
+            from .ingest import read_upload
+            self.data = read_upload(file_path)
         elif isinstance(data, pd.DataFrame):
             self.data = data.copy()
         else:
@@ -23,6 +172,8 @@ class DataPreprocessor:
         if latitude_col not in self.data.columns or longitude_col not in self.data.columns:
             raise ValueError("Latitude and Longitude columns are required.")
 
+        from geopy.geocoders import Nominatim
+
         geolocator = Nominatim(user_agent="location_lookup")
 
         def get_location(lat, lon):
@@ -49,16 +200,14 @@ class DataPreprocessor:
         self.data = self.data.loc[:, ~self.data.columns.duplicated()]
 
     def inspect_data(self):
-        print("Dataset Info:")
-        print(self.data.info())
-        print("\nBasic Statistics:")
-        print(self.data.describe())
-        print("\nMissing Values:")
-        print(self.data.isnull().sum())
-        print("\nSample Data:")
-        print(self.data.head())
+        """Profile every column in one pass and return the profile as a dict (see profiling)."""
+        from .profiling import profile_frame
+
+        return profile_frame(self.data).to_dict()
 
     def handle_missing_data(self, strategies=None, fill_values=None):
+        from sklearn.impute import SimpleImputer
+
         strategies = strategies or {}
         fill_values = fill_values or {}
 
@@ -66,6 +215,13 @@ class DataPreprocessor:
             if self.data[column].dtype in [np.float64, np.int64]:
                 unique_values = self.data[column].dropna().unique()
                 strategy = strategies.get(column, "most_frequent" if set(unique_values).issubset({0, 1}) else "mean")
+            elif pd.api.types.is_datetime64_any_dtype(self.data[column]):
+                # Typed readers (Arrow, JSON) return parsed dates, which SimpleImputer rejects;
+                # fill them with the most frequent value as text dates are
+                modes = self.data[column].mode()
+                if not modes.empty:
+                    self.data[column] = self.data[column].fillna(fill_values.get(column, modes.iloc[0]))
+                continue
             elif self.data[column].dtype == 'bool':
                 self.data[column] = self.data[column].astype(int)
                 strategy = strategies.get(column, "most_frequent")
@@ -80,23 +236,7 @@ class DataPreprocessor:
             self.data[[column]] = imputer.fit_transform(self.data[[column]])
 
     def synonym_mapping(self, synonym_dict, fuzzy_threshold=80):
-        reverse_mapping = {synonym: standard_label for standard_label, synonyms in synonym_dict.items() for synonym in synonyms}
-        standardized_columns = {}
-        unmatched_columns = {}
-
-        for col in self.data.columns:
-            if col in reverse_mapping:
-                standardized_columns[col] = reverse_mapping[col]
-            else:
-                result = process.extractOne(col, reverse_mapping.keys())
-                if result:
-                    match, score = result[0], result[1]
-                    if score >= fuzzy_threshold:
-                        standardized_columns[col] = reverse_mapping[match]
-                    else:
-                        unmatched_columns[col] = match if match else "No suitable match"
-                else:
-                    unmatched_columns[col] = "No suitable match"
+        standardized_columns, unmatched_columns = match_columns(self.data.columns, synonym_dict, fuzzy_threshold)
 
         # Rename matched columns
         self.data.rename(columns=standardized_columns, inplace=True)
@@ -105,6 +245,28 @@ class DataPreprocessor:
         self.data.drop(columns=unmatched_columns, inplace=True)        
         return self.data, unmatched_columns
 
+    def normalize_values(self, vocabularies, mappings=None):
+        """
+        Merge variant spellings ('Clothing', 'clothing ', 'Cloths') of the values
+        of each column in `vocabularies` (column -> canonical values, possibly
+        none). The cost grows with the number of distinct values, not rows.
+        Returns the learned mappings by column; passing them back in later only
+        scores values they don't cover.
+        """
+        mappings = dict(mappings or {})
+        for column, vocabulary in vocabularies.items():
+            if column not in self.data.columns:
+                continue
+            series = self.data[column]
+            # Factorized once; counting and rewriting then work on the codes
+            categorical = series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+            counts = categorical.value_counts()
+            counts = counts[counts > 0]
+            mappings[column] = learn_value_mapping(counts.to_dict(), vocabulary, mappings.get(column))
+            remapped = _remap(categorical, mappings[column])
+            self.data[column] = remapped if categorical is series else remapped.astype(series.dtype)
+        return mappings
+
     def remove_duplicates(self):
         self.data = self.data.drop_duplicates()
 
@@ -149,15 +311,18 @@ class DataPreprocessor:
         if method == "onehot":
             self.data = pd.get_dummies(self.data, columns=columns)
         elif method == "label":
+            from sklearn.preprocessing import LabelEncoder
             le = LabelEncoder()
             for col in columns:
                 self.data[col] = le.fit_transform(self.data[col])
 
     def scale_data(self, columns, method="standard"):
+        from sklearn.preprocessing import MinMaxScaler, StandardScaler
         scaler = StandardScaler() if method == "standard" else MinMaxScaler()
         self.data[columns] = scaler.fit_transform(self.data[columns])
 
     def scale_all_numerical(self, method="standard"):
+        from sklearn.preprocessing import MinMaxScaler, StandardScaler
         numerical_columns = self.data.select_dtypes(include=[np.number]).columns
         scaler = StandardScaler() if method == "standard" else MinMaxScaler()
         self.data[numerical_columns] = scaler.fit_transform(self.data[numerical_columns])
@@ -195,6 +360,7 @@ class DataPreprocessor:
                         print("No 'Date' column found to process.")
 
     def apply_pca(self, n_components):
+        from sklearn.decomposition import PCA
         pca = PCA(n_components=n_components)
         self.data = pca.fit_transform(self.data)
 
@@ -0,0 +1,212 @@
+import numpy as np
+import pandas as pd
+
+from .sketches import HyperLogLog, KLLSketch
+
+# Most frequent values listed per column, and equal-width bins per numeric or date column
+TOP_VALUES = 10
+HISTOGRAM_BINS = 10
+# Candidates kept per column while counting values; bounds memory on ID-like columns
+TOP_CAPACITY = 200
+
+QUANTILES = {'25%': 0.25, '50%': 0.5, '75%': 0.75}
+
+
+def _common_dtype(first, second):
+    if first is None or first == second:
+        return second
+    numeric = pd.api.types.is_numeric_dtype
+    if numeric(first) and numeric(second) and not pd.api.types.is_bool_dtype(first) and not pd.api.types.is_bool_dtype(second):
+        return np.result_type(first, second)
+    return np.dtype(object)
+
+
+def _json_value(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, pd.Timedelta)):
+        return value.isoformat()
+    return value
+
+
+class ColumnProfile:
+    """
+    One-pass, mergeable statistics of a column: null and distinct counts, top
+    values, and for numeric and date columns min/max, mean/std, quantiles and a
+    histogram. Chunks are folded in with update(); profiles of separate chunks
+    combine with merge(), so columns can be profiled while they are streamed.
+    Distinct counts, quantiles and histograms come from sketches. Top values
+    are exact unless a column has more than TOP_CAPACITY distinct values; then
+    they are kept like a mergeable Space-Saving summary, whose counts are upper
+    bounds that are off by at most top_error.
+    """
+
+    def __init__(self):
+        self.dtype = None
+        self.rows = 0
+        self.nulls = 0
+        self.distinct = HyperLogLog()
+        self.top = {}
+        # The count any value left out of `top` may have
+        self.top_error = 0
+        self.minimum = None
+        self.maximum = None
+        # Count, mean and sum of squared deviations of the numeric values (Chan et al.)
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.values = None
+
+    @property
+    def kind(self):
+        if self.dtype is None:
+            return 'empty'
+        if pd.api.types.is_bool_dtype(self.dtype):
+            return 'boolean'
+        if pd.api.types.is_datetime64_any_dtype(self.dtype):
+            return 'datetime'
+        if pd.api.types.is_numeric_dtype(self.dtype):
+            return 'numeric'
+        return 'text'
+
+    def update(self, series):
+        self.dtype = _common_dtype(self.dtype, series.dtype)
+        present = series.dropna()
+        self.rows += len(series)
+        self.nulls += len(series) - len(present)
+        if present.empty:
+            return self
+
+        counts = present.value_counts()
+        # Categoricals list their unused categories too
+        counts = counts[counts > 0]
+        self._merge_top(*self._trim(counts.to_dict(), 0))
+        self.distinct.update_hashes(pd.util.hash_array(counts.index.to_numpy()))
+
+        if self.kind in ('numeric', 'datetime'):
+            low, high = present.min(), present.max()
+            self.minimum = low if self.minimum is None else min(self.minimum, low)
+            self.maximum = high if self.maximum is None else max(self.maximum, high)
+            numbers = self._numbers(present)
+            if self.values is None:
+                self.values = KLLSketch()
+            self.values.update(numbers)
+            if self.kind == 'numeric':
+                mean = numbers.mean()
+                self._merge_moments(numbers.size, mean, float(np.square(numbers - mean).sum()))
+        return self
+
+    def _numbers(self, present):
+        """Values as floats for the sketches; dates as nanoseconds since the epoch."""
+        if self.kind != 'datetime':
+            return present.to_numpy(dtype=np.float64)
+        if present.dt.tz is not None:
+            present = present.dt.tz_convert(None)
+        return present.astype('datetime64[ns]').to_numpy().view(np.int64).astype(np.float64)
+
+    @staticmethod
+    def _trim(counts, error):
+        """Keep the TOP_CAPACITY largest counts; what is dropped raises the error bound."""
+        if len(counts) <= TOP_CAPACITY:
+            return counts, error
+        ranked = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+        return dict(ranked[:TOP_CAPACITY]), max(error, ranked[TOP_CAPACITY][1])
+
+    def _merge_top(self, counts, error):
+        # A value missing from one side may still have up to that side's error there
+        merged = {value: count + counts.get(value, error) for value, count in self.top.items()}
+        for value, count in counts.items():
+            if value not in merged:
+                merged[value] = count + self.top_error
+        self.top, self.top_error = self._trim(
+            {value: int(count) for value, count in merged.items()}, self.top_error + error,
+        )
+
+    def _merge_moments(self, n, mean, m2):
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+
+    def merge(self, other):
+        self.dtype = _common_dtype(self.dtype, other.dtype) if other.dtype is not None else self.dtype
+        self.rows += other.rows
+        self.nulls += other.nulls
+        self.distinct.merge(other.distinct)
+        self._merge_top(other.top, other.top_error)
+        for bound, pick in (('minimum', min), ('maximum', max)):
+            theirs = getattr(other, bound)
+            if theirs is not None:
+                ours = getattr(self, bound)
+                setattr(self, bound, theirs if ours is None else pick(ours, theirs))
+        if other.n:
+            self._merge_moments(other.n, other.mean, other.m2)
+        if other.values is not None:
+            self.values = other.values if self.values is None else self.values.merge(other.values)
+        return self
+
+    def _decode(self, number):
+        """A sketch value back in the column's units."""
+        if self.kind == 'datetime':
+            return pd.Timestamp(int(number)).isoformat()
+        return float(number)
+
+    def to_dict(self):
+        top = sorted(self.top.items(), key=lambda item: item[1], reverse=True)[:TOP_VALUES]
+        profile = {
+            'dtype': str(self.dtype),
+            'kind': self.kind,
+            'rows': self.rows,
+            'nulls': self.nulls,
+            'null_ratio': self.nulls / self.rows if self.rows else 0.0,
+            'distinct': self.distinct.count(),
+            'top_values': [{'value': _json_value(value), 'count': count} for value, count in top],
+            'top_values_error': self.top_error,
+        }
+        if self.kind in ('numeric', 'datetime') and self.values is not None and self.values.n:
+            counts, edges = self.values.histogram(HISTOGRAM_BINS)
+            profile.update({
+                'min': _json_value(self.minimum),
+                'max': _json_value(self.maximum),
+                'quantiles': {label: self._decode(self.values.quantile(q)) for label, q in QUANTILES.items()},
+                'histogram': {'edges': [self._decode(edge) for edge in edges], 'counts': counts.tolist()},
+            })
+        if self.kind == 'numeric' and self.n:
+            profile['mean'] = self.mean
+            profile['std'] = float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else None
+        return profile
+
+
+class DatasetProfile:
+    """Column profiles of a whole dataset, built chunk by chunk (see ColumnProfile)."""
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = {}
+
+    def update(self, frame):
+        self.rows += len(frame)
+        for column in frame.columns:
+            self.columns.setdefault(column, ColumnProfile()).update(frame[column])
+        return self
+
+    def merge(self, other):
+        self.rows += other.rows
+        for column, profile in other.columns.items():
+            if column in self.columns:
+                self.columns[column].merge(profile)
+            else:
+                self.columns[column] = profile
+        return self
+
+    def to_dict(self):
+        return {
+            'rows': self.rows,
+            'columns': {str(column): profile.to_dict() for column, profile in self.columns.items()},
+        }
+
+
+def profile_frame(frame):
+    """Profile an in-memory frame; the same as streaming it through DatasetProfile in one chunk."""
+    return DatasetProfile().update(frame)
@@ -0,0 +1,162 @@
+import asyncio
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+STAGE = 'stage'
+DONE = 'done'
+ERROR = 'error'
+
+# Job ids come from clients for uploads, so keep them to a safe alphabet
+JOB_ID = re.compile(r'[A-Za-z0-9_-]{8,64}')
+
+
+class Progress:
+    """
+    Stage events of one upload or report job, appended by the thread doing the
+    work and read by any number of event streams.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.started = time.monotonic()
+        self.finished = False
+        self._events = []
+        self._lock = threading.Lock()
+
+    def _append(self, kind, data):
+        with self._lock:
+            if self.finished:
+                return
+            data = {**data, 'elapsed': round(time.monotonic() - self.started, 3)}
+            self._events.append((kind, data))
+            self.finished = kind in (DONE, ERROR)
+
+    def stage(self, name, rows=None, **details):
+        """Record that a pipeline stage finished, with the rows it left."""
+        self._append(STAGE, {'stage': name, 'rows': None if rows is None else int(rows), **details})
+
+    def finish(self, **result):
+        self._append(DONE, result)
+
+    def fail(self, error):
+        self._append(ERROR, {'error': str(error)})
+
+    def since(self, index):
+        """Events after the first `index`, as (id, kind, data); ids count from 1."""
+        with self._lock:
+            return [(position + 1, *event) for position, event in enumerate(self._events[index:], start=index)]
+
+
+class NullProgress:
+    """Stands in when nobody follows a job, so callers never check for None."""
+
+    finished = False
+
+    def stage(self, name, rows=None, **details):
+        pass
+
+    def finish(self, **result):
+        pass
+
+    def fail(self, error):
+        pass
+
+
+NULL_PROGRESS = NullProgress()
+
+
+class ProgressRegistry:
+    """
+    The jobs of this process by id, kept in memory without a broker, so a
+    stream has to reach the worker process that runs its job. The oldest
+    jobs are forgotten beyond max_jobs.
+    """
+
+    def __init__(self, max_jobs=256):
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def open(self, job_id):
+        """
+        The progress of a job, created on first use. A stream may open a job
+        before its upload arrives and the upload then reports into it.
+        """
+        with self._lock:
+            progress = self._jobs.get(job_id)
+            if progress is None:
+                progress = self._jobs[job_id] = Progress(job_id)
+            self._jobs.move_to_end(job_id)
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+            return progress
+
+    def start(self, job_id):
+        """The progress a job reports into; a finished earlier run under the same id is replaced."""
+        with self._lock:
+            progress = self._jobs.get(job_id)
+            if progress is not None and progress.finished:
+                del self._jobs[job_id]
+        return self.open(job_id)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+
+def format_event(event_id, kind, data):
+    return f'id: {event_id}\nevent: {kind}\ndata: {json.dumps(data, default=str)}\n\n'.encode('utf-8')
+
+
+def _stream(progress, last_event_id, keepalive, start_timeout):
+    """
+    The SSE chunks for a job from after last_event_id until it is done or fails,
+    with None whenever there is nothing to send yet.
+    """
+    # Ask EventSource to wait a little before reconnecting
+    yield b'retry: 2000\n\n'
+    sent = last_event_id
+    opened = last_sent = time.monotonic()
+    while True:
+        events = progress.since(sent)
+        for event_id, kind, data in events:
+            yield format_event(event_id, kind, data)
+            sent = event_id
+            if kind in (DONE, ERROR):
+                return
+        now = time.monotonic()
+        if events:
+            last_sent = now
+        elif sent == 0 and now - opened > start_timeout:
+            yield format_event(1, ERROR, {'error': 'The job did not start'})
+            return
+        elif now - last_sent >= keepalive:
+            # A comment line keeps proxies from closing an idle connection
+            yield b': keep-alive\n\n'
+            last_sent = now
+        yield None
+
+
+async def event_stream(progress, last_event_id=0, poll_interval=0.25, keepalive=15, start_timeout=60):
+    """
+    Server-Sent Events for a job, as an async iterator so an ASGI server holds
+    the connection without a thread. A job that reports nothing within
+    start_timeout seconds ends the stream.
+    """
+    for chunk in _stream(progress, last_event_id, keepalive, start_timeout):
+        if chunk is None:
+            await asyncio.sleep(poll_interval)
+        else:
+            yield chunk
+
+
+def sync_event_stream(progress, last_event_id=0, poll_interval=0.25, keepalive=15, start_timeout=60):
+    """The same events for WSGI servers, which hold a thread per stream."""
+    for chunk in _stream(progress, last_event_id, keepalive, start_timeout):
+        if chunk is None:
+            time.sleep(poll_interval)
+        else:
+            yield chunk
@@ -0,0 +1,330 @@
+import datetime
+import os
+import tempfile
+from importlib.util import find_spec
+
+import numpy as np
+import pandas as pd
+
+from .data_filter import DataFilter, date_bounds
+
+# DuckDB is optional; without it every dataset is queried with pandas
+DUCKDB_AVAILABLE = find_spec('duckdb') is not None
+
+PANDAS = 'pandas'
+DUCKDB = 'duckdb'
+
+# Aggregations `aggregate` understands, as pandas names them
+AGGREGATIONS = ('sum', 'mean', 'count', 'size', 'min', 'max')
+
+
+def select_backend(rows, setting='auto', min_rows=2_000_000):
+    """
+    The engine for a dataset of `rows` rows: DuckDB from min_rows up when
+    setting is 'auto', or the one setting names. Falls back to pandas when
+    DuckDB is not installed.
+    """
+    if setting == PANDAS or not DUCKDB_AVAILABLE:
+        return PANDAS
+    if setting == DUCKDB or rows >= min_rows:
+        return DUCKDB
+    return PANDAS
+
+
+def categories_of(frame):
+    """The categories of a frame's categorical columns, which Parquet files do not keep."""
+    return {
+        column: list(frame[column].cat.categories)
+        for column in frame.columns if isinstance(frame[column].dtype, pd.CategoricalDtype)
+    }
+
+
+def _ordered_counts(counts):
+    """Counts from most to least frequent, equal counts in value order, so both engines agree."""
+    return counts.sort_index(kind='stable').sort_values(ascending=False, kind='stable')
+
+
+class PandasBackend:
+    """
+    The aggregation primitives of GraphGenerator over an in-memory frame.
+    Derived columns are added to the frame in place, as the graphs always did.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+
+    @property
+    def columns(self):
+        return self.frame.columns
+
+    def row_count(self):
+        return len(self.frame)
+
+    def is_integer(self, column):
+        return self.frame[column].dtype == 'int64'
+
+    def filter(self, filters):
+        return PandasBackend(DataFilter(self.frame.copy()).apply(filters).get_filtered_data())
+
+    def derive_product(self, name, left, right):
+        self.frame[name] = self.frame[left] * self.frame[right]
+        return self
+
+    def derive_mapped(self, name, source, mapping):
+        self.frame[name] = self.frame[source].map(mapping)
+        return self
+
+    def minmax(self, column):
+        return self.frame[column].min(), self.frame[column].max()
+
+    def count(self, column):
+        return self.frame[column].count()
+
+    def group_sum(self, by, column):
+        return self.frame.groupby(by, observed=False)[column].sum().to_dict()
+
+    def value_counts(self, column, normalize=False):
+        counts = _ordered_counts(self.frame[column].value_counts())
+        if normalize:
+            return (counts / counts.sum() * 100).to_dict()
+        return counts.to_dict()
+
+    def histogram(self, column, bins, labels=None):
+        """
+        Counts per bin in bin order. An integer `bins` splits the column's range
+        like value_counts(bins=...) and keys are its intervals; explicit edges
+        come with their labels.
+        """
+        if labels is None:
+            return self.frame[column].value_counts(bins=bins, sort=False).to_dict()
+        binned = pd.cut(self.frame[column], bins=bins, labels=labels, include_lowest=True)
+        return binned.value_counts().sort_index().to_dict()
+
+    def top_n(self, by, column, n):
+        return pd.Series(self.group_sum(by, column)).nlargest(n).to_dict()
+
+    def aggregate(self, by, aggregations):
+        """
+        One row per group of `by` (a column or list of columns), sorted by it,
+        with a column per {name: (column, aggregation)}.
+        """
+        return self.frame.groupby(by, observed=True).agg(**aggregations)
+
+    def select(self, columns, dropna=False):
+        frame = self.frame[columns]
+        return frame.dropna() if dropna else frame
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _literal(value):
+    if value is None:
+        return 'NULL'
+    if isinstance(value, (bool, np.bool_)):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, (int, np.integer)):
+        return str(int(value))
+    if isinstance(value, (float, np.floating)):
+        # repr round-trips, so DuckDB compares against the exact same double
+        return repr(float(value))
+    if isinstance(value, (pd.Timestamp, datetime.datetime)):
+        return f"TIMESTAMP '{pd.Timestamp(value).isoformat(sep=' ')}'"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class DuckDBBackend:
+    """
+    The same primitives evaluated by DuckDB over a Parquet file, so a dataset
+    never has to be loaded: filters and derived columns only extend the query,
+    and each primitive reads just the columns it aggregates, on all cores.
+    Results match PandasBackend's, including the order of keys.
+    Pickles as its query, so it can be sent to the CPU pool.
+    """
+
+    def __init__(self, path, categories=None, threads=None, sql=None):
+        self.path = path
+        self.categories = categories or {}
+        self.threads = threads
+        self.sql = sql or f'SELECT * FROM read_parquet({_literal(path)})'
+        self._connection = None
+        self._schema = None
+        self._rows = None
+
+    def __getstate__(self):
+        return {'path': self.path, 'categories': self.categories, 'threads': self.threads, 'sql': self.sql}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _derive(self, sql):
+        return DuckDBBackend(self.path, self.categories, self.threads, sql)
+
+    def _query(self, sql):
+        if self._connection is None:
+            import duckdb
+
+            config = {'threads': self.threads} if self.threads else {}
+            self._connection = duckdb.connect(config=config)
+        return self._connection.execute(sql)
+
+    def _from(self):
+        return f'FROM ({self.sql}) AS rows'
+
+    @property
+    def schema(self):
+        if self._schema is None:
+            described = self._query(f'DESCRIBE SELECT * {self._from()}').fetchall()
+            self._schema = {name: column_type for name, column_type, *_ in described}
+        return self._schema
+
+    @property
+    def columns(self):
+        return pd.Index(list(self.schema))
+
+    def row_count(self):
+        if self._rows is None:
+            self._rows = self._query(f'SELECT count(*) {self._from()}').fetchone()[0]
+        return self._rows
+
+    def is_integer(self, column):
+        return self.schema[column] == 'BIGINT'
+
+    def filter(self, filters):
+        """Push a dashboard filter set down into the query; same semantics as DataFilter."""
+        conditions = []
+        if filters.get('category'):
+            conditions.append(f'{_quote("Category")} = {_literal(filters["category"])}')
+        if filters.get('location'):
+            conditions.append(f'{_quote("Location")} = {_literal(filters["location"])}')
+        for key, column in (('age_range', 'Age'), ('rating_range', 'Review Rating')):
+            if filters.get(key):
+                low, high = filters[key]
+                conditions.append(f'{_quote(column)} BETWEEN {_literal(float(low))} AND {_literal(float(high))}')
+        if filters.get('start_date') and filters.get('end_date'):
+            start, end = date_bounds(filters['start_date'], filters['end_date'])
+            conditions.append(f'{_quote("Date")} >= {_literal(start)} AND {_quote("Date")} < {_literal(end)}')
+        if not conditions:
+            return self
+        return self._derive(f'SELECT * {self._from()} WHERE {" AND ".join(conditions)}')
+
+    def _with_column(self, name, expression):
+        if name in self.schema:
+            return self._derive(f'SELECT * REPLACE ({expression} AS {_quote(name)}) {self._from()}')
+        return self._derive(f'SELECT *, {expression} AS {_quote(name)} {self._from()}')
+
+    def derive_product(self, name, left, right):
+        return self._with_column(name, f'{_quote(left)} * {_quote(right)}')
+
+    def derive_mapped(self, name, source, mapping):
+        cases = ' '.join(f'WHEN {_literal(key)} THEN {_literal(value)}' for key, value in mapping.items())
+        return self._with_column(name, f'CASE {_quote(source)} {cases} END')
+
+    def minmax(self, column):
+        return self._query(f'SELECT min({_quote(column)}), max({_quote(column)}) {self._from()}').fetchone()
+
+    def count(self, column):
+        return self._query(f'SELECT count({_quote(column)}) {self._from()}').fetchone()[0]
+
+    def _aggregation(self, column, aggregation):
+        quoted = _quote(column)
+        floating = self.schema.get(column) in ('DOUBLE', 'FLOAT')
+        if aggregation == 'sum':
+            # pandas sums floats with compensated (Kahan) summation, and so does fsum
+            return f'coalesce(fsum({quoted}), 0)' if floating else f'coalesce(sum({quoted}), 0)::BIGINT'
+        if aggregation == 'mean':
+            # pandas divides the compensated sum by the count too
+            return f'fsum({quoted}) / count({quoted})'
+        if aggregation == 'count':
+            return f'count({quoted})'
+        if aggregation == 'size':
+            return 'count(*)'
+        if aggregation in ('min', 'max'):
+            return f'{aggregation}({quoted})'
+        raise ValueError(f"Unsupported aggregation '{aggregation}'. Choose from {AGGREGATIONS}.")
+
+    def _grouped(self, keys, expressions):
+        """A frame of aggregates per group of `keys`, sorted by them; missing keys are dropped like pandas does."""
+        quoted = ', '.join(_quote(key) for key in keys)
+        not_null = ' AND '.join(f'{_quote(key)} IS NOT NULL' for key in keys)
+        selected = ', '.join(f'{expression} AS {_quote(name)}' for name, expression in expressions.items())
+        frame = self._query(
+            f'SELECT {quoted}, {selected} {self._from()} WHERE {not_null} GROUP BY {quoted} ORDER BY {quoted}'
+        ).df()
+        return frame.set_index(keys if len(keys) > 1 else keys[0])
+
+    def group_sum(self, by, column):
+        sums = self._grouped([by], {column: self._aggregation(column, 'sum')})[column]
+        if by in self.categories:
+            # Categories without rows are listed with zero, like groupby(observed=False)
+            sums = sums.reindex(self.categories[by], fill_value=0)
+        return sums.to_dict()
+
+    def value_counts(self, column, normalize=False):
+        counts = _ordered_counts(self._grouped([column], {'count': 'count(*)'})['count'])
+        counts.index.name = None
+        if normalize:
+            return (counts / counts.sum() * 100).to_dict()
+        return counts.to_dict()
+
+    def histogram(self, column, bins, labels=None):
+        if labels is None:
+            # Bins depend only on the range, so cutting the extremes yields pandas' exact edges and intervals
+            low, high = self.minmax(column)
+            intervals, edges = pd.cut(pd.Series([low, high]), bins, include_lowest=True, retbins=True)
+            keys = list(intervals.cat.categories)
+        else:
+            edges, keys = bins, labels
+        quoted = _quote(column)
+        counts = [
+            f'count(*) FILTER (WHERE {quoted} {">=" if position == 0 else ">"} {_literal(edges[position])} '
+            f'AND {quoted} <= {_literal(edges[position + 1])})'
+            for position in range(len(edges) - 1)
+        ]
+        return dict(zip(keys, self._query(f'SELECT {", ".join(counts)} {self._from()}').fetchone()))
+
+    def top_n(self, by, column, n):
+        if by in self.categories:
+            return pd.Series(self.group_sum(by, column)).nlargest(n).to_dict()
+        # nlargest keeps the first of equal sums, and groups come in key order
+        total = self._aggregation(column, 'sum')
+        rows = self._query(
+            f'SELECT {_quote(by)}, {total} AS total {self._from()} WHERE {_quote(by)} IS NOT NULL '
+            f'GROUP BY {_quote(by)} ORDER BY total DESC, {_quote(by)} LIMIT {int(n)}'
+        ).fetchall()
+        return dict(rows)
+
+    def aggregate(self, by, aggregations):
+        keys = [by] if isinstance(by, str) else list(by)
+        return self._grouped(keys, {
+            name: self._aggregation(column, aggregation) for name, (column, aggregation) in aggregations.items()
+        })
+
+    def select(self, columns, dropna=False):
+        selected = ', '.join(_quote(column) for column in columns)
+        where = ''
+        if dropna:
+            where = 'WHERE ' + ' AND '.join(f'{_quote(column)} IS NOT NULL' for column in columns)
+        return self._query(f'SELECT {selected} {self._from()} {where}').df()
+
+
+def export_table(frame, path):
+    """Write a processed frame to Parquet with DuckDB, atomically."""
+    import duckdb
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.parquet.part')
+    os.close(fd)
+    try:
+        connection = duckdb.connect()
+        connection.register('frame', frame)
+        connection.execute(f'COPY frame TO {_literal(temp_path)} (FORMAT parquet)')
+        connection.close()
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return path
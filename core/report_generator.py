@@ -1,7 +1,12 @@
 from fpdf import FPDF
 import os
 import base64
+import hashlib
+import json
 import re
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 class ReportGenerator:
     """
@@ -12,17 +17,45 @@ class ReportGenerator:
     IMAGE_MAX_WIDTH = 90
     IMAGE_MAX_HEIGHT = 60
     IMAGE_MARGIN = 10
+    IMAGE_WORKERS = 4
 
-    def __init__(self, output_path: str):
+    def __init__(self, output_path: str, workspace: str = None):
         """
         Initialize the ReportGenerator with the output path and set up the PDF document.
+        Intermediate images go to a private workspace directory so concurrent
+        reports never share files.
         """
         self.output_path = output_path
+        self.workspace = workspace or tempfile.mkdtemp(prefix='report_')
         self.pdf = FPDF()
         self.pdf.set_auto_page_break(auto=True, margin=10)
         self.pdf.add_page()
         self.pdf.set_font("Arial", size=10)
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cleanup()
+
+    @staticmethod
+    def content_key(*parts) -> str:
+        """
+        Derive a content address from the inputs that determine a report.
+        Identical inputs map to the same file name, so finished reports can be reused.
+        """
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()[:32]
+
+    def cleanup(self) -> None:
+        """
+        Remove the workspace and everything rendered into it.
+        """
+        shutil.rmtree(self.workspace, ignore_errors=True)
+
     def add_title(self, title: str) -> None:
         """
         Add a title to the PDF document.
@@ -55,28 +88,35 @@ class ReportGenerator:
 
     def decode_and_save_images(self, graphs: list) -> list:
         """
-        Decode base64 images and save them to disk.
-        Returns a list of file paths to the saved images.
+        Decode base64 images and save them to the workspace in parallel.
+        Returns a list of file paths to the saved images, in input order.
         Raises ValueError if any image fails to decode.
         """
-        graph_paths = []
-        os.makedirs(os.path.dirname(self.output_path), exist_ok=True)  # Ensure output dir exists
+        with ThreadPoolExecutor(max_workers=self.IMAGE_WORKERS) as executor:
+            return list(executor.map(self._decode_and_save_image, range(len(graphs)), graphs))
 
-        for i, graph in enumerate(graphs):
-            if not self.is_valid_base64(graph):
-                raise ValueError(f"Invalid Base64 string at index {i}")
+    def _decode_and_save_image(self, i: int, graph: str) -> str:
+        if not self.is_valid_base64(graph):
+            raise ValueError(f"Invalid Base64 string at index {i}")
 
-            try:
-                image_data = base64.b64decode(graph)
-            except Exception as e:
-                raise ValueError(f"Error decoding Base64 image at index {i}: {str(e)}")
+        try:
+            image_data = base64.b64decode(graph)
+        except Exception as e:
+            raise ValueError(f"Error decoding Base64 image at index {i}: {str(e)}")
 
-            image_path = f"static/reports/graph_{i}.png"
-            with open(image_path, 'wb') as f:
-                f.write(image_data)
-            graph_paths.append(image_path)
+        image_path = os.path.join(self.workspace, f"graph_{i}.png")
+        with open(image_path, 'wb') as f:
+            f.write(image_data)
+        return image_path
 
-        return graph_paths
+    def render_graphs(self, graphs: dict, names: list = None) -> list:
+        """
+        Render charts server-side from GraphGenerator output into the workspace.
+        Independent charts are rasterized in parallel.
+        Returns a list of file paths to the rendered images.
+        """
+        from .chart_renderer import render_charts
+        return render_charts(graphs, self.workspace, names, max_workers=self.IMAGE_WORKERS)
 
     def is_valid_base64(self, s: str) -> bool:
         """
@@ -134,5 +174,17 @@ class ReportGenerator:
     def save_pdf(self) -> None:
         """
         Save the PDF document to the specified output path.
-        """
-        self.pdf.output(self.output_path)
+        The file is written next to its destination and moved into place,
+        so readers never see a partially written report.
+        """
+        output_dir = os.path.dirname(self.output_path) or '.'
+        os.makedirs(output_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(suffix='.pdf', dir=output_dir)
+        os.close(fd)
+        try:
+            self.pdf.output(temp_path)
+            os.replace(temp_path, self.output_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
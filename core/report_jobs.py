@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .cpu_pool import PoolBusy
+from .progress import NULL_PROGRESS
+
+PENDING = 'pending'
+RUNNING = 'running'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class ReportJob:
+    """State of one asynchronous report build."""
+
+    def __init__(self, report_id, output_path):
+        self.report_id = report_id
+        self.output_path = output_path
+        self.status = PENDING
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+
+    def to_dict(self):
+        return {
+            'report_id': self.report_id,
+            'status': self.status,
+            'error': self.error,
+            'submitted_at': self.submitted_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class ReportJobManager:
+    """
+    Build reports on a bounded local thread pool.
+    Jobs are keyed by the report's content key, so submitting an identical
+    report while it is queued, running or cached returns the existing job.
+    Finished jobs and their files expire after ttl seconds. When a directory
+    is given, the report files written there without a job (by the synchronous
+    endpoint) expire the same way, and at most max_files are kept. Beyond
+    max_pending queued or running jobs, submit raises PoolBusy.
+    """
+
+    def __init__(self, max_workers=2, ttl=3600, directory=None, prefix='report_', max_files=256, max_pending=16):
+        self.ttl = ttl
+        self.directory = directory
+        self.prefix = prefix
+        self.max_files = max_files
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, report_id, output_path, build, progress=NULL_PROGRESS):
+        """
+        Schedule build(progress) to produce output_path unless an equivalent job exists.
+        build must write the report to output_path and raise on failure; the
+        job's outcome is reported to `progress` once its status is final.
+        """
+        self.expire()
+        with self._lock:
+            job = self._jobs.get(report_id)
+            if job is not None and job.status != FAILED:
+                if job.status != READY:
+                    return job
+                if self._touch(job):
+                    progress.finish(status=READY)
+                    return job
+            job = ReportJob(report_id, output_path)
+            if self._touch(job):
+                # Built earlier by a synchronous request
+                job.status = READY
+                self._jobs[report_id] = job
+                progress.finish(status=READY)
+                return job
+            pending = sum(1 for queued in self._jobs.values() if queued.finished_at is None)
+            if pending >= self.max_pending:
+                raise PoolBusy(f'{pending} reports are already being built')
+            self._jobs[report_id] = job
+        self._executor.submit(self._run, job, build, progress)
+        return job
+
+    def _touch(self, job):
+        """Restart a finished report's TTL, for the job and its file alike; False when the file is gone."""
+        try:
+            os.utime(job.output_path)
+        except FileNotFoundError:
+            return False
+        job.finished_at = time.time()
+        return True
+
+    def touch(self, report_id, output_path):
+        """
+        Mark a cached report as just served, so neither expire() nor the
+        directory sweep removes it for another ttl. Returns False when it is gone.
+        """
+        with self._lock:
+            return self._touch(self._jobs.get(report_id) or ReportJob(report_id, output_path))
+
+    def _run(self, job, build, progress):
+        job.status = RUNNING
+        try:
+            build(progress)
+            job.status = READY
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+        if job.status == READY:
+            progress.finish(status=READY)
+        else:
+            progress.fail(job.error)
+
+    def get(self, report_id):
+        self.expire()
+        with self._lock:
+            return self._jobs.get(report_id)
+
+    def expire(self):
+        """Drop finished jobs older than the TTL and delete their files."""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [
+                job for job in self._jobs.values()
+                if job.finished_at is not None and job.finished_at < cutoff
+            ]
+            for job in expired:
+                del self._jobs[job.report_id]
+        for job in expired:
+            if os.path.exists(job.output_path):
+                os.remove(job.output_path)
+        if self.directory is not None:
+            self._sweep(cutoff)
+
+    def _sweep(self, cutoff):
+        """Delete prefix*.pdf files older than cutoff, then the oldest beyond max_files."""
+        with self._lock:
+            building = {job.output_path for job in self._jobs.values() if job.finished_at is None}
+        try:
+            entries = [
+                entry for entry in os.scandir(self.directory)
+                if entry.name.startswith(self.prefix) and entry.name.endswith('.pdf')
+                and entry.path not in building
+            ]
+        except FileNotFoundError:
+            return
+        files = []
+        for entry in entries:
+            try:
+                files.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                continue
+        files.sort(reverse=True)
+        removed = {path for position, (mtime, path) in enumerate(files)
+                   if mtime < cutoff or position >= self.max_files}
+        for path in removed:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        if removed:
+            with self._lock:
+                for job in [job for job in self._jobs.values() if job.output_path in removed]:
+                    del self._jobs[job.report_id]
@@ -0,0 +1,87 @@
+import pandas as pd
+
+from .data_filter import date_bounds
+
+# Rollup grain: day x hour x these dimensions. Hour is kept so peak hours can be answered too.
+ROLLUP_DIMENSIONS = ('Category', 'Location', 'Store Name')
+MEASURES = ('Sales', 'Transactions')
+
+# Filters a rollup can answer; any other filter needs the transactions
+ROLLUP_FILTERS = {'category': 'Category', 'location': 'Location'}
+
+SEASONS = {1: 'Winter', 2: 'Spring', 3: 'Summer', 4: 'Autumn'}
+
+
+def build_rollup(frame):
+    """
+    Aggregate processed transactions to sales and transaction counts per
+    day x hour x category x location x store. Rows without a valid date are
+    left out. Returns None without Date and purchase amount columns.
+    """
+    if 'Date' not in frame.columns or 'Purchase Amount (USD)' not in frame.columns:
+        return None
+    frame = frame[pd.to_datetime(frame['Date']).notna()]
+    dates = pd.to_datetime(frame['Date'])
+    keys = [dates.dt.normalize().rename('Day'), dates.dt.hour.rename('Hour')]
+    keys += [frame[column] for column in ROLLUP_DIMENSIONS if column in frame.columns]
+    rollup = frame['Purchase Amount (USD)'].groupby(keys, dropna=False, observed=True).agg(['sum', 'size'])
+    rollup.columns = list(MEASURES)
+    return rollup.reset_index()
+
+
+def filter_rollup(rollup, filters):
+    """
+    Apply dashboard filters to a rollup.
+    Returns None when a filter (e.g. an age or rating range) is finer than the rollup grain.
+    """
+    if rollup is None:
+        return None
+    filters = {key: value for key, value in (filters or {}).items() if value}
+    mask = pd.Series(True, index=rollup.index)
+    for key, value in filters.items():
+        if key in ROLLUP_FILTERS:
+            column = ROLLUP_FILTERS[key]
+            if column not in rollup.columns:
+                return None
+            mask &= rollup[column] == value
+        elif key not in ('start_date', 'end_date'):
+            return None
+    if filters.get('start_date') and filters.get('end_date'):
+        start, end = date_bounds(filters['start_date'], filters['end_date'])
+        mask &= (rollup['Day'] >= start) & (rollup['Day'] < end)
+    return rollup[mask]
+
+
+class RollupGraphs:
+    """The sum/count dashboard graphs answered from a (filtered) rollup, shaped like GraphGenerator's."""
+
+    def __init__(self, rollup):
+        self.rollup = rollup
+
+    def _sales_by(self, keys):
+        return self.rollup.groupby(keys, observed=True)['Sales'].sum()
+
+    def sales_by_category(self):
+        return self._sales_by('Category').to_dict()
+
+    def sales_by_location(self):
+        return self._sales_by('Location').to_dict()
+
+    def sales_by_season(self):
+        seasons = (self.rollup['Day'].dt.month % 12 // 3 + 1).map(SEASONS).rename('Season')
+        return self._sales_by(seasons).to_dict()
+
+    def sales_by_month(self):
+        return dict(sorted(self._sales_by(self.rollup['Day'].dt.month.rename('Month')).to_dict().items()))
+
+    def peak_purchase_hours(self):
+        counts = self.rollup.groupby('Hour')['Transactions'].sum()
+        return counts[counts > 0].sort_values(ascending=False, kind='stable').to_dict()
+
+    def sales_by_day(self):
+        days = self.rollup['Day'].dt.day_name().rename('Day_of_Week')
+        daily = self.rollup.groupby(days)[list(MEASURES)].sum()
+        daily = daily[daily['Transactions'] > 0]
+        totals = daily['Sales'].round(2)
+        averages = (daily['Sales'] / daily['Transactions']).round(2)
+        return {day: {'total': totals[day], 'average': averages[day]} for day in daily.index}
@@ -0,0 +1,264 @@
+import numpy as np
+import pandas as pd
+
+from .graph_generator import GraphGenerator
+from .ingest import iter_chunks, read_header
+from .preprocessing import match_columns
+from .progress import NULL_PROGRESS
+from .time_buckets import MISSING_CODE, period_codes
+
+# Per-row sampling design columns attached to an approximate dataset. They
+# survive filtering, so estimates stay valid on any filtered subset.
+SAMPLE_WEIGHT = 'Sample_Weight'
+STRATUM = 'Sample_Stratum'
+STRATUM_SAMPLE_SIZE = 'Sample_Stratum_Size'
+SAMPLE_COLUMNS = (SAMPLE_WEIGHT, STRATUM, STRATUM_SAMPLE_SIZE)
+
+Z_SCORES = {0.8: 1.2816, 0.9: 1.6449, 0.95: 1.9600, 0.99: 2.5758}
+# Confidence level of every bound an approximate dashboard reports
+CONFIDENCE = 0.95
+
+
+def is_sampled(frame):
+    return SAMPLE_WEIGHT in frame.columns
+
+
+class StratifiedReservoir:
+    """
+    A bottom-k reservoir per stratum, filled chunk by chunk.
+    Every row gets a uniform random key and each stratum keeps its k smallest
+    keys, which is a uniform sample without replacement of that stratum. The
+    merge is one sort and groupby per chunk rather than a per-row loop.
+    """
+
+    KEY = '_reservoir_key'
+
+    def __init__(self, per_stratum=2000, seed=42):
+        self.per_stratum = per_stratum
+        self.rng = np.random.default_rng(seed)
+        self.population = pd.Series(dtype=np.int64)
+        self.rows_seen = 0
+        self._sample = None
+
+    def add(self, chunk, strata):
+        strata = pd.Series(np.asarray(strata), index=chunk.index)
+        self.rows_seen += len(chunk)
+        self.population = self.population.add(strata.value_counts(), fill_value=0).astype(np.int64)
+
+        chunk = chunk.assign(**{self.KEY: self.rng.random(len(chunk)), STRATUM: strata.values})
+        combined = chunk if self._sample is None else pd.concat([self._sample, chunk], ignore_index=True)
+        self._sample = (
+            combined.sort_values(self.KEY, kind='stable')
+            .groupby(STRATUM, sort=False)
+            .head(self.per_stratum)
+            .reset_index(drop=True)
+        )
+
+    def sample(self):
+        """Return (rows, strata) with the bookkeeping columns split off the rows."""
+        if self._sample is None:
+            return pd.DataFrame(), pd.Series(dtype=object)
+        strata = self._sample[STRATUM]
+        return self._sample.drop(columns=[self.KEY, STRATUM]), strata
+
+
+def _stratum_labels(chunk, category_column, date_column):
+    labels = pd.Series('all', index=chunk.index)
+    if category_column is not None:
+        labels = chunk[category_column].astype(str)
+    if date_column is not None:
+        months = period_codes(pd.to_datetime(chunk[date_column], errors='coerce'), 'month')
+        months = np.where(months == MISSING_CODE, -1, months)
+        labels = labels + '|' + pd.Series(months, index=chunk.index).astype(str)
+    return labels
+
+
+def sample_csv(file_path, synonym_dict, per_stratum=2000, chunksize=200_000, seed=42, profile=None):
+    """
+    Stream an upload (any format ingest reads) in chunks into a reservoir
+    stratified by Category and Date month.
+    Raw headers are resolved through the synonym dictionary first, so strata use
+    the same columns the pipeline will later call Category and Date.
+    Every chunk is also folded into `profile` (a DatasetProfile) when given.
+    """
+    header = read_header(file_path)
+    standardized, _ = match_columns(header, synonym_dict)
+    raw_for = {standard: raw for raw, standard in standardized.items()}
+    category_column, date_column = raw_for.get('Category'), raw_for.get('Date')
+
+    reservoir = StratifiedReservoir(per_stratum=per_stratum, seed=seed)
+    # Columns the pipeline would drop are never parsed
+    usecols = [column for column in header if column in standardized]
+    for chunk in iter_chunks(file_path, chunksize, usecols=usecols):
+        if profile is not None:
+            profile.update(chunk)
+        reservoir.add(chunk, _stratum_labels(chunk, category_column, date_column))
+    return reservoir
+
+
+def attach_sample_design(frame, strata, population):
+    """
+    Add weights to a preprocessed sample.
+    Weights use the stratum sample sizes from before preprocessing, so rows it
+    drops (outliers, missing values) count as zeros and the estimates describe
+    the cleaned population, like the exact pipeline does.
+    """
+    sample_sizes = strata.map(strata.value_counts()).loc[frame.index]
+    strata = strata.loc[frame.index]
+    frame = frame.copy()
+    frame[STRATUM] = strata.values
+    frame[STRATUM_SAMPLE_SIZE] = sample_sizes.values
+    frame[SAMPLE_WEIGHT] = (strata.map(population) / sample_sizes).values
+    return frame
+
+
+def stratified_estimate(frame, value_column=None, group_column=None, z=Z_SCORES[CONFIDENCE]):
+    """
+    Estimate population totals (of value_column, or row counts) per group.
+    Uses the stratified expansion estimator with its finite-population variance.
+    Rows outside a group count as zeros within their stratum, which keeps the
+    variance right for groups and filtered subsets.
+    Returns a DataFrame with estimate, lower and upper columns.
+    """
+    values = frame[value_column].astype(float) if value_column else pd.Series(1.0, index=frame.index)
+    keys = [frame[STRATUM]] + ([frame[group_column]] if group_column else [])
+    per_stratum = pd.DataFrame({
+        'y': values,
+        'y2': values * values,
+        'n': frame[STRATUM_SAMPLE_SIZE],
+        'w': frame[SAMPLE_WEIGHT],
+    }).groupby(keys, observed=True).agg(S=('y', 'sum'), Q=('y2', 'sum'), n=('n', 'first'), w=('w', 'first'))
+
+    n = per_stratum['n'].astype(float)
+    population = per_stratum['w'] * n
+    sample_variance = ((per_stratum['Q'] - per_stratum['S'] ** 2 / n) / (n - 1)).where(n > 1, 0.0).clip(lower=0)
+    per_stratum['total'] = per_stratum['w'] * per_stratum['S']
+    per_stratum['variance'] = population ** 2 * (1 - n / population) * sample_variance / n
+
+    if group_column:
+        totals = per_stratum.groupby(level=1, observed=True)[['total', 'variance']].sum()
+    else:
+        totals = per_stratum[['total', 'variance']].sum().to_frame().T
+    margin = z * np.sqrt(totals['variance'])
+    return pd.DataFrame({
+        'estimate': totals['total'],
+        'lower': totals['total'] - margin,
+        'upper': totals['total'] + margin,
+    })
+
+
+def approximate_cards(frame, confidence=CONFIDENCE):
+    """Dashboard cards estimated from a weighted sample, with their bounds."""
+    z = Z_SCORES[confidence]
+    cards, bounds = {}, {}
+    transactions = stratified_estimate(frame, z=z).iloc[0]
+    cards['Total Transactions'] = int(round(frame[SAMPLE_WEIGHT].sum()))
+    bounds['Total Transactions'] = [transactions['lower'], transactions['upper']]
+
+    if 'Purchase Amount (USD)' in frame:
+        sales = stratified_estimate(frame, 'Purchase Amount (USD)', z=z).iloc[0]
+        cards['Total Sales'] = round(sales['estimate'], 2)
+        bounds['Total Sales'] = [sales['lower'], sales['upper']]
+        cards['Average Sales'] = round(sales['estimate'] / transactions['estimate'], 2)
+        bounds['Average Sales'] = [sales['lower'] / transactions['estimate'], sales['upper'] / transactions['estimate']]
+    else:
+        cards['Total Sales'] = cards['Average Sales'] = 0
+
+    if 'Review Rating' in frame:
+        ratings = stratified_estimate(frame, 'Review Rating', z=z).iloc[0]
+        cards['Average Rating'] = round(ratings['estimate'] / transactions['estimate'], 2)
+        bounds['Average Rating'] = [ratings['lower'] / transactions['estimate'], ratings['upper'] / transactions['estimate']]
+    else:
+        cards['Average Rating'] = 0
+
+    return cards, bounds
+
+
+class ApproximateGraphGenerator(GraphGenerator):
+    """
+    GraphGenerator over a weighted sample.
+    Sum, count, histogram and aggregate primitives return expanded population
+    estimates and record confidence bounds for the graph being built in
+    self.bounds. Graphs built per customer are left out: a row sample keeps
+    only some of each customer's transactions, so their recency and totals
+    cannot be estimated; they arrive with the exact dashboard.
+    """
+
+    UNESTIMABLE_GRAPHS = ('rfm_segments', 'churned_customers')
+
+    def __init__(self, data, confidence=CONFIDENCE):
+        super().__init__(data)
+        self.confidence = confidence
+        self.z = Z_SCORES[confidence]
+        self.bounds = {}
+
+    def _record_bounds(self, estimates, scale=1.0):
+        self.bounds[self.current_graph] = {
+            label: [row.lower * scale, row.upper * scale] for label, row in estimates.iterrows()
+        }
+
+    def _group_sum(self, group_by_column, sum_column):
+        estimates = stratified_estimate(self.data, sum_column, group_by_column, z=self.z)
+        self._record_bounds(estimates)
+        return estimates['estimate'].to_dict()
+
+    def _value_counts(self, column, normalize=False, bins=None):
+        if bins:
+            return self._histogram(column, bins)
+        estimates = stratified_estimate(self.data, None, column, z=self.z).sort_values('estimate', ascending=False)
+        scale = 100 / estimates['estimate'].sum() if normalize else 1.0
+        self._record_bounds(estimates, scale)
+        return (estimates['estimate'] * scale).to_dict()
+
+    def _histogram(self, column, bins, labels=None):
+        binned = pd.cut(self.data[column], bins=bins, labels=labels, include_lowest=True)
+        estimates = stratified_estimate(self.data.assign(**{column: binned}), None, column, z=self.z)
+        estimates = estimates.reindex(binned.cat.categories, fill_value=0.0)
+        self._record_bounds(estimates)
+        return estimates['estimate'].to_dict()
+
+    def _top_n(self, group_by_column, sum_column, n):
+        return pd.Series(self._group_sum(group_by_column, sum_column)).nlargest(n).to_dict()
+
+    def _aggregate(self, by, aggregations):
+        """
+        Estimated sums, counts and means (as sum over count) per group of one
+        column; min and max are the sample's. Bounds are those of the first sum.
+        """
+        columns = {}
+        for name, (column, aggregation) in aggregations.items():
+            if aggregation in ('min', 'max'):
+                columns[name] = self.data.groupby(by, observed=True)[column].agg(aggregation)
+                continue
+            # Rows without a value count as zeros within their stratum, as filtered-out rows do
+            present = self.data if aggregation == 'size' else self.data.dropna(subset=[column])
+            counts = stratified_estimate(present, None, by, z=self.z)['estimate']
+            if aggregation in ('count', 'size'):
+                columns[name] = counts
+                continue
+            totals = stratified_estimate(present, column, by, z=self.z)
+            if self.current_graph not in self.bounds:
+                self._record_bounds(totals)
+            columns[name] = totals['estimate'] if aggregation == 'sum' else totals['estimate'] / counts
+        frame = pd.DataFrame(columns).sort_index()
+        frame.index.name = by
+        return frame
+
+    def _count(self, column):
+        return stratified_estimate(self.data.dropna(subset=[column]), z=self.z)['estimate'].iloc[0]
+
+    def _graph_methods(self, current_date):
+        methods = super()._graph_methods(current_date)
+        for name in self.UNESTIMABLE_GRAPHS:
+            methods.pop(name, None)
+        return methods
+
+    def generate_graphs(self, progress=NULL_PROGRESS):
+        graphs = super().generate_graphs(progress)
+        # Keep only bounds for labels that made it into the final graphs
+        self.bounds = {
+            name: {str(label): bound for label, bound in bounds.items() if label in graphs[name] or str(label) in graphs[name]}
+            for name, bounds in self.bounds.items()
+            if isinstance(graphs.get(name), dict)
+        }
+        return graphs
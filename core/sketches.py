@@ -0,0 +1,354 @@
+import numpy as np
+import pandas as pd
+
+from .data_filter import date_bounds
+from .time_buckets import period_codes
+
+# Columns sketched for every partition
+DISTINCT_COLUMNS = ('Customer_ID',)
+QUANTILE_COLUMNS = ('Purchase Amount (USD)', 'Review Rating', 'Age')
+
+# Card label -> (sketch kind, column, quantile)
+PERCENTILE_CARDS = {
+    'Unique Customers': ('distinct', 'Customer_ID', None),
+    'Median Order Value': ('quantile', 'Purchase Amount (USD)', 0.5),
+    'P95 Order Value': ('quantile', 'Purchase Amount (USD)', 0.95),
+    'Median Rating': ('quantile', 'Review Rating', 0.5),
+}
+
+# Filters a SketchIndex answers by merging partitions; any other filter needs the rows
+PARTITION_FILTERS = {'category': 'Category', 'location': 'Location'}
+DATE_FILTERS = ('start_date', 'end_date')
+
+
+class HyperLogLog:
+    """
+    Mergeable distinct-count sketch with 2**p one-byte registers.
+    The standard error is about 1.04 / sqrt(2**p), i.e. 1.6% at the default p=12.
+    Small sketches keep only their non-zero registers (sparse) until they fill
+    an eighth of the array, so thousands of small partitions stay cheap.
+    """
+
+    def __init__(self, p=12):
+        self.p = p
+        self.registers = None
+        self._index = np.empty(0, dtype=np.intp)
+        self._rank = np.empty(0, dtype=np.uint8)
+
+    def update(self, values):
+        values = pd.Series(values).dropna().to_numpy()
+        return self.update_hashes(pd.util.hash_array(values)) if values.size else self
+
+    def update_hashes(self, hashes):
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.intp)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        # The rank is the position of the leftmost 1-bit in the remaining bits
+        bit_length = np.frexp(rest.astype(np.float64))[1]
+        rank = (64 - self.p - bit_length + 1).astype(np.uint8)
+        return self._update_registers(index, rank)
+
+    def _update_registers(self, index, rank):
+        if self.registers is not None:
+            np.maximum.at(self.registers, index, rank)
+            return self
+        index = np.concatenate([self._index, index])
+        rank = np.concatenate([self._rank, rank])
+        # Keep the highest rank per register
+        order = np.lexsort((rank, index))
+        last = np.append(index[order][1:] != index[order][:-1], True)
+        self._index, self._rank = index[order][last], rank[order][last]
+        if self._index.size > (1 << self.p) // 8:
+            self.registers = self._dense()
+        return self
+
+    def _dense(self):
+        if self.registers is not None:
+            return self.registers
+        registers = np.zeros(1 << self.p, dtype=np.uint8)
+        registers[self._index] = self._rank
+        return registers
+
+    def merge(self, other):
+        if other.registers is None:
+            return self._update_registers(other._index, other._rank)
+        self.registers = np.maximum(self._dense(), other.registers)
+        return self
+
+    @classmethod
+    def union(cls, sketches, p=12):
+        """Merge many sketches at once; one reduction instead of one per sketch."""
+        merged = cls(p)
+        dense = [sketch.registers for sketch in sketches if sketch.registers is not None]
+        if dense:
+            merged.registers = np.maximum.reduce(dense)
+        sparse = [sketch for sketch in sketches if sketch.registers is None]
+        if sparse:
+            merged._update_registers(
+                np.concatenate([sketch._index for sketch in sparse]),
+                np.concatenate([sketch._rank for sketch in sparse]),
+            )
+        return merged
+
+    def count(self):
+        registers = self._dense()
+        m = registers.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+class KLLSketch:
+    """
+    Mergeable quantile sketch (KLL): a stack of compactors where level h holds
+    items of weight 2**h. A full level is sorted and every other item is
+    promoted, so memory stays O(k log(n/k)) and rank error ~1/k. The offset
+    alternates with each compaction, starting from the parity of n, so the same
+    inputs always give the same sketch. Minimum and maximum are tracked exactly.
+    """
+
+    def __init__(self, k=200):
+        self.k = k
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.levels = [np.empty(0)]
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        offset = self.n % 2
+        while level < len(self.levels):
+            items = self.levels[level]
+            if items.size > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays behind so total weight is preserved
+                kept, items = (items[-1:], items[:-1]) if items.size % 2 else (items[:0], items)
+                promoted = items[offset::2]
+                offset ^= 1
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = kept
+                # Capacities shrink as the stack grows, so recheck from the bottom
+                level = 0
+                continue
+            level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+        self.n += values.size
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        if other.n == 0:
+            return self
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+        return self
+
+    @classmethod
+    def union(cls, sketches, k=200):
+        """Merge many sketches at once; compacts once instead of once per sketch."""
+        merged = cls(k)
+        sketches = [sketch for sketch in sketches if sketch.n]
+        if not sketches:
+            return merged
+        merged.n = sum(sketch.n for sketch in sketches)
+        merged.min = min(sketch.min for sketch in sketches)
+        merged.max = max(sketch.max for sketch in sketches)
+        depth = max(len(sketch.levels) for sketch in sketches)
+        merged.levels = [
+            np.concatenate([sketch.levels[level] for sketch in sketches if level < len(sketch.levels)])
+            for level in range(depth)
+        ]
+        merged._compress()
+        return merged
+
+    def _weighted_items(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(level_items.size, 2 ** level) for level, level_items in enumerate(self.levels)])
+        return items, weights
+
+    def quantile(self, q):
+        if self.n == 0:
+            return None
+        if q <= 0:
+            return float(self.min)
+        if q >= 1:
+            return float(self.max)
+        items, weights = self._weighted_items()
+        order = np.argsort(items, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        position = np.searchsorted(cumulative, q * cumulative[-1])
+        return float(items[order][min(position, items.size - 1)])
+
+    def histogram(self, bins=10):
+        """
+        Approximate counts in `bins` equal-width bins between min and max.
+        Returns (counts, edges); the counts add up to n.
+        """
+        if self.n == 0:
+            return np.zeros(bins, dtype=np.int64), np.linspace(0.0, 1.0, bins + 1)
+        items, weights = self._weighted_items()
+        counts, edges = np.histogram(items, bins=bins, range=(self.min, self.max), weights=weights)
+        return counts.astype(np.int64), edges
+
+
+def column_arrays(frame):
+    """
+    Hash the distinct columns and convert the quantile columns to floats, once.
+    Arrays stay aligned with the rows so partitions can slice them; distinct
+    columns come with a mask of the non-missing rows.
+    """
+    hashes = {
+        column: (pd.util.hash_array(frame[column].to_numpy()), frame[column].notna().to_numpy())
+        for column in DISTINCT_COLUMNS if column in frame.columns
+    }
+    values = {
+        column: pd.to_numeric(frame[column], errors='coerce').to_numpy(dtype=np.float64)
+        for column in QUANTILE_COLUMNS if column in frame.columns
+    }
+    return hashes, values
+
+
+class SketchSet:
+    """Sketches of one slice of the data: row count, distinct counts and quantiles."""
+
+    def __init__(self, distinct_columns=DISTINCT_COLUMNS, quantile_columns=QUANTILE_COLUMNS):
+        self.rows = 0
+        self.distinct = {column: HyperLogLog() for column in distinct_columns}
+        self.quantiles = {column: KLLSketch() for column in quantile_columns}
+
+    @classmethod
+    def from_frame(cls, frame):
+        hashes, values = column_arrays(frame)
+        return cls.from_arrays(len(frame), hashes, values)
+
+    @classmethod
+    def from_arrays(cls, rows, hashes, values):
+        """Build from pre-hashed distinct columns and float quantile columns (see column_arrays)."""
+        sketches = cls((), ())
+        sketches.rows = rows
+        for column, (column_hashes, present) in hashes.items():
+            sketches.distinct[column] = HyperLogLog().update_hashes(column_hashes[present])
+        for column, column_values in values.items():
+            sketches.quantiles[column] = KLLSketch().update(column_values)
+        return sketches
+
+    def merge(self, other):
+        self.rows += other.rows
+        for column, sketch in other.distinct.items():
+            self.distinct.setdefault(column, HyperLogLog(sketch.p)).merge(sketch)
+        for column, sketch in other.quantiles.items():
+            self.quantiles.setdefault(column, KLLSketch(sketch.k)).merge(sketch)
+        return self
+
+    @classmethod
+    def union(cls, sketch_sets):
+        sketch_sets = list(sketch_sets)
+        merged = cls((), ())
+        merged.rows = sum(sketches.rows for sketches in sketch_sets)
+        for column in {column for sketches in sketch_sets for column in sketches.distinct}:
+            merged.distinct[column] = HyperLogLog.union(
+                [sketches.distinct[column] for sketches in sketch_sets if column in sketches.distinct])
+        for column in {column for sketches in sketch_sets for column in sketches.quantiles}:
+            merged.quantiles[column] = KLLSketch.union(
+                [sketches.quantiles[column] for sketches in sketch_sets if column in sketches.quantiles])
+        return merged
+
+    def cards(self):
+        """Percentile and distinct-count cards for this slice (columns it lacks are skipped)."""
+        cards = {}
+        for label, (kind, column, q) in PERCENTILE_CARDS.items():
+            if kind == 'distinct' and column in self.distinct:
+                cards[label] = self.distinct[column].count()
+            elif kind == 'quantile' and column in self.quantiles and self.quantiles[column].n:
+                cards[label] = round(self.quantiles[column].quantile(q), 2)
+        return cards
+
+
+class SketchIndex:
+    """
+    Sketches of a processed dataset per Category x Location x month partition.
+    Category/location filters and the months strictly inside a date range are
+    answered by merging partition sketches; only the boundary months of a date
+    range are re-read from the rows.
+    """
+
+    def __init__(self, frame):
+        self.data = frame
+        self.columns = [column for column in PARTITION_FILTERS.values() if column in frame.columns]
+        self.months = period_codes(frame['Date'], 'month') if 'Date' in frame.columns else None
+
+        keys = [frame[column] for column in self.columns]
+        if self.months is not None:
+            keys.append(pd.Series(self.months, index=frame.index, name='Month Code'))
+        if not keys:
+            self.partitions = {(): SketchSet.from_frame(frame)}
+            return
+        # Hash and convert each column once; partitions then only slice arrays
+        hashes, values = column_arrays(frame)
+        self.partitions = {}
+        for key, positions in frame.groupby(keys, dropna=False, observed=True).indices.items():
+            self.partitions[key if isinstance(key, tuple) else (key,)] = SketchSet.from_arrays(
+                len(positions),
+                {column: (h[positions], present[positions]) for column, (h, present) in hashes.items()},
+                {column: column_values[positions] for column, column_values in values.items()},
+            )
+
+    def summary(self, filters=None):
+        """
+        Merge the sketches matching a filter dict (the same keys as the dashboard filters).
+        Returns None when a filter can only be evaluated on the rows.
+        """
+        filters = {key: value for key, value in (filters or {}).items() if value}
+        if any(key not in PARTITION_FILTERS and key not in DATE_FILTERS for key in filters):
+            return None
+        wanted = {column: filters[key] for key, column in PARTITION_FILTERS.items() if key in filters}
+        if any(column not in self.columns for column in wanted):
+            return None
+
+        date_range = None
+        if filters.get('start_date') and filters.get('end_date'):
+            if self.months is None:
+                return None
+            start, end = date_bounds(filters['start_date'], filters['end_date'])
+            first, last = period_codes([start, end - pd.Timedelta(days=1)], 'month')
+            date_range = (start, end, first, last)
+
+        selected = []
+        for key, sketches in self.partitions.items():
+            if any(key[self.columns.index(column)] != value for column, value in wanted.items()):
+                continue
+            if date_range is not None and not date_range[2] < key[-1] < date_range[3]:
+                continue
+            selected.append(sketches)
+
+        if date_range is not None:
+            start, end, first, last = date_range
+            rows = self.data
+            mask = np.isin(self.months, [first, last]) & (rows['Date'] >= start).to_numpy() & (rows['Date'] < end).to_numpy()
+            for column, value in wanted.items():
+                mask &= (rows[column] == value).to_numpy()
+            selected.append(SketchSet.from_frame(rows[mask]))
+        return SketchSet.union(selected)
@@ -0,0 +1,228 @@
+import pandas as pd
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Dataset, SalesRollup, Transaction
+from .rollups import ROLLUP_DIMENSIONS, build_rollup
+
+# Rows per executemany call when bulk-loading
+INSERT_BATCH_SIZE = 10_000
+
+# Processed frame column -> Transaction field. Columns outside this map are not stored.
+COLUMN_FIELDS = {
+    'Store ID': 'store_id',
+    'Store Name': 'store_name',
+    'Store Size': 'store_size',
+    'Region/Zone': 'region',
+    'Product_id': 'product_id',
+    'Category': 'category',
+    'Location': 'location',
+    'Latitude': 'latitude',
+    'Longitude': 'longitude',
+    'Purchase Amount (USD)': 'purchase_amount',
+    'Promo_code': 'promo_code',
+    'Discount': 'discount',
+    'Date': 'date',
+    'Previous Purchases': 'previous_purchases',
+    'Age': 'age',
+    'Gender': 'gender',
+    'Review Rating': 'review_rating',
+    'Customer_ID': 'customer_id',
+    'Year': 'year',
+    'Month': 'month',
+    'Season': 'season',
+    'Hour': 'hour',
+    'Day_of_Week': 'day_of_week',
+    'Week_of_Year': 'week_of_year',
+    'Quarter': 'quarter',
+    'Is_Weekend': 'is_weekend',
+    'Age_bins': 'age_bins',
+    'Recency': 'recency',
+    'Frequency': 'frequency',
+    'Monetary': 'monetary',
+}
+
+
+# Rollup frame column -> SalesRollup field
+ROLLUP_FIELDS = {
+    'Day': 'day',
+    'Hour': 'hour',
+    'Category': 'category',
+    'Location': 'location',
+    'Store Name': 'store_name',
+    'Sales': 'sales',
+    'Transactions': 'transactions',
+}
+
+
+def _sql_values(series):
+    """Convert a column to Python values sqlite3 can bind, with None for missing."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        # Same text layout Django uses for DateTimeField, so ORM date filters compare correctly
+        text = series.dt.strftime('%Y-%m-%d %H:%M:%S')
+        # Missing dates make microsecond a float column; its digits must not gain a '.0'
+        micro = series.dt.microsecond.fillna(0).astype('int64')
+        text = text.where(micro == 0, text + '.' + micro.astype(str).str.zfill(6))
+        return text.astype(object).where(series.notna(), None).tolist()
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+    if series.dtype == object:
+        return series.where(series.notna(), None).map(lambda value: value if value is None else str(value)).tolist()
+    # astype(object) yields native Python ints/floats/bools
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def _column_spec(series):
+    """The dtype details needed to rebuild a column read back from SQL."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return {
+            'dtype': 'category',
+            'categories': [str(category) for category in series.cat.categories],
+            'ordered': bool(series.cat.ordered),
+        }
+    return {'dtype': str(series.dtype)}
+
+
+def _restore_dtype(series, spec):
+    dtype = spec['dtype']
+    if dtype.startswith('datetime64'):
+        return pd.to_datetime(series, format='ISO8601')
+    if dtype == 'category':
+        return pd.Series(
+            pd.Categorical(series, categories=spec['categories'], ordered=spec['ordered']),
+            index=series.index,
+        )
+    if dtype == 'bool':
+        return series.astype(bool)
+    if dtype == 'object':
+        return series
+    # Identifier columns are stored as text; numeric columns come back as numbers
+    numbers = pd.to_numeric(series, errors='coerce')
+    try:
+        return numbers.astype(dtype)
+    except (TypeError, ValueError):
+        return numbers
+
+
+def active_dataset():
+    return Dataset.objects.filter(is_active=True).order_by('-activated_at').first()
+
+
+@transaction.atomic
+def activate_dataset(version):
+    """Make an already stored dataset the active one. Returns None when it isn't stored."""
+    dataset = Dataset.objects.filter(version=version).first()
+    if dataset is None:
+        return None
+    dataset.is_active, dataset.activated_at = True, timezone.now()
+    Dataset.objects.exclude(pk=dataset.pk).update(is_active=False)
+    Dataset.objects.filter(pk=dataset.pk).update(is_active=True, activated_at=dataset.activated_at)
+    return dataset
+
+
+@transaction.atomic
+def save_dataset(frame, version, name='', keep=2):
+    """
+    Bulk-load a processed frame into the Transaction table and make it the active dataset.
+    Rows go in through batched executemany calls inside one transaction, and the
+    rollup is built once from the whole frame after them; a dataset already
+    stored under the same version is reactivated instead of reloaded.
+    Only the `keep` most recent datasets are retained.
+    """
+    if not Dataset.objects.filter(version=version).exists():
+        columns = [column for column in COLUMN_FIELDS if column in frame.columns]
+        dataset = Dataset.objects.create(
+            version=version, name=name, row_count=len(frame),
+            columns={column: _column_spec(frame[column]) for column in columns},
+        )
+
+        quote = connection.ops.quote_name
+        fields = [Transaction._meta.get_field(COLUMN_FIELDS[column]).column for column in columns]
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote(Transaction._meta.db_table),
+            ', '.join(quote(field) for field in ['dataset_id'] + fields),
+            ', '.join(['%s'] * (len(fields) + 1)),
+        )
+        with connection.cursor() as cursor:
+            for start in range(0, len(frame), INSERT_BATCH_SIZE):
+                batch = frame.iloc[start:start + INSERT_BATCH_SIZE]
+                values = [_sql_values(batch[column]) for column in columns]
+                cursor.executemany(sql, [(dataset.pk, *row) for row in zip(*values)])
+        # Per batch, cells spanning batches would be upserted once for each
+        refresh_rollup(dataset, frame)
+
+    dataset = activate_dataset(version)
+
+    stale = list(Dataset.objects.order_by('-activated_at').values_list('pk', flat=True)[keep:])
+    if stale:
+        # A raw delete avoids the ORM collecting millions of rows for the cascade
+        with connection.cursor() as cursor:
+            placeholders = ', '.join(['%s'] * len(stale))
+            for model in (Transaction, SalesRollup):
+                cursor.execute(
+                    f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)} WHERE dataset_id IN ({placeholders})',
+                    stale,
+                )
+        Dataset.objects.filter(pk__in=stale).delete()
+    return dataset
+
+
+def refresh_rollup(dataset, rows):
+    """
+    Fold newly loaded transactions into the dataset's stored rollup.
+    Each touched cell is upserted, so only the days in `rows` are rewritten.
+    """
+    delta = build_rollup(rows)
+    if delta is None or delta.empty:
+        return
+    for column in ROLLUP_DIMENSIONS:
+        delta[column] = delta[column].astype(object).where(delta[column].notna(), '').astype(str) if column in delta else ''
+    delta['Day'] = delta['Day'].dt.strftime('%Y-%m-%d')
+
+    quote = connection.ops.quote_name
+    fields = [SalesRollup._meta.get_field(field).column for field in ROLLUP_FIELDS.values()]
+    keys = ['dataset_id'] + fields[:-2]
+    sql = 'INSERT INTO {table} ({columns}) VALUES ({values}) ON CONFLICT ({keys}) DO UPDATE SET {updates}'.format(
+        table=quote(SalesRollup._meta.db_table),
+        columns=', '.join(quote(field) for field in ['dataset_id'] + fields),
+        values=', '.join(['%s'] * (len(fields) + 1)),
+        keys=', '.join(quote(field) for field in keys),
+        updates=', '.join(f'{quote(field)} = {quote(field)} + excluded.{quote(field)}' for field in fields[-2:]),
+    )
+    values = [_sql_values(delta[column]) for column in ROLLUP_FIELDS]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [(dataset.pk, *row) for row in zip(*values)])
+
+
+def read_rollup(dataset):
+    """Load a dataset's stored rollup as a frame shaped like rollups.build_rollup output."""
+    fields = list(ROLLUP_FIELDS.values())
+    sql, params = SalesRollup.objects.filter(dataset=dataset).values_list(*fields).query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rollup = pd.DataFrame.from_records(cursor.fetchall(), columns=list(ROLLUP_FIELDS))
+    rollup['Day'] = pd.to_datetime(rollup['Day'])
+    for column in ROLLUP_DIMENSIONS:
+        if column in dataset.columns:
+            rollup[column] = rollup[column].replace('', None)
+        else:
+            rollup = rollup.drop(columns=column)
+    return rollup
+
+
+def read_frame(dataset):
+    """
+    Read a dataset's transactions back into a frame with the processed column names and dtypes.
+    The ORM only builds the SQL; rows are fetched with a plain cursor because
+    per-row model and datetime conversion would dominate on large results.
+    """
+    queryset = dataset.transactions.all()
+    columns = list(dataset.columns)
+    fields = [COLUMN_FIELDS[column] for column in columns]
+    sql, params = queryset.order_by('pk').values_list(*fields).query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        frame = pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
+    for column, spec in dataset.columns.items():
+        frame[column] = _restore_dtype(frame[column], spec)
+    return frame
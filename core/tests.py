@@ -1,3 +1,277 @@
-from django.test import TestCase
+import hashlib
+import os
+import pickle
+import tempfile
+from unittest import skipUnless
+
+import numpy as np
+import pandas as pd
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from . import views
+from .caching import canonicalize_filters, make_etag
+from .dict_data import value_vocabulary
+from .data_filter import DataFilter
+from .facets import FacetIndex
+from .graph_generator import GraphGenerator
+from .pagination import PaginationError, decode_cursor, encode_cursor, query_fingerprint
+from .preprocessing import learn_value_mapping
+from .query_backends import DUCKDB_AVAILABLE, DuckDBBackend, categories_of, export_table
+from .sketches import HyperLogLog, KLLSketch
+from .models import Dataset
+from .storage import read_frame, save_dataset
+
+
+class CanonicalFiltersTests(SimpleTestCase):
+    def test_range_bounds_compare_as_numbers(self):
+        # A GET query string parses to floats, a JSON body to ints
+        self.assertEqual(
+            canonicalize_filters({'age_range': [18.0, 35.0]}),
+            canonicalize_filters({'age_range': [18, 35]}),
+        )
+        self.assertEqual(
+            make_etag('v1', {'age_range': (18, 35), 'category': 'Footwear'}),
+            make_etag('v1', {'category': 'Footwear', 'age_range': [18.0, 35.0]}),
+        )
+
+    def test_empty_filters_are_dropped(self):
+        self.assertEqual(canonicalize_filters({'category': '', 'location': None, 'age_range': []}), '{}')
+
+
+class CursorTests(SimpleTestCase):
+    def setUp(self):
+        self.fingerprint = query_fingerprint('v1', '-customer_id', None, '2026-01-05')
+
+    def test_cursor_round_trips(self):
+        self.assertEqual(decode_cursor(encode_cursor(300, self.fingerprint), self.fingerprint), 300)
+
+    def test_cursor_of_another_query_is_rejected(self):
+        cursor = encode_cursor(300, self.fingerprint)
+        for stale in (
+            query_fingerprint('v2', '-customer_id', None, '2026-01-05'),
+            query_fingerprint('v1', 'customer_id', None, '2026-01-05'),
+            query_fingerprint('v1', '-customer_id', 'Texas', '2026-01-05'),
+            # The list was rebuilt the next day
+            query_fingerprint('v1', '-customer_id', None, '2026-01-06'),
+        ):
+            with self.assertRaises(PaginationError):
+                decode_cursor(cursor, stale)
+
+    def test_tampered_cursors_are_rejected(self):
+        forged = encode_cursor(300, 'not-the-fingerprint')
+        negative = encode_cursor(-100, self.fingerprint)
+        for cursor in (forged, negative, 'not base64!', encode_cursor(300, self.fingerprint)[:-4]):
+            with self.assertRaises(PaginationError):
+                decode_cursor(cursor, self.fingerprint)
+
+
+class HyperLogLogTests(SimpleTestCase):
+    def test_count_is_within_the_standard_error(self):
+        for distinct in (300, 50_000):
+            values = np.arange(distinct).repeat(3)
+            estimate = HyperLogLog().update(values).count()
+            # Four standard errors at p=12
+            self.assertLess(abs(estimate - distinct) / distinct, 4 * 0.0163)
+
+    def test_union_matches_a_single_sketch(self):
+        values = np.arange(20_000)
+        parts = [HyperLogLog().update(chunk) for chunk in np.array_split(values, 50)]
+        self.assertEqual(HyperLogLog.union(parts).count(), HyperLogLog().update(values).count())
+
+
+class KLLSketchTests(SimpleTestCase):
+    def setUp(self):
+        self.values = np.random.default_rng(7).lognormal(5, 1, 100_000)
+
+    def assertRankError(self, sketch, tolerance):
+        for q in (0.01, 0.25, 0.5, 0.9, 0.99):
+            rank = np.mean(self.values <= sketch.quantile(q))
+            self.assertLess(abs(rank - q), tolerance, f'q={q}')
+
+    def test_quantiles_are_within_the_rank_error(self):
+        sketch = KLLSketch().update(self.values)
+        self.assertRankError(sketch, 0.01)
+        self.assertEqual(sketch.quantile(0), self.values.min())
+        self.assertEqual(sketch.quantile(1), self.values.max())
+
+    def test_union_of_partitions_is_within_the_rank_error(self):
+        parts = [KLLSketch().update(chunk) for chunk in np.array_split(self.values, 400)]
+        merged = KLLSketch.union(parts)
+        self.assertEqual(merged.n, self.values.size)
+        self.assertRankError(merged, 0.01)
+
+    def test_same_inputs_give_the_same_sketch(self):
+        # Cached summaries are served under one ETag, so rebuilding them must not change them
+        parts = [KLLSketch().update(chunk) for chunk in np.array_split(self.values, 400)]
+        first, second = KLLSketch.union(parts), KLLSketch.union(pickle.loads(pickle.dumps(parts)))
+        for q in (0.05, 0.5, 0.95):
+            self.assertEqual(first.quantile(q), second.quantile(q))
+        self.assertEqual(
+            KLLSketch().update(self.values).quantile(0.5), KLLSketch().update(self.values).quantile(0.5),
+        )
+
+
+class ValueMappingTests(SimpleTestCase):
+    def mapped(self, column, *values):
+        mapping = learn_value_mapping({value: 1 for value in values}, value_vocabulary[column])
+        return [mapping[value] for value in values]
+
+    def test_variant_spellings_join_the_vocabulary(self):
+        self.assertEqual(
+            self.mapped('Category', 'Clothing', 'clothing ', 'Cloths', 'CLOTHING', 'Accesories'),
+            ['Clothing', 'Clothing', 'Clothing', 'Clothing', 'Accessories'],
+        )
+
+    def test_distinct_values_are_not_merged_into_a_shorter_or_similar_one(self):
+        cases = {
+            'Region/Zone': ['Northeast', 'Southwest', 'Western', 'Westminster'],
+            'Store Size': ['Medium Large', 'X-Large'],
+            'Category': ['Foot care', 'Clothing Accessories', 'Electrical'],
+            'Gender': ['Maleficent'],
+        }
+        for column, values in cases.items():
+            with self.subTest(column=column):
+                self.assertEqual(self.mapped(column, *values), values)
+
+    def test_unknown_values_differing_in_digits_or_words_stay_apart(self):
+        values = ['California, Urban', 'California, Suburban', 'Zone 1', 'Zone 2']
+        self.assertEqual(self.mapped('Location', *values), values)
+
+
+class StorageRoundTripTests(TestCase):
+    def test_stored_frame_reads_back_with_its_dtypes(self):
+        frame = pd.DataFrame({
+            'Customer_ID': ['C1', 'C2', None],
+            'Category': pd.Categorical(['Footwear', None, 'Clothing']),
+            'Age_bins': pd.Categorical(['18-25', '26-35', '18-25'], categories=['18-25', '26-35', '36-45'], ordered=True),
+            'Date': pd.to_datetime(['2024-01-05 10:30:00', '2024-02-29 23:59:59.250000', None], format='ISO8601'),
+            'Is_Weekend': [False, True, False],
+            'Age': np.array([21, 30, 40], dtype='int64'),
+            'Purchase Amount (USD)': [19.99, np.nan, 250.0],
+        })
+        save_dataset(frame, 'v1')
+        pd.testing.assert_frame_equal(read_frame(Dataset.objects.get(version='v1')), frame, check_like=True)
+
+
+class UploadStoreTests(SimpleTestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.upload_dir = os.path.join(media_root.name, 'uploads')
+        settings_override = override_settings(MEDIA_ROOT=media_root.name, UPLOAD_STORE_MAX_FILES=2)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def store(self, name, content, age=0):
+        path, file_version = views._store_upload(SimpleUploadedFile(name, content))
+        # Uploads made within one clock tick would otherwise tie on mtime
+        os.utime(path, (os.path.getmtime(path) - age,) * 2)
+        return path, file_version
+
+    def test_same_bytes_share_one_file_named_by_their_hash(self):
+        path, file_version = self.store('sales.CSV', b'a,b\n1,2\n')
+        again, version_again = self.store('renamed.csv', b'a,b\n1,2\n')
+        self.assertEqual(file_version, hashlib.sha256(b'a,b\n1,2\n').hexdigest())
+        self.assertEqual((again, version_again), (path, file_version))
+        self.assertEqual(os.listdir(self.upload_dir), [file_version + '.csv'])
+
+    def test_least_recent_uploads_beyond_the_limit_are_pruned(self):
+        os.makedirs(self.upload_dir)
+        with open(os.path.join(self.upload_dir, 'notes.txt'), 'w') as f:
+            f.write('not an upload')
+        oldest, _ = self.store('a.csv', b'1', age=30)
+        older, _ = self.store('b.csv', b'2', age=20)
+        newest, _ = self.store('c.csv', b'3')
+        self.assertFalse(os.path.exists(oldest))
+        self.assertEqual(
+            sorted(os.listdir(self.upload_dir)),
+            sorted([os.path.basename(older), os.path.basename(newest), 'notes.txt']),
+        )
+
+
+class FacetCountsTests(SimpleTestCase):
+    def setUp(self):
+        self.index = FacetIndex(pd.DataFrame({
+            'Category': ['Footwear', 'Footwear', 'Clothing', 'Clothing', 'Clothing'],
+            'Location': ['Texas', 'Ohio', 'Texas', 'Texas', 'Ohio'],
+            'Age': [20, 30, 22, 40, 25],
+            'Age_bins': ['18-25', '26-35', '18-25', '36-45', '18-25'],
+            'Review Rating': [4.0, 3.0, 5.0, 2.0, 4.0],
+            'Date': pd.to_datetime(['2024-01-01', '2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05']),
+        }))
+
+    def test_each_facet_leaves_out_its_own_filter(self):
+        counts = self.index.counts({'category': 'Footwear', 'location': 'Texas'})
+        self.assertEqual(counts['total'], 1)
+        self.assertEqual(counts['facets']['category'], {'Clothing': 2, 'Footwear': 1})
+        self.assertEqual(counts['facets']['location'], {'Ohio': 1, 'Texas': 1})
+        self.assertEqual(counts['facets']['age_bins'], {'18-25': 1, '26-35': 0, '36-45': 0})
+
+    def test_a_range_filter_narrows_the_other_facets_only(self):
+        counts = self.index.counts({'age_range': [18, 25], 'start_date': '2024-01-01', 'end_date': '2024-01-03'})
+        self.assertEqual(counts['total'], 2)
+        self.assertEqual(counts['facets']['age_bins'], {'18-25': 2, '26-35': 1, '36-45': 0})
+        self.assertEqual(counts['facets']['category'], {'Clothing': 1, 'Footwear': 1})
+        self.assertEqual(counts['facets']['rating'], {'2.0': 0, '3.0': 0, '4.0': 1, '5.0': 1})
+
+
+@skipUnless(DUCKDB_AVAILABLE, 'duckdb is not installed')
+class QueryBackendParityTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rng = np.random.default_rng(7)
+        rows = 400
+        dates = pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 730 * 24 * 3600, rows), unit='s')
+        ages = rng.integers(18, 70, rows)
+        frame = pd.DataFrame({
+            'Store Name': rng.choice(['Store_1', 'Store_2', 'Store_3'], rows),
+            'Store Size': rng.choice(['Small', 'Medium', 'Large'], rows),
+            'Region/Zone': rng.choice(['North', 'South', 'East', 'West'], rows),
+            'Product_id': rng.integers(1, 50, rows).astype(float),
+            'Category': rng.choice(['Clothing', 'Footwear', 'Accessories'], rows),
+            'Location': rng.choice(['Texas, Rural', 'Ohio, Urban', 'Florida, Coastal'], rows),
+            'Purchase Amount (USD)': rng.uniform(10, 600, rows).round(2),
+            'Promo_code': rng.integers(0, 2, rows).astype(float),
+            'Discount': rng.choice([0.0, 10.0, 20.0], rows),
+            'Date': dates,
+            'Previous Purchases': rng.integers(0, 40, rows).astype(float),
+            'Age': ages,
+            'Gender': rng.choice(['Male', 'Female'], rows),
+            'Review Rating': rng.integers(1, 6, rows).astype(float),
+            'Customer_ID': rng.integers(1, 80, rows).astype(float),
+            'Year': dates.year.astype('int32'),
+            'Month': dates.month.astype('int32'),
+            'Season': rng.choice(['Winter', 'Spring', 'Summer', 'Fall'], rows),
+            'Hour': dates.hour.astype('int32'),
+            'Day_of_Week': dates.day_name(),
+            'Is_Weekend': dates.weekday >= 5,
+            'Age_bins': pd.cut(ages, [0, 25, 45, 100], labels=['Young Adult', 'Adult', 'Senior']),
+        })
+        customers = frame.groupby('Customer_ID')
+        frame['Recency'] = (frame['Date'].max() - customers['Date'].transform('max')).dt.days
+        frame['Frequency'] = customers['Date'].transform('size')
+        frame['Monetary'] = customers['Purchase Amount (USD)'].transform('sum')
+        cls.frame = frame
+
+        cls.table_dir = tempfile.TemporaryDirectory()
+        cls.table = export_table(frame, os.path.join(cls.table_dir.name, 'transactions.parquet'))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.table_dir.cleanup()
+        super().tearDownClass()
+
+    def test_duckdb_graphs_match_pandas(self):
+        for filters in (
+            {},
+            {'category': 'Footwear'},
+            {'age_range': [25, 40]},
+            {'start_date': '2023-03-01', 'end_date': '2023-09-30'},
+        ):
+            with self.subTest(filters=filters):
+                rows = DataFilter(self.frame.copy()).apply(filters).get_filtered_data()
+                backend = DuckDBBackend(self.table, categories_of(self.frame)).filter(filters)
+                self.assertEqual(GraphGenerator(backend).generate_graphs(), GraphGenerator(rows).generate_graphs())
 
-# Create your tests here.
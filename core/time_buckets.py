@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+GRANULARITIES = ('day', 'week', 'month', 'quarter')
+
+# Code given to missing dates; real codes are negative before 1970
+MISSING_CODE = np.iinfo(np.int64).min
+
+# 1970-01-01 was a Thursday; shifting by three days makes weeks start on Monday
+_WEEK_OFFSET_DAYS = 3
+
+
+def _check_granularity(granularity):
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unsupported granularity '{granularity}'. Choose from {GRANULARITIES}.")
+
+
+def period_codes(dates, granularity='month'):
+    """
+    Map datetimes to integer period codes without any string formatting.
+    Codes are consecutive integers for consecutive periods (days, Monday-based
+    weeks, months or quarters since the epoch). Missing dates map to MISSING_CODE.
+    """
+    _check_granularity(granularity)
+    values = pd.to_datetime(pd.Series(dates)).to_numpy(dtype='datetime64[ns]')
+    missing = np.isnat(values)
+
+    if granularity in ('day', 'week'):
+        codes = values.astype('datetime64[D]').astype(np.int64)
+        if granularity == 'week':
+            codes = (codes + _WEEK_OFFSET_DAYS) // 7
+    else:
+        codes = values.astype('datetime64[M]').astype(np.int64)
+        if granularity == 'quarter':
+            codes = codes // 3
+
+    codes[missing] = MISSING_CODE
+    return codes
+
+
+def period_starts(codes, granularity='month'):
+    """Return the first instant of each period code as a DatetimeIndex."""
+    _check_granularity(granularity)
+    codes = np.asarray(codes, dtype=np.int64)
+    if granularity == 'day':
+        starts = codes.astype('datetime64[D]')
+    elif granularity == 'week':
+        starts = (codes * 7 - _WEEK_OFFSET_DAYS).astype('datetime64[D]')
+    elif granularity == 'month':
+        starts = codes.astype('datetime64[M]')
+    else:
+        starts = (codes * 3).astype('datetime64[M]')
+    return pd.DatetimeIndex(starts.astype('datetime64[ns]'))
+
+
+def bucket_sum(dates, values, granularity='month'):
+    """
+    Sum values per period, filling empty periods between the first and last with zero.
+    Returns (codes, sums) where codes is the contiguous range of period codes.
+    """
+    codes = period_codes(dates, granularity)
+    weights = np.asarray(values, dtype=np.float64)
+    valid = (codes != MISSING_CODE) & ~np.isnan(weights)
+    codes, weights = codes[valid], weights[valid]
+    if codes.size == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+    first = codes.min()
+    sums = np.bincount(codes - first, weights=weights)
+    return np.arange(first, first + sums.size, dtype=np.int64), sums
+
+
+def describe_dates(dates, resolution='day', weights=None):
+    """
+    Describe where dates fall: the first and last day, and the transactions
+    (or summed weights) per period from the first period to the last.
+    Buckets are contiguous, so a bucket's period is `start` plus its position.
+    """
+    dates = pd.Series(pd.to_datetime(dates))
+    weights = np.ones(len(dates)) if weights is None else np.asarray(weights, dtype=np.float64)
+    codes, counts = bucket_sum(dates, weights, resolution)
+    if codes.size == 0:
+        return {'resolution': resolution, 'min': None, 'max': None, 'start': None, 'counts': []}
+    return {
+        'resolution': resolution,
+        'min': dates.min().strftime('%Y-%m-%d'),
+        'max': dates.max().strftime('%Y-%m-%d'),
+        'start': period_starts(codes[:1], resolution)[0].strftime('%Y-%m-%d'),
+        'counts': np.rint(counts).astype(np.int64).tolist(),
+    }
@@ -6,6 +6,15 @@ app_name = 'core'
 urlpatterns = [
     path('', views.index, name='index'),
     path('upload/', views.upload_file, name='upload'),
+    path('dashboard/exact/<str:version>/', views.exact_dashboard, name='exact_dashboard'),
     path('filter/', views.filter_data, name='filter'),
     path('generate_report/', views.generate_report, name='generate_report'),
+    path('reports/', views.submit_report, name='submit_report'),
+    path('reports/<str:report_id>/', views.report_status, name='report_status'),
+    path('reports/<str:report_id>/download/', views.report_download, name='report_download'),
+    path('lists/<str:name>/', views.entity_list, name='entity_list'),
+    path('dates/domain/', views.date_domain, name='date_domain'),
+    path('facets/', views.facet_counts, name='facet_counts'),
+    path('profile/', views.dataset_profile, name='dataset_profile'),
+    path('progress/<str:job_id>/', views.progress_stream, name='progress_stream'),
 ]
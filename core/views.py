@@ -2,220 +2,1168 @@ import base64
 from datetime import time
 import shutil
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
-import pandas as pd
 import os
 from django.conf import settings
-from .preprocessing import DataPreprocessor
-from .data_filter import DataFilter
-from .graph_generator import GraphGenerator
-from .models_ai import SalesPredictor
-from .dict_data import synonym_dict
-from .report_generator import ReportGenerator
+from .dict_data import dtype_dict, synonym_dict, value_vocabulary
+from .encoding import FastJsonResponse, dumps, columnar_graphs, to_columnar, wants_columnar
+from .caching import LRUCache, canonicalize_filters, make_etag, etag_matches, not_modified, apply_cache_headers
+from .report_jobs import ReportJobManager, READY, FAILED
+from .disk_cache import DiskCache
+from .progress import JOB_ID, NULL_PROGRESS, ProgressRegistry, event_stream, sync_event_stream
+from .cpu_pool import CPUPool, PoolBusy, in_worker
+from asgiref.sync import sync_to_async
+from .pagination import PaginationError, query_fingerprint, decode_cursor, parse_page_size, sort_records, search_records, ndjson_page_response
+import datetime
+import hashlib
 import json
-from django.core.serializers.json import DjangoJSONEncoder
+import logging
+import re
+import threading
+
+# pandas, sklearn, mlxtend, geopy, rapidfuzz and fpdf are imported inside the views
+# that need them, so workers boot fast and pages like index never load them.
+
+logger = logging.getLogger(__name__)
 
 # Global variables (consider using Django sessions or database in production)
 data = None
 pdata = None
+# Content hash of the upload behind pdata; part of every response validator
+dataset_version = None
+# Per-partition sketches of pdata for distinct counts and percentiles (None for samples)
+sketch_index = None
+# The stored Dataset behind pdata, when it is persisted
+stored_dataset = None
+# Day x hour x category x location x store sales rollup of pdata (None for samples)
+rollup = None
+# When this worker last switched datasets; newer stored activations get loaded
+seen_store_time = None
+# Parquet copy of pdata that DuckDB answers the filtered graphs from (None: pandas)
+query_table = None
+
+RANGE_FILTERS = ('age_range', 'rating_range')
+
+# Dimensions that get a per-segment next-month forecast on upload
+SEGMENT_FORECAST_COLUMNS = ('Category', 'Location', 'Store Name')
+
+# Graph payloads for recently requested filter sets, keyed by their ETag; reset on upload
+graph_cache = LRUCache(max_entries=32)
+
+# The dashboard and report forms name their filters in camelCase
+FILTER_ALIASES = {
+    'ageRange': 'age_range',
+    'ratingRange': 'rating_range',
+    'startDate': 'start_date',
+    'endDate': 'end_date',
+}
+
+# Background report builds; finished reports are reused until they expire
+report_jobs = ReportJobManager(
+    max_workers=settings.REPORT_WORKERS, ttl=settings.REPORT_CACHE_TTL,
+    directory=os.path.join(settings.STATIC_ROOT, 'reports'),
+    max_files=settings.REPORT_CACHE_MAX_FILES, max_pending=settings.REPORT_MAX_PENDING,
+)
+
+# Fitted forecasts keyed by monthly-series fingerprint; persists across restarts
+forecast_cache = DiskCache(settings.FORECAST_CACHE_DIR, max_entries=settings.FORECAST_CACHE_MAX_ENTRIES)
+
+# Files in the upload store are named by the sha256 of their contents
+UPLOAD_NAME = re.compile(r'[0-9a-f]{64}(\.\w+)?')
+
+# Finished dashboard payloads by upload hash, so re-uploading the same bytes skips the pipeline
+payload_cache = DiskCache(
+    settings.PAYLOAD_CACHE_DIR,
+    max_entries=settings.PAYLOAD_CACHE_MAX_ENTRIES,
+    max_bytes=settings.PAYLOAD_CACHE_MAX_BYTES,
+)
+
+# Column profiles of uploads as parsed, by upload hash; written by the CPU pool workers
+profile_cache = DiskCache(settings.PROFILE_CACHE_DIR, max_entries=settings.PROFILE_CACHE_MAX_ENTRIES)
+
+# Datasets as (frame, sketches, rollup) by version, written where they are built
+# and loaded by the CPU pool workers that serve them
+dataset_snapshots = DiskCache(settings.DATASET_SNAPSHOT_DIR, max_entries=settings.DATASET_SNAPSHOT_MAX_ENTRIES)
+
+# Value spellings learned per upload source (file name), so later uploads from the
+# same source only score values not seen before
+value_mappings = DiskCache(settings.VALUE_MAPPING_CACHE_DIR, max_entries=settings.VALUE_MAPPING_CACHE_MAX_ENTRIES)
+
+# Stage events of running uploads and report builds, followed over /progress/<id>/
+progress_jobs = ProgressRegistry()
+
+# Processes for the CPU-heavy stages of the async views; full means 429
+cpu_pool = CPUPool(
+    max_workers=settings.CPU_POOL_WORKERS, max_pending=settings.CPU_POOL_MAX_PENDING, registry=progress_jobs,
+)
+
+# Guards swapping pdata/dataset_version, which background exact builds also do
+dataset_lock = threading.Lock()
+
+# Exact dashboards computed in the background after an approximate upload, by file hash
+exact_results = LRUCache(max_entries=8)
+
+# Per-dataset derived data: the base entity list of each name, the date domains
+# and the facet index; reset on upload
+list_cache = {}
+# Sorted/searched entity lists keyed by (list name, day, sort, search); bounded, as
+# every distinct ?q= and ?sort= would otherwise keep a full copy of a list
+list_views = LRUCache(max_entries=32)
+
+LIST_BUILDERS = {
+    'churned_customers': lambda generator: generator.list_churned_customers(reference_date=datetime.datetime.now()),
+    'basket_rules': lambda generator: generator.list_basket_rules(),
+}
+
+# Resolutions the date-domain endpoint buckets transactions by
+DATE_RESOLUTIONS = ('day', 'week', 'month')
 
 def index(request):
     return render(request, 'core/index.html')
 
-@csrf_exempt
-def upload_file(request):
-    global pdata
-    if request.method != 'POST' or 'file' not in request.FILES:
-        return JsonResponse({"error": "No file selected or uploaded"}, status=400)
+def _compute_cards(frame):
+    from .sampling import approximate_cards, is_sampled
+
+    if is_sampled(frame):
+        return approximate_cards(frame)[0]
+    return {
+        'Total Sales': round(frame['Purchase Amount (USD)'].sum(), 2) if 'Purchase Amount (USD)' in frame else 0,
+        'Total Transactions': frame.shape[0],
+        'Average Sales': round(frame['Purchase Amount (USD)'].mean(), 2) if 'Purchase Amount (USD)' in frame else 0,
+        'Average Rating': round(frame['Review Rating'].mean(), 2) if 'Review Rating' in frame else 0,
+    }
+
+def _preprocess(data, progress=NULL_PROGRESS, source=None):
+    """
+    Run the standard cleaning pipeline over a raw upload and return the processor.
+    `source` names where the upload came from; value spellings are learned per source.
+    """
+    from .preprocessing import DataPreprocessor
+
+    processor = DataPreprocessor(data=data)
+    processor.synonym_mapping(synonym_dict)
+    processor.remove_duplicate_columns()
+    progress.stage('synonym_mapping', rows=len(processor.data), columns=len(processor.data.columns))
+    known = value_mappings.get(source) if source else None
+    mappings = processor.normalize_values(value_vocabulary, known)
+    if source and mappings != known:
+        value_mappings.set(source, mappings)
+    progress.stage('values', rows=len(processor.data), columns=len(mappings))
+    processor.handle_missing_data()
+    progress.stage('imputation', rows=len(processor.data))
+    processor.process_outliers()
+    progress.stage('outliers', rows=len(processor.data))
+    processor.process_dates()
+    progress.stage('dates', rows=len(processor.data))
+
+    # Additional processing
+    if 'Latitude' in data.columns and 'Longitude' in data.columns and 'Location' not in data.columns:
+        processor.add_location_info(latitude_col="Latitude", longitude_col="Longitude")
+        progress.stage('locations', rows=len(processor.data))
+    if 'Age' in data.columns:
+        processor.convert_data_types(column="Age", dtype=int)
+        processor.bin_data(column="Age", 
+                         bins=[0, 18, 35, 60, 100], 
+                         labels=["Child", "Young Adult", "Adult", "Senior"], 
+                         new_column_name="Age_bins")
+        progress.stage('age_bins', rows=len(processor.data))
+
+    processor.calculate_rfm_metrics()
+    progress.stage('rfm', rows=len(processor.data))
+    return processor
+
+
+def _read_upload(file_path):
+    """Parse an upload, skipping the columns synonym_mapping would drop."""
+    from .ingest import read_upload
+
+    return read_upload(
+        file_path, workers=settings.UPLOAD_PARSE_WORKERS, synonym_dict=synonym_dict, dtype_dict=dtype_dict,
+    )
+
+
+def _save_processed(processor, version, name=''):
+    """Write the processed CSV and, when enabled, store the rows as the active dataset."""
+    processed_dir = os.path.join(settings.MEDIA_ROOT, 'processed')
+    os.makedirs(processed_dir, exist_ok=True)
+    processor.save_data(os.path.join(processed_dir, "processed_dataset.csv"))
+
+    if not settings.TRANSACTION_STORE:
+        return None
+    from .storage import save_dataset
+    return save_dataset(processor.data, version, name=name, keep=settings.TRANSACTION_STORE_KEEP)
+
+
+def _load_rollup(frame, stored=None):
+    """The sales rollup of an exact dataset: read back when stored, otherwise built here."""
+    from .rollups import build_rollup
+
+    if stored is not None:
+        from .storage import read_rollup
+        # Materialized while the rows were loaded
+        return read_rollup(stored)
+    return build_rollup(frame)
+
+
+def _query_table_path(version):
+    return os.path.join(settings.QUERY_TABLE_DIR, f'{version}.parquet')
+
+
+def _export_query_table(frame, version):
+    """
+    Write the Parquet copy DuckDB queries when the dataset is large enough for
+    it, keeping the copies of the most recent TRANSACTION_STORE_KEEP datasets.
+    """
+    from .query_backends import DUCKDB, export_table, select_backend
+
+    if select_backend(len(frame), settings.QUERY_BACKEND, settings.QUERY_BACKEND_MIN_ROWS) != DUCKDB:
+        return None
+    path = export_table(frame, _query_table_path(version))
+    tables = sorted(
+        (entry.path for entry in os.scandir(settings.QUERY_TABLE_DIR) if entry.name.endswith('.parquet')),
+        key=os.path.getmtime, reverse=True,
+    )
+    for stale in tables[max(settings.TRANSACTION_STORE_KEEP, 1):]:
+        os.remove(stale)
+    return path
+
+
+def _activate(frame, version, sketches=None, stored=None, sales_rollup=None):
+    """Make a dataset the one every view serves; callers hold dataset_lock."""
+    global pdata, dataset_version, sketch_index, stored_dataset, rollup, seen_store_time, query_table
+    from django.utils import timezone
+
+    pdata = frame
+    dataset_version = version
+    sketch_index = sketches
+    stored_dataset = stored
+    rollup = sales_rollup
+    seen_store_time = stored.activated_at if stored is not None else timezone.now()
+    query_table = _query_table_path(version)
+    if not os.path.exists(query_table):
+        query_table = None
+    list_cache.clear()
+    list_views.clear()
+    graph_cache.clear()
+
+
+def _sync_dataset():
+    """
+    Pick up the active stored dataset when another worker uploaded one, or after
+    a restart. Returns True when there is data to serve.
+    """
+    if not settings.TRANSACTION_STORE:
+        return pdata is not None
+    from .storage import active_dataset, read_frame
+    from .sketches import SketchIndex
+
+    active = active_dataset()
+    if active is None or (seen_store_time is not None and active.activated_at <= seen_store_time):
+        return pdata is not None
+    with dataset_lock:
+        if seen_store_time is None or active.activated_at > seen_store_time:
+            frame = read_frame(active)
+            _activate(frame, active.version, SketchIndex(frame), active, _load_rollup(frame, active))
+    return True
+
+
+def _payload_key(file_version, granularity):
+    # Churn flags in the payload are relative to today, so entries roll over daily
+    return (file_version, granularity, datetime.date.today().isoformat())
+
+
+def _cached_dashboard(file_version, granularity):
+    """
+    The payload of an upload seen before, with its dataset made the active one again.
+    Returns None on a miss, or when the dataset behind the payload is no longer stored.
+    """
+    global stored_dataset, seen_store_time
+
+    key = _payload_key(file_version, granularity)
+    payload = payload_cache.get(key)
+    if payload is None:
+        return None
+    from .storage import activate_dataset, read_frame
+    from .sketches import SketchIndex
+
+    with dataset_lock:
+        stored = activate_dataset(file_version) if settings.TRANSACTION_STORE else None
+        if dataset_version == file_version:
+            if stored is not None:
+                stored_dataset, seen_store_time = stored, stored.activated_at
+        elif stored is not None:
+            frame = read_frame(stored)
+            _activate(frame, file_version, SketchIndex(frame), stored, _load_rollup(frame, stored))
+        else:
+            payload_cache.delete(key)
+            return None
+    return payload
+
+
+def _dashboard_payload(frame, granularity, sketches=None, sales_rollup=None, progress=NULL_PROGRESS):
+    """Cards, graphs and forecasts for a processed dataset (exact or sampled)."""
+    from .graph_generator import GraphGenerator
+    from .models_ai import SalesPredictor
+    from .sampling import SAMPLE_WEIGHT, ApproximateGraphGenerator, approximate_cards, is_sampled
+
+    sampled = is_sampled(frame)
+    if sampled:
+        graph_generator = ApproximateGraphGenerator(frame)
+        cards, card_bounds = approximate_cards(frame, graph_generator.confidence)
+        # Weighted amounts make every period total an estimate of the full data's
+        forecast_frame = frame.assign(**{
+            'Purchase Amount (USD)': frame['Purchase Amount (USD)'] * frame[SAMPLE_WEIGHT]
+        })
+    else:
+        summary = sketches.summary() if sketches is not None else None
+        cards = _compute_cards(frame)
+        if summary is not None:
+            cards.update(summary.cards())
+        graph_generator = GraphGenerator(frame, sketches=summary, rollup=sales_rollup)
+        forecast_frame = frame
+
+    graphs = graph_generator.generate_graphs(progress)
+    if 'Date' in frame.columns:
+        graphs['available_dates_count'] = int(frame['Date'].dt.normalize().nunique())
+
+    predictor = SalesPredictor(forecast_frame, granularity=granularity)
+    response = predictor.forecast(cache=None if sampled else forecast_cache)
+    response = predictor.add_segment_forecasts(response, SEGMENT_FORECAST_COLUMNS)
+    progress.stage('forecast', rows=len(forecast_frame), granularity=granularity)
+
+    payload = {
+        'cards': cards,
+        'response': response,
+        'categories': frame['Category'].unique().tolist() if 'Category' in frame.columns else [],
+        'locations': frame['Location'].unique().tolist() if 'Location' in frame.columns else [],
+        'graphs': graphs,
+    }
+    if sampled:
+        payload['approximate'] = {
+            'card_bounds': card_bounds,
+            'graph_bounds': graph_generator.bounds,
+            'confidence': graph_generator.confidence,
+        }
+    return payload
+
+
+def _build_exact(file_path, file_version, name, granularity, progress=NULL_PROGRESS):
+    """
+    Parse, clean and store an upload and build its dashboard. Runs in the CPU
+    pool, so it only works on its arguments and the database.
+    Returns (frame, stored, sketches, sales_rollup, payload).
+    """
+    from .sketches import SketchIndex
+
+    from .profiling import profile_frame
+
+    raw = _read_upload(file_path)
+    progress.stage('parse', rows=len(raw), columns=len(raw.columns))
+    if profile_cache.get(file_version) is None:
+        # Profiled as parsed, so null counts and odd values show before cleaning hides them
+        profile_cache.set(file_version, profile_frame(raw).to_dict())
+        progress.stage('profile', rows=len(raw))
+    processor = _preprocess(raw, progress, source=name)
+    stored = _save_processed(processor, file_version, name)
+    frame = processor.data
+    table = _export_query_table(frame, file_version)
+    progress.stage('save', rows=len(frame), stored=stored is not None, query_table=table is not None)
+    sketches = SketchIndex(frame)
+    sales_rollup = _load_rollup(frame, stored)
+    progress.stage('indexes', rows=len(frame))
+    payload = _dashboard_payload(frame, granularity, sketches, sales_rollup, progress)
+    _keep_built(frame, file_version, sketches, stored, sales_rollup)
+    return frame, stored, sketches, sales_rollup, payload
+
+
+def _build_sample(file_path, file_version, name, granularity, progress=NULL_PROGRESS):
+    """
+    The dashboard of a stratified sample of an upload, built in the CPU pool.
+    The sampling pass reads every row, so it profiles the upload as well.
+    Returns (frame, payload, rows_seen).
+    """
+    from .profiling import DatasetProfile
+    from .sampling import sample_csv, attach_sample_design
+
+    profile = DatasetProfile()
+    reservoir = sample_csv(
+        file_path, synonym_dict, per_stratum=settings.APPROXIMATE_SAMPLE_PER_STRATUM, profile=profile,
+    )
+    sample, strata = reservoir.sample()
+    profile_cache.set(file_version, profile.to_dict())
+    progress.stage('parse', rows=reservoir.rows_seen, sampled=len(sample))
+    processor = _preprocess(sample, progress, source=name)
+    frame = attach_sample_design(processor.data, strata, reservoir.population)
+    payload = _dashboard_payload(frame, granularity, progress=progress)
+    _keep_built(frame, f'{file_version}:approx', None, None, None)
+    return frame, payload, reservoir.rows_seen
+
+
+def _keep_built(frame, version, sketches, stored, sales_rollup):
+    """Snapshot a dataset a CPU pool worker just built, which that worker then serves."""
+    dataset_snapshots.set(version, (frame, sketches, sales_rollup))
+    if in_worker():
+        _activate(frame, version, sketches, stored, sales_rollup)
+
+
+def _switch_dataset(frame, version, sketches=None, stored=None, sales_rollup=None):
+    with dataset_lock:
+        _activate(frame, version, sketches, stored, sales_rollup)
+
+
+def _hold_dataset(version):
+    """
+    Make a dataset the one this CPU pool worker serves, loading it once per
+    version from its snapshot, or from the database once the snapshot is evicted.
+    """
+    from .models import Dataset
+    from .sketches import SketchIndex
+    from .storage import read_frame
+
+    if dataset_version == version:
+        return
+    snapshot = dataset_snapshots.get(version)
+    if snapshot is not None:
+        frame, sketches, sales_rollup = snapshot
+        _activate(frame, version, sketches, None, sales_rollup)
+        return
+    stored = Dataset.objects.filter(version=version).first() if settings.TRANSACTION_STORE else None
+    if stored is None:
+        raise LookupError('The dataset was replaced; reload the dashboard')
+    frame = read_frame(stored)
+    sketches, sales_rollup = SketchIndex(frame), _load_rollup(frame, stored)
+    dataset_snapshots.set(version, (frame, sketches, sales_rollup))
+    _activate(frame, version, sketches, stored, sales_rollup)
+
+
+def _with_dataset(version, func, *args):
+    _hold_dataset(version)
+    return func(*args)
+
+
+def _on_dataset(func, *args):
+    """
+    Arguments for cpu_pool.run/call that run func(*args) in a worker holding the
+    active dataset. Workers load it themselves, so no rows cross the pool.
+    """
+    return _with_dataset, dataset_version, func, *args
+
+
+def _finish_exact(file_path, file_version, name, granularity):
+    """
+    Compute the exact dashboard behind an approximate one.
+    The exact dataset replaces the sample only if no newer upload arrived meanwhile.
+    """
+    from django.db import connection
+
+    try:
+        frame, stored, sketches, sales_rollup, payload = cpu_pool.call(
+            _build_exact, file_path, file_version, name, granularity,
+        )
+        with dataset_lock:
+            if dataset_version == f'{file_version}:approx':
+                _activate(frame, file_version, sketches, stored, sales_rollup)
+        payload_cache.set(_payload_key(file_version, granularity), payload)
+        exact_results.set(file_version, {'status': 'ready', 'payload': payload})
+    except Exception as e:
+        exact_results.set(file_version, {'status': 'failed', 'error': f"Error processing file: {str(e)}"})
+    finally:
+        # This thread opened its own database connection
+        connection.close()
+
+
+def _store_upload(file):
+    """
+    Stream an upload into media/uploads under its sha256 while hashing it.
+    Identical bytes always land on the same file, so uploads never overwrite
+    each other by name. Returns (path, hash).
+    """
+    import tempfile
 
-    file = request.FILES['file']
     upload_dir = os.path.join(settings.MEDIA_ROOT, 'uploads')
     os.makedirs(upload_dir, exist_ok=True)
-    file_path = os.path.join(upload_dir, file.name)
-    
-    with open(file_path, 'wb+') as destination:
-        for chunk in file.chunks():
-            destination.write(chunk)
+    file_hash = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=upload_dir, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as destination:
+            for chunk in file.chunks():
+                file_hash.update(chunk)
+                destination.write(chunk)
+        file_version = file_hash.hexdigest()
+        file_path = os.path.join(upload_dir, file_version + os.path.splitext(file.name)[1].lower())
+        if os.path.exists(file_path):
+            os.remove(temp_path)
+            os.utime(file_path)
+        else:
+            os.replace(temp_path, file_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    _prune_uploads(upload_dir, keep=file_path)
+    return file_path, file_version
+
+
+def _prune_uploads(upload_dir, keep):
+    """Delete the least recently uploaded stored files beyond UPLOAD_STORE_MAX_FILES."""
+    # Only content-addressed files are the store's to delete
+    uploads = [
+        entry for entry in os.scandir(upload_dir)
+        if entry.is_file() and UPLOAD_NAME.fullmatch(entry.name) and entry.path != keep
+    ]
+    uploads.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in uploads[max(settings.UPLOAD_STORE_MAX_FILES - 1, 0):]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def _dashboard_response(request, response_data):
+    """Send a dashboard payload as JSON to XHR callers, or render the dashboard page."""
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        if wants_columnar(request):
+            response_data['graphs'] = columnar_graphs(response_data['graphs'])
+            response_data['response']['monthly_sales'] = to_columnar(response_data['response']['monthly_sales'])
+        return FastJsonResponse(response_data)
+
+    # Serialize the data for the template
+    data_json = dumps(response_data).decode('utf-8')
+    return render(request, 'core/dashboard.html', {
+        'data_json': data_json,
+        **response_data
+    })
+
+
+def _use_approximate(request, file_path):
+    from .ingest import uncompressed_size
+
+    mode = request.POST.get('mode', 'auto')
+    if mode not in ('auto', 'exact', 'approximate'):
+        raise ValueError(f"Unsupported mode '{mode}'")
+    if mode == 'auto':
+        # Compressed uploads are judged by the size of the CSV inside
+        return uncompressed_size(file_path) >= settings.APPROXIMATE_MIN_BYTES
+    return mode == 'approximate'
+
+
+def _busy(e):
+    """429 for a request turned away because the CPU pool is full."""
+    response = JsonResponse({'error': f'Server is busy, retry shortly: {str(e)}'}, status=429)
+    response['Retry-After'] = '5'
+    return response
+
+
+# Multipart parsing, hashing and database reads are blocking; they run in
+# threads so the event loop keeps serving other requests meanwhile
+def _off_loop(func):
+    return sync_to_async(func, thread_sensitive=False)
+
+
+def _read_files(request):
+    return request.FILES
+
+
+@csrf_exempt
+async def upload_file(request):
+    from .time_buckets import GRANULARITIES
+
+    # The ASGI handler has already received the body without blocking; parsing
+    # the multipart form spools the file to disk, so that happens in a thread
+    files = await _off_loop(_read_files)(request) if request.method == 'POST' else {}
+    if 'file' not in files:
+        return JsonResponse({"error": "No file selected or uploaded"}, status=400)
+
+    file = files['file']
+    granularity = request.POST.get('granularity', 'month')
+    if granularity not in GRANULARITIES:
+        return JsonResponse({"error": f"Unsupported granularity '{granularity}'"}, status=400)
+
+    # Clients pick the id and follow /progress/<id>/ while the upload runs
+    progress_id = request.POST.get('progress_id')
+    if progress_id and not JOB_ID.fullmatch(progress_id):
+        return JsonResponse({"error": "Invalid progress_id"}, status=400)
+    progress = progress_jobs.start(progress_id) if progress_id else NULL_PROGRESS
+
+    file_path, file_version = await _off_loop(_store_upload)(file)
+    progress.stage('upload', bytes=file.size)
 
     try:
-        data = pd.read_csv(file_path)
-        
-        # Process data
-        processor = DataPreprocessor(data=data)
-        processor.synonym_mapping(synonym_dict)
-        processor.remove_duplicate_columns()
-        processor.handle_missing_data()
-        processor.process_outliers()
-        processor.process_dates()
-
-        # Additional processing
-        if 'Latitude' in data.columns and 'Longitude' in data.columns and 'Location' not in data.columns:
-            processor.add_location_info(latitude_col="Latitude", longitude_col="Longitude")
-        if 'Age' in data.columns:
-            processor.convert_data_types(column="Age", dtype=int)
-            processor.bin_data(column="Age", 
-                             bins=[0, 18, 35, 60, 100], 
-                             labels=["Child", "Young Adult", "Adult", "Senior"], 
-                             new_column_name="Age_bins")
-        
-        processor.calculate_rfm_metrics()
-        pdata = processor.data
-        
-        # Save processed data
-        processed_dir = os.path.join(settings.MEDIA_ROOT, 'processed')
-        os.makedirs(processed_dir, exist_ok=True)
-        processor.save_data(os.path.join(processed_dir, "processed_dataset.csv"))
-
-        # Generate cards data
-        cards = {
-            'Total Sales': round(pdata['Purchase Amount (USD)'].sum(), 2) if 'Purchase Amount (USD)' in pdata else 0,
-            'Total Transactions': pdata.shape[0],
-            'Average Sales': round(pdata['Purchase Amount (USD)'].mean(), 2) if 'Purchase Amount (USD)' in pdata else 0,
-            'Average Rating': round(pdata['Review Rating'].mean(), 2) if 'Review Rating' in pdata else 0,
-        }
+        approximate = await _off_loop(_use_approximate)(request, file_path)
+    except ValueError as e:
+        progress.fail(e)
+        return JsonResponse({"error": str(e)}, status=400)
 
-        # Generate graphs
-        graph_generator = GraphGenerator(processor.data)
-        graphs = graph_generator.generate_graphs()
-        if 'Date' in pdata.columns:
-            graphs['available_dates'] = sorted(pdata['Date'].dt.strftime('%Y-%m-%d').unique().tolist())
+    try:
+        # The same bytes were processed before: serve the stored dashboard
+        # (the exact one, even when this upload asked for a sample)
+        response_data = await _off_loop(_cached_dashboard)(file_version, granularity)
+        if response_data is not None:
+            progress.finish(cached=True)
+            return await _off_loop(_dashboard_response)(request, response_data)
 
-        # Generate predictions
-        predictor = SalesPredictor(processor.data)
-        monthly_sales = predictor.preprocess_data()
-        monthly_sales, next_month_sales = predictor.predict_next_month_sales(monthly_sales)
+        if approximate:
+            # Build the dashboard from a stratified sample now; the exact one follows
+            frame, response_data, rows_seen = await cpu_pool.run(
+                _build_sample, file_path, file_version, file.name, granularity, cpu_pool.progress(progress),
+            )
+            version = f'{file_version}:approx'
+            sketches = stored = sales_rollup = None
+        else:
+            frame, stored, sketches, sales_rollup, response_data = await cpu_pool.run(
+                _build_exact, file_path, file_version, file.name, granularity, cpu_pool.progress(progress),
+            )
+            version = file_version
 
-        response = {
-            'monthly_sales': monthly_sales[['Month-Year', 'Purchase Amount (USD)', 'Predicted']].to_dict(orient='records'),
-            'next_month_sales': next_month_sales
-        }
-        response = predictor.process_sales_response(response)
-
-        # Prepare response data
-        response_data = {
-            'cards': cards,
-            'response': response,
-            'categories': pdata['Category'].unique().tolist() if 'Category' in pdata.columns else [],
-            'locations': pdata['Location'].unique().tolist() if 'Location' in pdata.columns else [],
-            'graphs': graphs,
-        }
+        await _off_loop(_switch_dataset)(frame, version, sketches, stored, sales_rollup)
 
-        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            return JsonResponse(response_data)
+        if approximate:
+            exact_results.set(file_version, {'status': 'pending'})
+            threading.Thread(target=_finish_exact, args=(file_path, file_version, file.name, granularity), daemon=True).start()
+            response_data['approximate'].update({
+                'sample_rows': len(frame),
+                'population_rows': rows_seen,
+                'exact_url': reverse('core:exact_dashboard', args=[file_version]),
+            })
+        else:
+            await _off_loop(payload_cache.set)(_payload_key(file_version, granularity), response_data)
 
-        # Serialize the data for the template
-        data_json = json.dumps(response_data, cls=DjangoJSONEncoder)
-        return render(request, 'core/dashboard.html', {
-            'data_json': data_json,
-            **response_data
-        })
+        progress.finish(rows=len(frame), approximate=approximate)
+        return await _off_loop(_dashboard_response)(request, response_data)
 
+    except PoolBusy as e:
+        progress.fail(e)
+        return _busy(e)
     except Exception as e:
+        progress.fail(e)
         return JsonResponse({"error": f"Error processing file: {str(e)}"}, status=400)
 
+
+def exact_dashboard(request, version):
+    """
+    Poll for the exact dashboard of an upload that was first served from a sample.
+    Returns 202 while it is being computed and the full payload once it is ready.
+    """
+    result = exact_results.get(version)
+    if result is None:
+        return JsonResponse({'error': 'Unknown or expired upload'}, status=404)
+    if result['status'] == 'pending':
+        return JsonResponse({'status': 'pending'}, status=202)
+    if result['status'] == 'failed':
+        return JsonResponse({'status': 'failed', 'error': result['error']}, status=500)
+    return FastJsonResponse(result['payload'])
+
+def _normalize_filters(filters):
+    return {FILTER_ALIASES.get(key, key): value for key, value in filters.items()}
+
+
+def _parse_filters(request):
+    """Read filters from a JSON/form POST body or from the query string of a GET."""
+    if request.method == 'GET':
+        if request.GET.get('filters'):
+            return _normalize_filters(json.loads(request.GET['filters']))
+        filters = {}
+        for key, value in request.GET.items():
+            if key == 'layout':
+                continue
+            key = FILTER_ALIASES.get(key, key)
+            if key in RANGE_FILTERS:
+                value = [float(bound) for bound in value.split(',')]
+            filters[key] = value
+        return filters
+
+    try:
+        return _normalize_filters(json.loads(request.body))
+    except json.JSONDecodeError:
+        logger.debug('Filter body is not JSON, reading it as form data')
+        return _normalize_filters(request.POST.dict())
+
+
+def _apply_filters(filters):
+    from .data_filter import DataFilter
+
+    return DataFilter(pdata.copy()).apply(filters).get_filtered_data()
+
+
+def _graphs_etag(request, filters):
+    # Churn flags are relative to today, so the validator rolls over daily
+    variant = f"{datetime.date.today().isoformat()}|{'columnar' if wants_columnar(request) else 'records'}"
+    return make_etag(dataset_version, filters, variant)
+
+
+def _sketch_summary(filters, filtered_data):
+    """Merge partition sketches for the filters, or sketch the filtered rows when they can't be merged."""
+    from .sketches import SketchSet
+
+    summary = sketch_index.summary(filters) if sketch_index is not None else None
+    return summary if summary is not None else SketchSet.from_frame(filtered_data)
+
+
+def _graphs_key(filters):
+    return make_etag(dataset_version, filters, datetime.date.today().isoformat())
+
+
+def _graph_inputs(filters):
+    """The filtered rows (or query) with their sketches and rollup, or None when no rows match."""
+    from .rollups import filter_rollup
+    from .sampling import is_sampled
+
+    if query_table is not None:
+        return _query_table_inputs(filters)
+    filtered_data = _apply_filters(filters)
+    if filtered_data.empty:
+        return None
+    if is_sampled(filtered_data):
+        return filtered_data, None, None
+    return filtered_data, _sketch_summary(filters, filtered_data), filter_rollup(rollup, filters)
+
+
+def _query_table_inputs(filters):
+    """_graph_inputs for a dataset DuckDB queries: the filters become part of the query."""
+    from .query_backends import DuckDBBackend, categories_of
+    from .rollups import filter_rollup
+    from .sketches import DISTINCT_COLUMNS, QUANTILE_COLUMNS, SketchSet
+
+    backend = DuckDBBackend(query_table, categories=categories_of(pdata)).filter(filters)
+    if backend.row_count() == 0:
+        return None
+    summary = sketch_index.summary(filters) if sketch_index is not None else None
+    if summary is None:
+        columns = [column for column in DISTINCT_COLUMNS + QUANTILE_COLUMNS if column in backend.columns]
+        summary = SketchSet.from_frame(backend.select(columns))
+    return backend, summary, filter_rollup(rollup, filters)
+
+
+def _render_graphs(filtered_data, summary=None, sales_rollup=None):
+    """Graphs for filtered rows or a filtered query backend; runs in the CPU pool for async views."""
+    from .graph_generator import GraphGenerator
+    from .sampling import ApproximateGraphGenerator, is_sampled
+
+    if is_sampled(filtered_data):
+        generator = ApproximateGraphGenerator(filtered_data)
+        graphs = generator.generate_graphs()
+        graphs['approximate'] = {'graph_bounds': generator.bounds, 'confidence': generator.confidence}
+    else:
+        graphs = GraphGenerator(filtered_data, sketches=summary, rollup=sales_rollup).generate_graphs()
+        graphs['percentile_cards'] = summary.cards()
+    return graphs
+
+
+def _cached_graphs(filters):
+    """Return the graphs for a filter set, or None when no rows match."""
+    key = _graphs_key(filters)
+    graphs = graph_cache.get(key)
+    if graphs is None:
+        inputs = _graph_inputs(filters)
+        if inputs is None:
+            return None
+        graphs = _render_graphs(*inputs)
+        graph_cache.set(key, graphs)
+    return graphs
+
+
+def _filtered_graphs(filters):
+    inputs = _graph_inputs(filters)
+    return None if inputs is None else _render_graphs(*inputs)
+
+
+async def _cached_graphs_async(filters):
+    """_cached_graphs with the filtering and the graphs both done in the CPU pool."""
+    key = _graphs_key(filters)
+    graphs = graph_cache.get(key)
+    if graphs is None:
+        graphs = await cpu_pool.run(*_on_dataset(_filtered_graphs, filters))
+        if graphs is None:
+            return None
+        graph_cache.set(key, graphs)
+    return graphs
+
+
 @csrf_exempt
-def filter_data(request):
-    global pdata
-    if pdata is None:
+async def filter_data(request):
+    if not await _off_loop(_sync_dataset)():
         return JsonResponse({'error': 'No data uploaded'}, status=400)
 
     try:
-        # Add debug logging
-        print(f"Request method: {request.method}")
-        print(f"Content type: {request.content_type}")
-        print(f"Body: {request.body.decode('utf-8')}")
-
-        # Ensure we're getting POST data
-        if request.method != 'POST':
+        # GET is accepted so that shared caches can store and revalidate filter results
+        if request.method not in ('GET', 'POST'):
             return JsonResponse({'error': 'Method not allowed'}, status=405)
 
-        # Parse JSON data
         try:
-            filters = json.loads(request.body)
-        except json.JSONDecodeError:
-            print("Failed to parse JSON, trying POST data")
-            filters = request.POST.dict()
-
-        print(f"Parsed filters: {filters}")
-
-        # Process filters
-        filtered_data = pdata.copy()
-        data_filter = DataFilter(filtered_data)
-        
-        if filters.get('category'):
-            filtered_data = filtered_data[filtered_data['Category'] == filters['category']]
-        
-        if filters.get('location'):
-            data_filter.filter_by_location(filters['location'])
-        
-        if filters.get('age_range'):
-            data_filter.filter_by_age_range(filters['age_range'])
-        
-        if filters.get('rating_range'):
-            data_filter.filter_by_rating_range(filters['rating_range'])
-        
-        if filters.get('start_date') and filters.get('end_date'):
-            data_filter.filter_by_date_range(filters['start_date'], filters['end_date'])
-
-        filtered_data = data_filter.get_filtered_data()
-
-        if filtered_data.empty:
+            filters = _parse_filters(request)
+        except (json.JSONDecodeError, ValueError):
+            return JsonResponse({'error': 'Invalid filters'}, status=400)
+
+        etag = _graphs_etag(request, filters)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        # Cached filter sets are answered straight from the event loop
+        graphs = await _cached_graphs_async(filters)
+
+        if graphs is None:
             return JsonResponse({'error': 'No data matches the selected filters'}, status=404)
 
-        # Generate graphs with filtered data
-        generator = GraphGenerator(filtered_data)
-        graphs = generator.generate_graphs()
-        
-        return JsonResponse(graphs, safe=False)
+        if wants_columnar(request):
+            graphs = columnar_graphs(graphs)
+
+        return apply_cache_headers(FastJsonResponse(graphs), etag)
 
+    except PoolBusy as e:
+        return _busy(e)
     except Exception as e:
-        import traceback
-        print(f"Error in filter_data: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception('Error in filter_data')
         return JsonResponse({'error': str(e)}, status=500)
 
-@csrf_exempt
-def generate_report(request):
-    global pdata
-    if pdata is None:
+def _build_list(name):
+    from .graph_generator import GraphGenerator
+
+    return LIST_BUILDERS[name](GraphGenerator(pdata))
+
+
+def _entity_list(name, sort, search):
+    """Return (day the base list was built, records) for a list name, sort and search."""
+    today = datetime.date.today()
+    # One base list per name; churn flags are relative to today, so it is rebuilt daily
+    built = list_cache.get(('list', name))
+    if built is None or built[0] != today:
+        # Basket rules take seconds, which would hold up the other sync views
+        built = list_cache[('list', name)] = (today, cpu_pool.call(*_on_dataset(_build_list, name)))
+    if sort is None and search is None:
+        return built
+
+    key = (name, today, sort, search)
+    records = list_views.get(key)
+    if records is None:
+        records = sort_records(search_records(built[1], search), sort)
+        list_views.set(key, records)
+    return today, records
+
+
+def entity_list(request, name):
+    """
+    Stream a page of a per-entity result list as NDJSON.
+    Supports ?limit=, ?cursor= (from the X-Next-Cursor header), ?sort=[-]field and ?q= search.
+    """
+    if not _sync_dataset():
         return JsonResponse({'error': 'No data uploaded'}, status=400)
+    if name not in LIST_BUILDERS:
+        return JsonResponse({'error': f'Unknown list: {name}'}, status=404)
 
-    if request.method != 'POST':
+    sort = request.GET.get('sort') or None
+    search = request.GET.get('q') or None
+
+    try:
+        limit = parse_page_size(request.GET.get('limit'))
+        built_on, records = _entity_list(name, sort, search)
+        # Lists are rebuilt daily, so a cursor from before midnight points into another list
+        fingerprint = query_fingerprint(dataset_version, sort, search, built_on)
+        cursor = request.GET.get('cursor')
+        offset = decode_cursor(cursor, fingerprint) if cursor else 0
+    except PaginationError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except PoolBusy as e:
+        return _busy(e)
+
+    return ndjson_page_response(records, offset, limit, fingerprint)
+
+def _date_domain(resolution):
+    from .sampling import SAMPLE_WEIGHT, is_sampled
+    from .time_buckets import describe_dates
+
+    key = ('date_domain', resolution)
+    if key not in list_cache:
+        if rollup is not None:
+            # Far fewer rows than the transactions, with the same daily counts
+            domain = describe_dates(rollup['Day'], resolution, rollup['Transactions'])
+        elif 'Date' not in pdata.columns:
+            domain = describe_dates([], resolution)
+        else:
+            # A sample's weights scale its counts up to the full data
+            weights = pdata[SAMPLE_WEIGHT] if is_sampled(pdata) else None
+            domain = describe_dates(pdata['Date'], resolution, weights)
+        list_cache[key] = domain
+    return list_cache[key]
+
+
+def date_domain(request):
+    """
+    The date range of the current dataset with a transaction density histogram,
+    at ?resolution=day (default), week or month. Drives the date-range filter.
+    """
+    if not _sync_dataset():
+        return JsonResponse({'error': 'No data uploaded'}, status=400)
+    resolution = request.GET.get('resolution', 'day')
+    if resolution not in DATE_RESOLUTIONS:
+        return JsonResponse({'error': f"Unsupported resolution '{resolution}'"}, status=400)
+
+    etag = make_etag(dataset_version, None, f'dates|{resolution}')
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return apply_cache_headers(FastJsonResponse(_date_domain(resolution)), etag)
+
+def dataset_profile(request):
+    """
+    Column profiles of the current dataset's upload as it was parsed: dtype,
+    nulls, distinct count, top values, and range, moments, quantiles and a
+    histogram for numeric and date columns. Computed during the upload.
+    """
+    if not _sync_dataset():
+        return JsonResponse({'error': 'No data uploaded'}, status=400)
+    # A sampled dataset is profiled from the full upload, under the same hash
+    version = dataset_version.split(':')[0]
+    etag = make_etag(version, None, 'profile')
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    profile = profile_cache.get(version)
+    if profile is None:
+        return JsonResponse({'error': 'No profile for the current dataset'}, status=404)
+    return apply_cache_headers(FastJsonResponse(profile), etag)
+
+def _facet_counts(filters):
+    from .facets import FacetIndex
+
+    if 'facet_index' not in list_cache:
+        list_cache['facet_index'] = FacetIndex(pdata)
+    return list_cache['facet_index'].counts(filters)
+
+
+@csrf_exempt
+def facet_counts(request):
+    """
+    Transactions per value of every filterable dimension under a filter set,
+    sent like filter_data's. Each facet leaves out its own filter, so it shows
+    what picking another value there would return.
+    """
+    if not _sync_dataset():
+        return JsonResponse({'error': 'No data uploaded'}, status=400)
+    if request.method not in ('GET', 'POST'):
         return JsonResponse({'error': 'Method not allowed'}, status=405)
+    try:
+        filters = _parse_filters(request)
+    except (json.JSONDecodeError, ValueError):
+        return JsonResponse({'error': 'Invalid filters'}, status=400)
 
+    etag = make_etag(dataset_version, filters, 'facets')
+    if etag_matches(request, etag):
+        return not_modified(etag)
     try:
-        data = json.loads(request.body)
-        filters = data.get('filters', {})
-        cards = data.get('cards', {})
-        graphs = data.get('graphs', [])
-
-        # Create reports directory if it doesn't exist
-        reports_dir = os.path.join(settings.STATIC_ROOT, 'reports')
-        os.makedirs(reports_dir, exist_ok=True)
-        
-        report_path = os.path.join(reports_dir, 'report.pdf')
-        report_generator = ReportGenerator(output_path=report_path)
+        counts = _facet_counts(filters)
+    except (TypeError, ValueError) as e:
+        return JsonResponse({'error': f'Invalid filters: {e}'}, status=400)
+    return apply_cache_headers(FastJsonResponse(counts), etag)
 
-        try:
-            graph_paths = report_generator.decode_and_save_images(graphs)
-        except ValueError as e:
-            return JsonResponse({'error': f"Failed to decode graphs: {str(e)}"}, status=400)
+def _prepare_report(data):
+    """Resolve a report request body into its content key, output path and build inputs."""
+    from .report_generator import ReportGenerator
+
+    filters = data.get('filters', {})
+    cards = data.get('cards', {})
+    graphs = data.get('graphs', [])
+    # Without uploaded images the charts are rendered here from the cached graph data
+    render = data.get('render') or ('client' if graphs else 'server')
+    chart_names = data.get('charts')
+
+    # Create reports directory if it doesn't exist
+    reports_dir = os.path.join(settings.STATIC_ROOT, 'reports')
+    os.makedirs(reports_dir, exist_ok=True)
+
+    server_filters = _normalize_filters(filters)
+    if render == 'server':
+        report_key = ReportGenerator.content_key(
+            'server', dataset_version, canonicalize_filters(server_filters), cards, chart_names,
+            datetime.date.today().isoformat()
+        )
+    else:
+        report_key = ReportGenerator.content_key('client', dataset_version, filters, cards, graphs)
+
+    # Reports are content-addressed: identical requests reuse the finished file
+    report_name = f'report_{report_key}.pdf'
+    return {
+        'report_id': report_key,
+        'report_path': os.path.join(reports_dir, report_name),
+        'relative_path': f'reports/{report_name}',
+        'render': render,
+        'filters': filters,
+        'server_filters': server_filters,
+        'cards': cards,
+        'graphs': graphs,
+        'chart_names': chart_names,
+    }
+
+
+def _report_cards(spec, server_graphs):
+    """The cards a server-rendered report shows: the client's, or computed for its filters."""
+    if spec['cards']:
+        return spec['cards']
+    cards = _compute_cards(_apply_filters(spec['server_filters']))
+    cards.update(server_graphs.get('percentile_cards', {}))
+    return cards
+
+
+def _write_report(spec, cards, server_graphs=None, progress=NULL_PROGRESS):
+    """
+    Render a report's charts and write its PDF. Runs in the CPU pool for
+    generate_report, so the graphs of a server render are passed in.
+    """
+    from .report_generator import ReportGenerator
+
+    with ReportGenerator(output_path=spec['report_path']) as report_generator:
+        if spec['render'] == 'server':
+            graph_paths = report_generator.render_graphs(server_graphs, spec['chart_names'])
+        else:
+            try:
+                graph_paths = report_generator.decode_and_save_images(spec['graphs'])
+            except ValueError as e:
+                raise ValueError(f"Failed to decode graphs: {str(e)}")
+        progress.stage('charts', charts=len(graph_paths))
 
         report_generator.add_title("Sales Report")
         report_generator.add_cards(cards)
-        report_generator.add_filters(filters)
+        report_generator.add_filters(spec['filters'])
         report_generator.add_graphs(graph_paths)
         report_generator.save_pdf()
+        progress.stage('pdf')
+
+
+def _build_report(spec, progress=NULL_PROGRESS):
+    """
+    Build the PDF described by a prepared report spec.
+    Raises ValueError for undecodable images and LookupError when no rows match.
+    """
+    cards = spec['cards']
+    server_graphs = None
+    if spec['render'] == 'server':
+        server_graphs = _cached_graphs(spec['server_filters'])
+        if server_graphs is None:
+            raise LookupError('No data matches the selected filters')
+        cards = _report_cards(spec, server_graphs)
+        progress.stage('graphs')
+    _write_report(spec, cards, server_graphs, progress)
+
+
+async def _build_report_async(spec):
+    """_build_report with the graphs and the PDF built in the CPU pool."""
+    cards = spec['cards']
+    server_graphs = None
+    if spec['render'] == 'server':
+        server_graphs = await _cached_graphs_async(spec['server_filters'])
+        if server_graphs is None:
+            raise LookupError('No data matches the selected filters')
+        cards = await _off_loop(_report_cards)(spec, server_graphs)
+    await cpu_pool.run(_write_report, spec, cards, server_graphs)
+
+
+@csrf_exempt
+async def generate_report(request):
+    if not await _off_loop(_sync_dataset)():
+        return JsonResponse({'error': 'No data uploaded'}, status=400)
+
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    try:
+        spec = _prepare_report(json.loads(request.body))
+        # Reports written here are swept with the queued ones, by age and count
+        await _off_loop(report_jobs.expire)()
+        cached = await _off_loop(report_jobs.touch)(spec['report_id'], spec['report_path'])
+        if not cached:
+            await _build_report_async(spec)
 
         # Return the relative path from STATIC_URL
-        relative_path = 'reports/report.pdf'
         return JsonResponse({
             'message': 'Report generated successfully',
-            'report_path': relative_path
+            'report_path': spec['relative_path'],
+            'cached': cached
         })
 
     except json.JSONDecodeError:
         return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except LookupError as e:
+        return JsonResponse({'error': str(e)}, status=404)
+    except ImportError as e:
+        return JsonResponse({'error': f'Server-side chart rendering is unavailable: {str(e)}'}, status=501)
+    except PoolBusy as e:
+        return _busy(e)
     except Exception as e:
         return JsonResponse({'error': f'Error generating report: {str(e)}'}, status=500)
+
+
+@csrf_exempt
+def submit_report(request):
+    """Queue a report build on the worker pool and return its id immediately."""
+    if not _sync_dataset():
+        return JsonResponse({'error': 'No data uploaded'}, status=400)
+
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    try:
+        spec = _prepare_report(json.loads(request.body))
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+
+    progress = progress_jobs.start(spec['report_id'])
+    try:
+        job = report_jobs.submit(
+            spec['report_id'], spec['report_path'], lambda progress: _build_report(spec, progress), progress,
+        )
+    except PoolBusy as e:
+        progress.fail(str(e))
+        return _busy(e)
+    return JsonResponse({
+        **job.to_dict(),
+        'status_url': reverse('core:report_status', args=[job.report_id]),
+        'download_url': reverse('core:report_download', args=[job.report_id]),
+        'progress_url': reverse('core:progress_stream', args=[job.report_id]),
+    }, status=202)
+
+
+def progress_stream(request, job_id):
+    """
+    Server-Sent Events with the stages of an upload or report job: one
+    `stage` event per finished step with its row count and elapsed seconds,
+    then `done` or `error`. Uploads are followed by opening this before
+    posting with the same progress_id. A reconnecting EventSource resumes
+    after its Last-Event-ID.
+    """
+    from django.core.handlers.asgi import ASGIRequest
+
+    if not JOB_ID.fullmatch(job_id):
+        return JsonResponse({'error': 'Invalid job id'}, status=404)
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', 0))
+    except ValueError:
+        last_event_id = 0
+
+    # Under ASGI the stream is served from the event loop instead of a thread
+    stream = event_stream if isinstance(request, ASGIRequest) else sync_event_stream
+    response = StreamingHttpResponse(
+        stream(progress_jobs.open(job_id), last_event_id), content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def report_status(request, report_id):
+    job = report_jobs.get(report_id)
+    if job is None:
+        return JsonResponse({'error': 'Unknown or expired report'}, status=404)
+    return JsonResponse(job.to_dict())
+
+
+def report_download(request, report_id):
+    job = report_jobs.get(report_id)
+    if job is None:
+        return JsonResponse({'error': 'Unknown or expired report'}, status=404)
+    if job.status == FAILED:
+        return JsonResponse(job.to_dict(), status=500)
+    if job.status != READY:
+        return JsonResponse(job.to_dict(), status=202)
+    return FileResponse(open(job.output_path, 'rb'), as_attachment=True,
+                        filename='report.pdf', content_type='application/pdf')
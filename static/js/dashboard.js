@@ -99,12 +99,14 @@ function initializeUIComponents() {
 
     // Initialize datepickers
     $("#startDateFilter").datepicker({
+        dateFormat: 'yy-mm-dd',
         onSelect: function(dateText) {
             $("#startDate").text(dateText);
         }
     });
 
     $("#endDateFilter").datepicker({
+        dateFormat: 'yy-mm-dd',
         onSelect: function(dateText) {
             $("#endDate").text(dateText);
         }
@@ -1432,9 +1434,8 @@ const API = {
 };
 
 // Enhanced Event Handlers
-function handleFilterApply() {
-    console.log('Filter apply clicked');
-    const filters = {
+function readFilters() {
+    return {
         category: document.getElementById('categoryFilter').value,
         location: document.getElementById('locationFilter').value,
         ageRange: $('#ageSlider').slider('values'),
@@ -1442,6 +1443,11 @@ function handleFilterApply() {
         startDate: document.getElementById('startDateFilter').value,
         endDate: document.getElementById('endDateFilter').value
     };
+}
+
+function handleFilterApply() {
+    console.log('Filter apply clicked');
+    const filters = readFilters();
 
     console.log('Applying filters:', filters);
     showLoader();
@@ -1452,6 +1458,7 @@ function handleFilterApply() {
             if (!data) {
                 throw new Error('No data received from server');
             }
+            updateCards(data.percentile_cards);
             return Promise.all([
                 createCharts(data),
                 createAdditionalCharts(data),
@@ -1488,6 +1495,7 @@ function handleFilterReset() {
     $("#endDateFilter").val('');
 
     // Fetch unfiltered data
+    refreshFacets({});
     showLoader();
     API.fetchFilteredData({})
         .then(data => {
@@ -1538,6 +1546,12 @@ document.addEventListener('DOMContentLoaded', () => {
     if (initialDataElement) {
         const initialData = JSON.parse(initialDataElement.textContent);
         initializeDashboard(initialData);
+        loadChurnedCustomersTable();
+        loadDateDomain();
+        refreshFacets(readFilters());
+        if (initialData.approximate) {
+            pollExactDashboard(initialData.approximate.exact_url);
+        }
     }
 
     // Event listeners
@@ -1546,6 +1560,10 @@ document.addEventListener('DOMContentLoaded', () => {
     
     document.getElementById('resetFilter')
         .addEventListener('click', handleFilterReset);
+    // Recount the facets as filters change, before they are applied
+    $('#categoryFilter, #locationFilter, #startDateFilter, #endDateFilter')
+        .on('change', () => refreshFacets(readFilters()));
+    $('#ageSlider, #ratingSlider').on('slidestop', () => refreshFacets(readFilters()));
     document.getElementById('generateReport')
         .addEventListener('click', handleGenerateReport);
 
@@ -1691,6 +1709,144 @@ const lazyLoadCharts = () => {
     });
 };
 
+// Fetch one page of a paginated NDJSON list endpoint; `next` is the cursor of the following page, if any
+async function fetchListPage(name, cursor = null, params = {}) {
+    const query = new URLSearchParams({ limit: 100, ...params });
+    if (cursor) query.set('cursor', cursor);
+    const response = await fetch(`/lists/${name}/?${query}`, { credentials: 'same-origin' });
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    const text = await response.text();
+    return {
+        records: text.split('\n').filter(line => line).map(line => JSON.parse(line)),
+        next: response.headers.get('X-Next-Cursor'),
+        total: Number(response.headers.get('X-Total-Count')),
+    };
+}
+
+// Show the first page of churned customers; further pages load on demand with "Show more"
+function loadChurnedCustomersTable() {
+    const tbody = document.querySelector('#churnedCustomersTable tbody');
+    const more = document.getElementById('churnedCustomersMore');
+    if (!tbody) return;
+    tbody.replaceChildren();
+
+    const loadPage = cursor => fetchListPage('churned_customers', cursor).then(page => {
+        // Values come from the uploaded file, so they are set as text, never parsed as HTML
+        const rows = document.createDocumentFragment();
+        page.records.forEach(record => {
+            const row = document.createElement('tr');
+            [record.customer_id, record.location, record.region].forEach(value => {
+                const cell = document.createElement('td');
+                cell.textContent = value;
+                row.appendChild(cell);
+            });
+            rows.appendChild(row);
+        });
+        tbody.appendChild(rows);
+        if (!more) return;
+        more.hidden = !page.next;
+        more.textContent = `Show more (${tbody.rows.length} of ${page.total})`;
+        more.onclick = () => {
+            more.disabled = true;
+            loadPage(page.next).finally(() => { more.disabled = false; });
+        };
+    }).catch(error => console.error('Error loading churned customers:', error));
+
+    return loadPage(null);
+}
+
+// Bound the date pickers to the data's range and mark the days that have transactions
+async function loadDateDomain() {
+    const pickers = $('#startDateFilter, #endDateFilter');
+    if (!pickers.length) return;
+    try {
+        const response = await fetch('/dates/domain/?resolution=day', { credentials: 'same-origin' });
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const domain = await response.json();
+        if (!domain.min) return;
+        const parse = text => $.datepicker.parseDate('yy-mm-dd', text);
+        const start = parse(domain.start);
+        pickers.datepicker('option', {
+            minDate: parse(domain.min),
+            maxDate: parse(domain.max),
+            beforeShowDay: date => {
+                // Rounding absorbs daylight saving shifts between local midnights
+                const count = domain.counts[Math.round((date - start) / 86400000)] || 0;
+                return [count > 0, count > 0 ? 'has-transactions' : '', `${count} transactions`];
+            }
+        });
+    } catch (error) {
+        console.error('Error loading date range:', error);
+    }
+}
+
+// Show how many transactions each filter choice would leave, and disable the dead ends
+async function refreshFacets(filters) {
+    try {
+        const response = await fetch('/facets/', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(filters || {}),
+            credentials: 'same-origin'
+        });
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const { facets } = await response.json();
+        [['categoryFilter', facets.category], ['locationFilter', facets.location]].forEach(([id, counts]) => {
+            if (!counts) return;
+            document.querySelectorAll(`#${id} option[value]:not([value=""])`).forEach(option => {
+                option.dataset.label = option.dataset.label || option.textContent;
+                const count = counts[option.value] || 0;
+                option.textContent = `${option.dataset.label} (${count})`;
+                option.disabled = count === 0 && !option.selected;
+            });
+        });
+        [['ageSlider', facets.age_bins], ['ratingSlider', facets.rating]].forEach(([id, counts]) => {
+            const slider = document.getElementById(id);
+            if (slider && counts) {
+                slider.title = Object.entries(counts).map(([value, count]) => `${value}: ${count}`).join('\n');
+            }
+        });
+    } catch (error) {
+        console.error('Error loading filter counts:', error);
+    }
+}
+
+function updateCards(cards) {
+    Object.entries(cards || {}).forEach(([key, value]) => {
+        $(`.card[data-key="${key}"] h2`).text(value);
+    });
+}
+
+// Large uploads are first shown from a sample; swap in the exact dashboard once it is ready
+async function pollExactDashboard(url, interval = 3000) {
+    try {
+        const response = await fetch(url, { credentials: 'same-origin' });
+        if (response.status === 202) {
+            setTimeout(() => pollExactDashboard(url, interval), interval);
+            return;
+        }
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const data = await response.json();
+        DashboardState.setInitialData(data);
+        updateCards(data.cards);
+        await Promise.all([
+            createCharts(data),
+            createAdditionalCharts(data),
+            createPredictedSalesChart(data.response)
+        ]);
+    } catch (error) {
+        console.error('Error loading exact dashboard:', error);
+    }
+}
+
 async function fetchFilteredData(filters) {
     console.log('Fetching filtered data with:', filters);
     try {